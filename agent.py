@@ -2,28 +2,50 @@
 AgenticRAG Agent
 ================
 ReAct 프레임워크를 사용하여 4개의 도구를 통합한 에이전트입니다.
+config.AGENT_MODE="parallel"이면 한 턴에 여러 도구를 동시에 호출합니다 (parallel_agent.py).
 """
 
+import json
 import logging
 import sys
+import threading
+import time
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
 
-from typing import Optional, Dict, Any
-from langchain.agents import AgentExecutor, create_react_agent
+from typing import Callable, Optional, Dict, Any
+from langchain.agents import AgentExecutor
+from langchain.agents.output_parsers import ReActSingleInputOutputParser
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import PromptTemplate
 
 import config
 import prompts
-
-from tools.vectordb_search import vectordb_search_tool
+import request_context
+import metrics
+import answer_cache
+from llm_cache import get_llm_cache, should_cache
+from router import run_fast_path
+from deadline import DeadlineAgentExecutor
+from circuit_breaker import BreakerLLM
+from hedging import HedgedLLM
+from parallel_agent import ParallelAgentExecutor, create_parallel_agent
+from scratchpad import create_agent_runnable
+from streaming import FinalAnswerStreamHandler
+from tool_memo import memoize_tools
+
+from tools.vectordb_search import (
+    vectordb_search_tool,
+    start_vectordb_preload,
+    start_vectordb_prefetch,
+    finish_vectordb_prefetch,
+)
 from tools.materials_project import materials_project_tool
 from tools.crossref import crossref_tool
 from tools.web_search import web_search_tool
 
 
-# ==================== LLM 빌더 (Gemini → Groq fallback) ====================
+# ==================== LLM 빌더 (Gemini → Groq fallback / hedging) ====================
 def _build_llm(temperature: float):
     """
     Gemini를 기본 LLM으로 생성합니다.
@@ -32,25 +54,38 @@ def _build_llm(temperature: float):
     LangChain의 with_fallbacks()를 사용하므로 호출 코드 변경 없이 동작합니다.
     Gemini가 사용량 한도 초과·인증 오류·타임아웃 등으로 예외를 던지면
     즉시 Groq로 재시도합니다.
+    config.LLM_FAILOVER_MODE="hedge"면 Gemini 응답이 최근 지연 백분위보다 늦을 때
+    Groq에도 요청을 보내 먼저 온 응답을 사용합니다 (hedging.py).
+
+    각 모델 호출은 서킷 브레이커를 거치므로 (circuit_breaker.py) Gemini 브레이커가 열려 있으면
+    타임아웃을 기다리지 않고 바로 Groq를 사용합니다.
+
+    temperature가 0이면 두 모델 모두 LLM 응답 캐시(llm_cache.py)를 사용합니다.
     """
-    gemini = ChatGoogleGenerativeAI(
+    # 결정적인 호출만 캐시 (False: LangChain 전역 캐시도 사용하지 않음)
+    cache = get_llm_cache() if should_cache(temperature) else False
+    gemini = BreakerLLM(ChatGoogleGenerativeAI(
         model=config.LLM_MODEL_NAME,
         temperature=temperature,
         streaming=config.LLM_STREAMING,
         max_output_tokens=config.LLM_MAX_OUTPUT_TOKENS,
-        google_api_key=config.GOOGLE_API_KEY
-    )
+        google_api_key=config.GOOGLE_API_KEY,
+        cache=cache
+    ), "gemini")
 
     if not config.GROQ_API_KEY:
         return gemini
 
     from langchain_groq import ChatGroq
-    groq_llm = ChatGroq(
+    groq_llm = BreakerLLM(ChatGroq(
         model=config.GROQ_MODEL_NAME,
         temperature=temperature,
         max_tokens=config.LLM_MAX_OUTPUT_TOKENS,
-        api_key=config.GROQ_API_KEY
-    )
+        api_key=config.GROQ_API_KEY,
+        cache=cache
+    ), "groq")
+    if config.LLM_FAILOVER_MODE == "hedge":
+        return HedgedLLM(gemini, groq_llm)
     return gemini.with_fallbacks([groq_llm])
 
 
@@ -69,24 +104,38 @@ def create_agent(
     Returns:
         AgentExecutor 인스턴스
     """
+    # VectorDB 로드 + 임베딩 모델 warm-up을 백그라운드에서 미리 시작
+    start_vectordb_preload()
+
     llm = _build_llm(temperature)
 
-    tools = [
+    # 같은 요청 안에서 반복되는 도구 호출은 이전 Observation을 재사용 (tool_memo.py)
+    tools = memoize_tools([
         vectordb_search_tool,
         materials_project_tool,
         crossref_tool,
         web_search_tool
-    ]
-
-    react_prompt = PromptTemplate.from_template(prompts.REACT_SYSTEM_PROMPT)
-
-    agent = create_react_agent(
-        llm=llm,
-        tools=tools,
-        prompt=react_prompt
-    )
-
-    agent_executor = AgentExecutor(
+    ])
+
+    if config.AGENT_MODE == "parallel":
+        # 한 턴에 독립적인 Action 여러 개를 출력·동시 실행
+        react_prompt = PromptTemplate.from_template(prompts.PARALLEL_REACT_SYSTEM_PROMPT).partial(
+            max_actions=str(config.AGENT_MAX_PARALLEL_ACTIONS)
+        )
+        agent = create_parallel_agent(llm=llm, tools=tools, prompt=react_prompt)
+        executor_cls = ParallelAgentExecutor
+    else:
+        react_prompt = PromptTemplate.from_template(prompts.REACT_SYSTEM_PROMPT)
+        # create_react_agent와 같은 구성 + scratchpad 압축 (scratchpad.py)
+        agent = create_agent_runnable(
+            llm=llm,
+            tools=tools,
+            prompt=react_prompt,
+            output_parser=ReActSingleInputOutputParser()
+        )
+        executor_cls = DeadlineAgentExecutor
+
+    agent_executor = executor_cls(
         agent=agent,
         tools=tools,
         verbose=verbose,
@@ -109,10 +158,25 @@ def create_agent(
 
 
 # ==================== Agent 실행 ====================
+_fast_path_llm = None
+_fast_path_llm_lock = threading.Lock()
+
+
+def _get_fast_path_llm():
+    """빠른 경로 답변 문장화용 LLM (프로세스 공유, 최초 사용 시 생성)."""
+    global _fast_path_llm
+    with _fast_path_llm_lock:
+        if _fast_path_llm is None:
+            _fast_path_llm = _build_llm(config.LLM_TEMPERATURE)
+        return _fast_path_llm
+
+
 def run_agent(
     query: str,
     agent: Optional[AgentExecutor] = None,
-    return_steps: bool = False
+    return_steps: bool = False,
+    use_cache: bool = config.ANSWER_CACHE,
+    on_token: Optional[Callable[[str], None]] = None
 ) -> Dict[str, Any]:
     """
     에이전트를 실행하여 쿼리에 답변합니다.
@@ -121,18 +185,99 @@ def run_agent(
         query: 사용자 질문
         agent: AgentExecutor 인스턴스 (None이면 새로 생성)
         return_steps: 중간 단계 반환 여부
+        use_cache: 의미 기반 답변 캐시(answer_cache.py) 사용 여부 (False면 조회·저장 모두 건너뜀)
+        on_token: Final Answer 토큰을 생성되는 대로 받을 콜백 (streaming.py, config.LLM_STREAMING).
+            캐시·빠른 경로 응답은 토큰 없이 output으로만 반환
 
     Returns:
         {
             "output": str,
-            "intermediate_steps": list  # return_steps=True인 경우
+            "intermediate_steps": list,  # return_steps=True인 경우
+            "route": str,  # 빠른 경로(router.py)로 처리된 경우 ("mp_property" | "literature")
+            "cache": dict  # 답변 캐시에서 반환된 경우 ({"question", "similarity", "age_sec"})
         }
     """
+    embedding = None
+    if use_cache:
+        try:
+            embedding = answer_cache.embed_question(query)
+            cached = answer_cache.lookup(query, embedding)
+        except Exception:
+            logging.warning("답변 캐시 조회 실패 — 캐시 없이 진행합니다.", exc_info=True)
+            cached = None
+        if cached is not None:
+            return _with_steps(cached, return_steps)
+
     if agent is None:
         agent = create_agent()
 
+    response = _answer(query, agent, on_token)
+    if use_cache and embedding is not None:
+        try:
+            answer_cache.store(query, response, embedding)
+        except Exception:
+            logging.warning("답변 캐시 저장 실패", exc_info=True)
+    return _with_steps(response, return_steps)
+
+
+def _with_steps(response: Dict[str, Any], return_steps: bool) -> Dict[str, Any]:
+    if not return_steps:
+        response.pop("intermediate_steps", None)
+    return response
+
+
+def _answer(query: str, agent: AgentExecutor, on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """
+    빠른 경로 또는 전체 에이전트로 답변합니다 (중간 단계 포함).
+    두 경로 모두 같은 요청 컨텍스트(마감 시각·도구 타임아웃·도구 메모) 안에서 실행되므로,
+    빠른 경로의 도구 호출도 config.AGENT_TIMEOUT을 넘지 않고 실패 시 남은 시간으로 전체 에이전트가 이어받습니다.
+    """
+    with request_context.request_scope(query, timeout=config.AGENT_TIMEOUT):
+        if config.FAST_PATH_ROUTER:
+            # 단순 조회는 ReAct 루프 없이 도구를 바로 호출
+            routed = run_fast_path(
+                query,
+                tools={tool.name: tool for tool in agent.tools},
+                llm=_get_fast_path_llm() if config.ROUTER_LLM_ANSWER else None
+            )
+            if routed is not None:
+                return routed
+
+        t0 = time.perf_counter()
+        try:
+            return _run_full_agent(query, agent, return_steps=True, on_token=on_token)
+        finally:
+            if config.FAST_PATH_ROUTER:
+                metrics.incr("router.route.agent")
+                metrics.observe("router.latency_sec.agent", time.perf_counter() - t0)
+
+
+def _run_full_agent(
+    query: str,
+    agent: AgentExecutor,
+    return_steps: bool,
+    on_token: Optional[Callable[[str], None]] = None
+) -> Dict[str, Any]:
+    """ReAct 에이전트로 답변합니다 (vectordb 선행 검색). 요청 컨텍스트는 호출 측(_answer)이 엽니다."""
+    # 첫 LLM 호출과 동시에 원래 질문으로 vectordb 검색을 미리 시작
+    start_vectordb_prefetch(query)
+    try:
+        return _invoke_agent(agent, query, return_steps, on_token)
+    finally:
+        finish_vectordb_prefetch()
+
+
+def _invoke_agent(
+    agent: AgentExecutor,
+    query: str,
+    return_steps: bool,
+    on_token: Optional[Callable[[str], None]] = None
+) -> Dict[str, Any]:
+    """AgentExecutor를 실행하고 응답 딕셔너리로 변환합니다."""
+    # Final Answer 토큰 스트리밍 (출력 파싱은 완성된 응답으로 그대로 수행)
+    callbacks = [FinalAnswerStreamHandler(on_token)] if on_token is not None and config.LLM_STREAMING else []
     try:
-        result = agent.invoke({"input": query})
+        result = agent.invoke({"input": query}, config={"callbacks": callbacks})
 
         response: Dict[str, Any] = {
             "output": result.get("output", "답변을 생성할 수 없습니다.")
@@ -152,6 +297,42 @@ def run_agent(
 
 
 # ==================== 대화형 인터페이스 ====================
+class _AnswerPrinter:
+    """
+    CLI 답변 출력기. on_token으로 받은 Final Answer 토큰은 헤더와 함께 바로 출력하고,
+    토큰 없이 끝난 응답(캐시·빠른 경로·오류)이나 전달된 토큰과 다른 응답은 finish()에서 전체를 출력합니다.
+    """
+
+    def __init__(self, title: str):
+        self.title = title
+        self.streamed = ""
+
+    def _header(self):
+        print("\n" + "="*60)
+        print(self.title)
+        print("="*60)
+
+    def on_token(self, token: str):
+        if not self.streamed:
+            self._header()
+        self.streamed += token
+        print(token, end="", flush=True)
+
+    def finish(self, output: str):
+        if self.streamed and self.streamed.strip() == output.strip():
+            print()
+            return
+        self._header()
+        print(output)
+
+
+def print_metrics() -> None:
+    """누적 메트릭(metrics.snapshot())을 출력합니다."""
+    print("\n📈 메트릭")
+    print(json.dumps(metrics.snapshot(), ensure_ascii=False, indent=2, sort_keys=True))
+    print()
+
+
 def interactive_chat():
     """
     CLI 기반 대화형 인터페이스
@@ -164,7 +345,8 @@ def interactive_chat():
     print("- Materials Project: DFT 계산 데이터")
     print("- Crossref: 최신 논문 검색")
     print("- Web Search: 일반 웹 정보 검색")
-    print("\n종료하려면 'exit', 'quit', 또는 'q'를 입력하세요.\n")
+    print("\n종료하려면 'exit', 'quit', 또는 'q'를 입력하세요.")
+    print("'metrics'를 입력하면 라우팅·prefetch·검색 등 누적 메트릭을 표시합니다.\n")
     print("="*60 + "\n")
 
     print("🤖 에이전트 초기화 중...")
@@ -187,13 +369,15 @@ def interactive_chat():
             if not user_input:
                 continue
 
+            if user_input.lower() in ["metrics", "/metrics"]:
+                print_metrics()
+                continue
+
             print("\n🔍 검색 중...\n")
-            result = run_agent(user_input, agent=agent)
+            printer = _AnswerPrinter("📝 답변:")
+            result = run_agent(user_input, agent=agent, on_token=printer.on_token)
 
-            print("\n" + "="*60)
-            print("📝 답변:")
-            print("="*60)
-            print(result["output"])
+            printer.finish(result["output"])
             print("\n" + "="*60 + "\n")
 
         except KeyboardInterrupt:
@@ -219,6 +403,16 @@ if __name__ == "__main__":
         action="store_true",
         help="상세 로그 출력"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="답변 캐시를 사용하지 않음 (조회·저장 모두 건너뜀)"
+    )
+    parser.add_argument(
+        "--metrics",
+        action="store_true",
+        help="실행 후 누적 메트릭(카운터·게이지·지연 시간 요약) 출력"
+    )
 
     args = parser.parse_args()
 
@@ -227,12 +421,18 @@ if __name__ == "__main__":
     if args.query:
         print(f"질문: {args.query}\n")
         agent = create_agent(verbose=args.verbose)
-        result = run_agent(args.query, agent=agent, return_steps=True)
-
-        print("="*60)
-        print("답변:")
-        print("="*60)
-        print(result["output"])
+        printer = _AnswerPrinter("답변:")
+        result = run_agent(
+            args.query,
+            agent=agent,
+            return_steps=True,
+            use_cache=config.ANSWER_CACHE and not args.no_cache,
+            on_token=printer.on_token
+        )
+
+        if "cache" in result:
+            print(f"♻️  캐시된 답변 (유사 질문: {result['cache']['question']}, 유사도 {result['cache']['similarity']})")
+        printer.finish(result["output"])
 
         if args.verbose and "intermediate_steps" in result:
             print("\n" + "="*60)
@@ -244,5 +444,8 @@ if __name__ == "__main__":
                 out = str(step[1])
                 print(f"Output: {out[:200]}{'...' if len(out) > 200 else ''}")
 
+        if args.metrics:
+            print_metrics()
+
     else:
         interactive_chat()
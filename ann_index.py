@@ -0,0 +1,467 @@
+"""
+IVF-PQ 근사 최근접 이웃(ANN) 인덱스 모듈
+=======================================
+수백만 청크 규모의 코퍼스를 위한 선택적 검색 엔진입니다.
+
+- IVF (Inverted File): k-means 중심점(coarse centroid)으로 공간을 nlist개 셀로 분할
+- PQ (Product Quantization): 중심점과의 잔차(residual)를 m개 부분공간으로 나누어
+  부분공간마다 256개 코드워드 중 하나(uint8)로 압축 → 벡터당 m 바이트만 저장
+- 검색 시 쿼리에 가까운 nprobe개 셀만 탐색 (ADC: Asymmetric Distance Computation)
+
+Chroma에 저장된 임베딩으로 오프라인 학습하며, 인덱스 파일은 .npy로 저장되어
+검색 시 memory-map으로 로드됩니다 (수백만 벡터도 수 GB 이내 RAM).
+벡터당 저장 공간은 PQ 코드 m 바이트 + 행 번호 4 바이트이고, Chroma ID 문자열은
+별도 리스트(ids.json)에 한 번만 저장합니다 (고정폭 문자열 배열은 벡터당 수백 바이트).
+
+검색 범위는 기본 VectorDB(config.VECTOR_DB_PATH)뿐이며 다른 샤드는 검색하지 않습니다.
+
+사용법:
+    python ann_index.py --train            # Chroma 임베딩으로 학습 + recall@10 리포트
+    python ann_index.py --evaluate         # 저장된 인덱스의 recall@10만 재측정
+"""
+
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
+
+import config
+
+
+# ==================== k-means 유틸리티 ====================
+def _squared_distances(x: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """x (n, d)와 centers (k, d) 사이의 제곱 L2 거리 행렬 (n, k)를 계산합니다."""
+    x_norm = np.einsum("ij,ij->i", x, x)[:, None]
+    c_norm = np.einsum("ij,ij->i", centers, centers)[None, :]
+    dist = x_norm - 2.0 * (x @ centers.T) + c_norm
+    np.maximum(dist, 0.0, out=dist)
+    return dist
+
+
+def _assign(x: np.ndarray, centers: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+    """각 벡터에 가장 가까운 중심점 인덱스를 배치 단위로 계산합니다."""
+    labels = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), batch_size):
+        block = x[start:start + batch_size]
+        labels[start:start + batch_size] = _squared_distances(block, centers).argmin(axis=1)
+    return labels
+
+
+def kmeans(
+    x: np.ndarray,
+    k: int,
+    n_iter: int = 20,
+    seed: int = 0
+) -> np.ndarray:
+    """
+    Lloyd k-means로 k개의 중심점을 학습합니다.
+
+    Args:
+        x: 학습 벡터 (n, d), float32
+        k: 중심점 개수
+        n_iter: 반복 횟수
+        seed: 난수 시드
+
+    Returns:
+        중심점 배열 (k, d)
+    """
+    rng = np.random.default_rng(seed)
+    n = len(x)
+    if n < k:
+        raise ValueError(f"학습 벡터 수({n})가 중심점 수({k})보다 적습니다.")
+
+    centers = x[rng.choice(n, size=k, replace=False)].copy()
+    for _ in range(n_iter):
+        labels = _assign(x, centers)
+        counts = np.bincount(labels, minlength=k).astype(np.float32)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, x)
+
+        nonempty = counts > 0
+        centers[nonempty] = sums[nonempty] / counts[nonempty, None]
+        # 빈 클러스터는 임의의 학습 벡터로 재시드
+        n_empty = int((~nonempty).sum())
+        if n_empty:
+            centers[~nonempty] = x[rng.choice(n, size=n_empty, replace=False)]
+    return centers
+
+
+# ==================== IVF-PQ 인덱스 ====================
+class IVFPQIndex:
+    """
+    IVF-PQ 근사 검색 인덱스.
+
+    Attributes:
+        nlist: coarse 셀(중심점) 개수
+        m: PQ 부분공간 개수 (벡터당 코드 바이트 수)
+        nprobe: 검색 시 탐색할 셀 개수 (클수록 recall↑, 속도↓)
+        normalize: True이면 벡터를 L2 정규화 (cosine 유사도와 동일한 순위)
+    """
+
+    KSUB = 256  # 부분공간당 코드워드 수 (uint8)
+
+    def __init__(self, nlist: int, m: int, nprobe: int = 8, normalize: bool = True):
+        self.nlist = nlist
+        self.m = m
+        self.nprobe = nprobe
+        self.normalize = normalize
+        self.dim: Optional[int] = None
+        self.centroids: Optional[np.ndarray] = None   # (nlist, d)
+        self.codebooks: Optional[np.ndarray] = None   # (m, 256, d/m)
+        self.list_offsets: Optional[np.ndarray] = None  # (nlist + 1,)
+        self.codes: Optional[np.ndarray] = None       # (N, m) uint8, 셀 순서로 정렬
+        self.rows: Optional[np.ndarray] = None        # (N,) int32 ids 행 번호, 셀 순서로 정렬
+        self.ids: Optional[List[str]] = None          # Chroma ID (추가 순서)
+        self.stats: dict = {}
+
+    # ---------- 전처리 ----------
+    def _prep(self, x: np.ndarray) -> np.ndarray:
+        x = np.asarray(x, dtype=np.float32)
+        if self.normalize:
+            norms = np.linalg.norm(x, axis=1, keepdims=True)
+            x = x / np.maximum(norms, 1e-12)
+        return x
+
+    # ---------- 학습 ----------
+    def train(self, x: np.ndarray, n_iter: int = 20, seed: int = 0) -> None:
+        """
+        coarse 중심점과 PQ 코드북을 학습합니다.
+
+        Args:
+            x: 학습용 샘플 벡터 (n, d). 전체 코퍼스가 아닌 샘플이면 충분합니다.
+        """
+        x = self._prep(x)
+        self.dim = x.shape[1]
+        if self.dim % self.m != 0:
+            raise ValueError(f"임베딩 차원({self.dim})이 PQ 부분공간 수({self.m})로 나누어떨어지지 않습니다.")
+
+        self.centroids = kmeans(x, self.nlist, n_iter=n_iter, seed=seed)
+        residuals = x - self.centroids[_assign(x, self.centroids)]
+
+        dsub = self.dim // self.m
+        ksub = min(self.KSUB, len(x))
+        self.codebooks = np.zeros((self.m, self.KSUB, dsub), dtype=np.float32)
+        for j in range(self.m):
+            sub = np.ascontiguousarray(residuals[:, j * dsub:(j + 1) * dsub])
+            self.codebooks[j, :ksub] = kmeans(sub, ksub, n_iter=n_iter, seed=seed + j)
+
+    def _encode(self, residuals: np.ndarray) -> np.ndarray:
+        dsub = self.dim // self.m
+        codes = np.empty((len(residuals), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            sub = residuals[:, j * dsub:(j + 1) * dsub]
+            codes[:, j] = _assign(sub, self.codebooks[j])
+        return codes
+
+    # ---------- 추가 ----------
+    def add_batches(self, batches: Iterator[Tuple[List[str], np.ndarray]]) -> None:
+        """
+        (ids, vectors) 배치를 순차적으로 인코딩하여 인덱스를 구성합니다.
+        원본 벡터는 배치 단위로만 메모리에 올라가고, PQ 코드만 누적됩니다.
+        """
+        if self.centroids is None:
+            raise RuntimeError("인덱스가 학습되지 않았습니다. train()을 먼저 호출하세요.")
+
+        all_codes, all_lists, all_ids = [], [], []
+        for ids, vectors in batches:
+            x = self._prep(vectors)
+            lists = _assign(x, self.centroids)
+            all_codes.append(self._encode(x - self.centroids[lists]))
+            all_lists.append(lists)
+            all_ids.extend(ids)
+
+        codes = np.concatenate(all_codes) if all_codes else np.empty((0, self.m), dtype=np.uint8)
+        lists = np.concatenate(all_lists) if all_lists else np.empty(0, dtype=np.int64)
+
+        # 셀 번호 순으로 정렬 → 셀 i의 항목은 codes[list_offsets[i]:list_offsets[i+1]]
+        order = np.argsort(lists, kind="stable")
+        self.codes = np.ascontiguousarray(codes[order])
+        self.rows = order.astype(np.int32 if len(order) < 2 ** 31 else np.int64)
+        self.ids = all_ids
+        self.list_offsets = np.zeros(self.nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(lists, minlength=self.nlist), out=self.list_offsets[1:])
+
+    # ---------- 검색 ----------
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int = 10,
+        nprobe: Optional[int] = None
+    ) -> Tuple[List[List[str]], np.ndarray]:
+        """
+        쿼리 벡터들의 근사 최근접 이웃을 검색합니다.
+
+        Args:
+            queries: 쿼리 벡터 (q, d)
+            k: 쿼리당 반환할 결과 수
+            nprobe: 탐색할 셀 수 (None이면 self.nprobe)
+
+        Returns:
+            (ids, distances) — ids는 쿼리별 ID 리스트, distances는 (q, k) 근사 제곱 L2 거리
+            (결과가 k보다 적으면 남은 자리는 inf)
+        """
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        q = self._prep(np.atleast_2d(queries))
+        dsub = self.dim // self.m
+        m_idx = np.arange(self.m)[None, :]
+
+        coarse = _squared_distances(q, self.centroids)
+        probe_lists = np.argsort(coarse, axis=1)[:, :nprobe]
+
+        all_ids: List[List[str]] = []
+        all_dists = np.full((len(q), k), np.inf, dtype=np.float32)
+        for qi in range(len(q)):
+            cand_dist, cand_pos = [], []
+            for li in probe_lists[qi]:
+                start, end = self.list_offsets[li], self.list_offsets[li + 1]
+                if start == end:
+                    continue
+                # 잔차 쿼리에 대한 부분공간별 거리 테이블 (m, 256)
+                r = (q[qi] - self.centroids[li]).reshape(self.m, 1, dsub)
+                table = ((self.codebooks - r) ** 2).sum(axis=2)
+                codes = np.asarray(self.codes[start:end])
+                cand_dist.append(table[m_idx, codes].sum(axis=1))
+                cand_pos.append(np.arange(start, end))
+
+            if not cand_dist:
+                all_ids.append([])
+                continue
+            dist = np.concatenate(cand_dist)
+            pos = np.concatenate(cand_pos)
+            top = min(k, len(dist))
+            best = np.argpartition(dist, top - 1)[:top]
+            best = best[np.argsort(dist[best])]
+            all_ids.append([self.ids[row] for row in self.rows[pos[best]]])
+            all_dists[qi, :top] = dist[best]
+        return all_ids, all_dists
+
+    # ---------- 저장/로드 ----------
+    def save(self, path: Path) -> None:
+        """인덱스를 디렉토리에 저장합니다 (배열별 .npy + meta.json)."""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "centroids.npy", self.centroids)
+        np.save(path / "codebooks.npy", self.codebooks)
+        np.save(path / "list_offsets.npy", self.list_offsets)
+        np.save(path / "codes.npy", self.codes)
+        np.save(path / "rows.npy", self.rows)
+        (path / "ids.json").write_text(json.dumps(self.ids, ensure_ascii=False), encoding="utf-8")
+        meta = {
+            "nlist": self.nlist,
+            "m": self.m,
+            "nprobe": self.nprobe,
+            "normalize": self.normalize,
+            "dim": self.dim,
+            "count": int(len(self.ids)),
+            "embedding_model": config.EMBEDDING_MODEL_NAME,
+            "stats": self.stats,
+        }
+        (path / "meta.json").write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "IVFPQIndex":
+        """
+        저장된 인덱스를 로드합니다.
+        mmap=True이면 PQ 코드와 행 번호를 memory-map으로 열어 실제 접근한 셀만 메모리에 올립니다.
+        """
+        path = Path(path)
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("embedding_model") != config.EMBEDDING_MODEL_NAME:
+            logging.warning(
+                "IVF-PQ 인덱스의 임베딩 모델(%s)이 현재 설정(%s)과 다릅니다. 재학습하세요.",
+                meta.get("embedding_model"), config.EMBEDDING_MODEL_NAME
+            )
+        index = cls(meta["nlist"], meta["m"], meta["nprobe"], meta["normalize"])
+        mode = "r" if mmap else None
+        index.dim = meta["dim"]
+        index.centroids = np.load(path / "centroids.npy")
+        index.codebooks = np.load(path / "codebooks.npy")
+        index.list_offsets = np.load(path / "list_offsets.npy")
+        index.codes = np.load(path / "codes.npy", mmap_mode=mode)
+        if (path / "rows.npy").exists():
+            index.rows = np.load(path / "rows.npy", mmap_mode=mode)
+            index.ids = json.loads((path / "ids.json").read_text(encoding="utf-8"))
+        else:
+            # 이전 형식: 셀 순서로 정렬된 고정폭 문자열 ID 배열
+            index.ids = np.load(path / "ids.npy").tolist()
+            index.rows = np.arange(len(index.ids))
+        index.stats = meta.get("stats", {})
+        return index
+
+
+# ==================== Chroma 임베딩 읽기 ====================
+def iter_collection_embeddings(
+    collection,
+    batch_size: int = 10000,
+    limit: Optional[int] = None
+) -> Iterator[Tuple[List[str], np.ndarray]]:
+    """
+    Chroma 컬렉션에 저장된 임베딩을 배치 단위로 읽습니다 (재임베딩 없음).
+
+    Yields:
+        (ids, embeddings) 튜플
+    """
+    total = collection.count() if limit is None else min(limit, collection.count())
+    for offset in range(0, total, batch_size):
+        batch = collection.get(
+            include=["embeddings"],
+            limit=min(batch_size, total - offset),
+            offset=offset
+        )
+        if not batch["ids"]:
+            break
+        yield batch["ids"], np.asarray(batch["embeddings"], dtype=np.float32)
+
+
+def sample_embeddings(collection, sample_size: int, seed: int = 0) -> np.ndarray:
+    """학습용 샘플을 배치마다 균등 비율로 추출합니다."""
+    total = collection.count()
+    rate = min(1.0, sample_size / max(total, 1))
+    rng = np.random.default_rng(seed)
+    samples = []
+    for _, vectors in iter_collection_embeddings(collection):
+        mask = rng.random(len(vectors)) < rate
+        samples.append(vectors[mask])
+    return np.concatenate(samples)[:sample_size]
+
+
+# ==================== 정확도 평가 ====================
+def exact_search(
+    batches: Iterator[Tuple[List[str], np.ndarray]],
+    queries: np.ndarray,
+    k: int = 10,
+    normalize: bool = True
+) -> List[List[str]]:
+    """전체 임베딩을 배치 단위로 훑는 정확한(brute-force) 검색. recall 기준선으로 사용합니다."""
+    q = np.asarray(queries, dtype=np.float32)
+    if normalize:
+        q = q / np.maximum(np.linalg.norm(q, axis=1, keepdims=True), 1e-12)
+
+    best_dist = np.full((len(q), 0), np.inf, dtype=np.float32)
+    best_ids = np.empty((len(q), 0), dtype=object)
+    for ids, vectors in batches:
+        if normalize:
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        dist = np.concatenate([best_dist, _squared_distances(q, vectors)], axis=1)
+        id_block = np.broadcast_to(np.asarray(ids, dtype=object), (len(q), len(ids)))
+        cand_ids = np.concatenate([best_ids, id_block], axis=1)
+        top = min(k, dist.shape[1])
+        order = np.argsort(dist, axis=1)[:, :top]
+        best_dist = np.take_along_axis(dist, order, axis=1)
+        best_ids = np.take_along_axis(cand_ids, order, axis=1)
+    return [list(row) for row in best_ids]
+
+
+def recall_at_k(approx: List[List[str]], exact: List[List[str]], k: int = 10) -> float:
+    """근사 결과가 정확한 top-k를 얼마나 포함하는지 (recall@k) 계산합니다."""
+    hits = sum(len(set(a[:k]) & set(e[:k])) for a, e in zip(approx, exact))
+    total = sum(min(k, len(e)) for e in exact)
+    return hits / total if total else 0.0
+
+
+def evaluate_recall(
+    index: IVFPQIndex,
+    collection,
+    n_queries: int = 100,
+    k: int = 10,
+    nprobe_values: Optional[List[int]] = None,
+    seed: int = 1
+) -> dict:
+    """
+    저장된 임베딩 일부를 쿼리로 사용하여 nprobe별 recall@k와 평균 지연을 측정합니다.
+    """
+    sample = sample_embeddings(collection, n_queries, seed=seed)
+    exact = exact_search(iter_collection_embeddings(collection), sample, k=k, normalize=index.normalize)
+
+    report = {}
+    for nprobe in nprobe_values or [1, 4, index.nprobe, 32]:
+        t0 = time.perf_counter()
+        approx, _ = index.search(sample, k=k, nprobe=nprobe)
+        elapsed_ms = (time.perf_counter() - t0) * 1000 / max(len(sample), 1)
+        report[str(nprobe)] = {
+            f"recall@{k}": round(recall_at_k(approx, exact, k), 4),
+            "latency_ms": round(elapsed_ms, 3),
+        }
+    return report
+
+
+# ==================== 학습 파이프라인 ====================
+def train_from_vectordb(
+    index_path: Path = config.IVFPQ_INDEX_PATH,
+    nlist: int = config.IVFPQ_NLIST,
+    m: int = config.IVFPQ_M,
+    nprobe: int = config.IVFPQ_NPROBE,
+    sample_size: int = config.IVFPQ_TRAIN_SAMPLE,
+    evaluate: bool = True
+) -> Optional[IVFPQIndex]:
+    """
+    Chroma에 저장된 임베딩으로 IVF-PQ 인덱스를 오프라인 학습하고 저장합니다.
+
+    Returns:
+        학습된 IVFPQIndex (DB가 없으면 None)
+    """
+    from vectordb import create_or_load_vectordb
+
+    db = create_or_load_vectordb()
+    if db is None:
+        print("❌ VectorDB를 로드할 수 없습니다.")
+        return None
+    collection = db._collection
+    total = collection.count()
+    # 셀당 평균 벡터 수가 너무 적어지지 않도록 nlist 조정
+    nlist = max(1, min(nlist, total // 39 or 1))
+
+    print(f"🧮 IVF-PQ 학습 중 (벡터 {total}개, nlist={nlist}, m={m})...")
+    t0 = time.perf_counter()
+    index = IVFPQIndex(nlist=nlist, m=m, nprobe=nprobe)
+    index.train(sample_embeddings(collection, sample_size))
+    train_sec = time.perf_counter() - t0
+
+    print("📦 PQ 인코딩 중...")
+    t0 = time.perf_counter()
+    index.add_batches(iter_collection_embeddings(collection))
+    add_sec = time.perf_counter() - t0
+
+    index.stats = {
+        "train_sec": round(train_sec, 2),
+        "add_sec": round(add_sec, 2),
+        "code_bytes": int(index.codes.nbytes),
+        "row_bytes": int(index.rows.nbytes),
+        "raw_float32_bytes": int(total * index.dim * 4),
+    }
+    if evaluate:
+        print("📏 recall@10 측정 중 (exact search 대비)...")
+        index.stats["recall"] = evaluate_recall(index, collection)
+
+    index.save(index_path)
+    print(f"✅ IVF-PQ 인덱스 저장: {index_path}")
+    print(json.dumps(index.stats, ensure_ascii=False, indent=2))
+    return index
+
+
+# ==================== CLI ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="IVF-PQ 인덱스 학습/평가")
+    parser.add_argument("--train", action="store_true", help="Chroma 임베딩으로 인덱스 학습")
+    parser.add_argument("--evaluate", action="store_true", help="저장된 인덱스의 recall@10 측정")
+    parser.add_argument("--nlist", type=int, default=config.IVFPQ_NLIST)
+    parser.add_argument("--m", type=int, default=config.IVFPQ_M)
+    parser.add_argument("--nprobe", type=int, default=config.IVFPQ_NPROBE)
+    args = parser.parse_args()
+
+    if args.train:
+        train_from_vectordb(nlist=args.nlist, m=args.m, nprobe=args.nprobe)
+    elif args.evaluate:
+        from vectordb import create_or_load_vectordb
+        db = create_or_load_vectordb()
+        idx = IVFPQIndex.load(config.IVFPQ_INDEX_PATH)
+        print(json.dumps(evaluate_recall(idx, db._collection), indent=2))
+    else:
+        parser.print_help()
@@ -0,0 +1,245 @@
+"""
+의미 기반 답변 캐시
+=================
+표현만 조금 다른 같은 질문이 매번 여러 턴의 에이전트 실행 비용을 치르지 않도록,
+run_agent() 앞에서 과거 질문의 임베딩을 검색해 저장된 답변과 중간 단계를 바로 반환합니다.
+
+- 질문 임베딩: VectorDB와 같은 Ollama 임베딩 모델 (활성 버전의 모델)
+- 저장소: 별도 Chroma 디렉토리(config.ANSWER_CACHE_PATH)의 cosine 컬렉션, 질문당 1개 항목
+- 적중 조건: cosine 유사도 ≥ config.ANSWER_CACHE_MIN_SIMILARITY, 두 질문의 화학식 집합이 같음
+  ("Cu2O 밴드갭"과 "CuO 밴드갭"은 임베딩이 거의 같음), 저장 후 config.ANSWER_CACHE_TTL_SEC 이내,
+  저장 당시와 같은 VectorDB 인덱스 버전·임베딩 모델
+- 조건을 만족하지 않는 항목(만료·버전 변경)은 조회 시 삭제
+- 도구 오류·마감 시각으로 건너뛴 도구·에피소드 내 중복 호출이 있었던 응답은 저장하지 않음
+- 최대 config.ANSWER_CACHE_MAX_ENTRIES개 (초과 시 오래된 항목부터 삭제)
+
+사용법:
+    python answer_cache.py --prewarm              # config.ANSWER_CACHE_PREWARM_QUESTIONS로 미리 채우기
+    python answer_cache.py --prewarm "질문1" "질문2"
+    python answer_cache.py --stats
+    python answer_cache.py --clear
+"""
+
+import hashlib
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from typing import Any, Dict, List, Optional
+
+from langchain_core.agents import AgentAction
+
+import config
+import metrics
+import prompts
+from index_versions import read_pointer
+from router import _formulas
+
+
+_COLLECTION = "answer_cache"
+_STOPPED_OUTPUT = "Agent stopped"  # AgentExecutor가 반복 횟수·시간 제한으로 중단했을 때의 출력
+_MEMO_NOTE_PREFIX = prompts.TOOL_MEMO_NOTE.split("{tool}")[0]  # tool_memo 적중 Observation의 앞부분
+
+_collection = None
+_collection_lock = threading.Lock()
+
+
+def _get_collection():
+    """캐시 컬렉션 (최초 사용 시 생성)."""
+    global _collection
+    with _collection_lock:
+        if _collection is None:
+            import chromadb
+            from chromadb.config import Settings
+
+            client = chromadb.PersistentClient(
+                path=str(config.ANSWER_CACHE_PATH),
+                settings=Settings(anonymized_telemetry=False)
+            )
+            _collection = client.get_or_create_collection(_COLLECTION, metadata={"hnsw:space": "cosine"})
+        return _collection
+
+
+def embed_question(question: str) -> List[float]:
+    """VectorDB와 같은 임베딩 모델로 질문을 임베딩합니다."""
+    from tools.vectordb_search import get_vectordb
+    return get_vectordb().embeddings.embed_query(question)
+
+
+def index_version() -> str:
+    """현재 VectorDB 인덱스 버전 태그 (샤드별 활성 버전 + 임베딩 모델)."""
+    parts = []
+    for name, path in config.VECTOR_DB_SHARDS.items():
+        pointer = read_pointer(Path(path)) or {}
+        parts.append(f"{name}={pointer.get('version', 'base')}:{pointer.get('embedding_model') or config.EMBEDDING_MODEL_NAME}")
+    return "|".join(parts)
+
+
+def _entry_id(question: str) -> str:
+    return hashlib.sha1(" ".join(question.lower().split()).encode("utf-8")).hexdigest()
+
+
+# ==================== 직렬화 ====================
+def _dump_steps(steps: List[Any]) -> str:
+    return json.dumps(
+        [{"tool": action.tool, "tool_input": str(action.tool_input), "observation": str(observation)}
+         for action, observation in steps],
+        ensure_ascii=False
+    )
+
+
+def _load_steps(payload: str) -> List[Any]:
+    return [(AgentAction(s["tool"], s["tool_input"], ""), s["observation"]) for s in json.loads(payload or "[]")]
+
+
+# ==================== 조회/저장 ====================
+def lookup(question: str, embedding: Optional[List[float]] = None) -> Optional[Dict[str, Any]]:
+    """
+    캐시된 답변을 찾습니다.
+
+    Args:
+        question: 사용자 질문
+        embedding: 이미 계산한 질문 임베딩 (None이면 새로 임베딩)
+
+    Returns:
+        run_agent()와 같은 형식의 응답 + "cache": {"question", "similarity", "age_sec"}.
+        적중하지 않으면 None
+    """
+    collection = _get_collection()
+    if collection.count() == 0:
+        metrics.incr("answer_cache.miss")
+        return None
+    if embedding is None:
+        embedding = embed_question(question)
+    res = collection.query(query_embeddings=[embedding], n_results=1, include=["metadatas", "distances", "documents"])
+    if not res["ids"][0]:
+        metrics.incr("answer_cache.miss")
+        return None
+
+    entry_id, meta, distance = res["ids"][0][0], res["metadatas"][0][0], res["distances"][0][0]
+    similarity = 1.0 - distance
+    metrics.observe("answer_cache.similarity", similarity)
+    if similarity < config.ANSWER_CACHE_MIN_SIMILARITY:
+        metrics.incr("answer_cache.miss")
+        return None
+    cached_question = res["documents"][0][0]
+    if set(_formulas(question)) != set(_formulas(cached_question)):
+        metrics.incr("answer_cache.formula_mismatch")
+        metrics.incr("answer_cache.miss")
+        return None
+
+    age = time.time() - meta["created_at"]
+    if age > config.ANSWER_CACHE_TTL_SEC or meta["index_version"] != index_version():
+        collection.delete(ids=[entry_id])
+        metrics.incr("answer_cache.stale")
+        return None
+
+    metrics.incr("answer_cache.hit")
+    return {
+        "output": meta["answer"],
+        "intermediate_steps": _load_steps(meta.get("steps")),
+        "cache": {"question": cached_question, "similarity": round(similarity, 4), "age_sec": round(age)},
+    }
+
+
+def _degraded(steps: List[Any]) -> bool:
+    """도구 오류·마감 시각으로 건너뛴 도구·중복 호출 안내가 포함된 중간 단계인지 여부."""
+    for _, observation in steps:
+        text = str(observation)
+        if text.startswith("오류") or text == prompts.DEADLINE_SKIPPED_NOTE or text.startswith(_MEMO_NOTE_PREFIX):
+            return True
+    return False
+
+
+def store(question: str, response: Dict[str, Any], embedding: Optional[List[float]] = None) -> None:
+    """
+    에이전트 응답을 캐시에 저장합니다.
+    오류·반복/시간 제한으로 중단된 응답과 중간 단계가 불완전한 응답(_degraded)은 저장하지 않습니다.
+    """
+    output = response.get("output") or ""
+    if "error" in response or not output or output.startswith(_STOPPED_OUTPUT):
+        return
+    if _degraded(response.get("intermediate_steps", [])):
+        metrics.incr("answer_cache.skipped_degraded")
+        return
+    collection = _get_collection()
+    if embedding is None:
+        embedding = embed_question(question)
+    collection.upsert(
+        ids=[_entry_id(question)],
+        embeddings=[embedding],
+        documents=[question],
+        metadatas=[{
+            "answer": response["output"],
+            "steps": _dump_steps(response.get("intermediate_steps", [])),
+            "created_at": time.time(),
+            "index_version": index_version(),
+        }]
+    )
+    _evict(collection)
+
+
+def _evict(collection) -> None:
+    """최대 항목 수를 넘으면 오래된 항목부터 삭제합니다."""
+    excess = collection.count() - config.ANSWER_CACHE_MAX_ENTRIES
+    if excess <= 0:
+        return
+    entries = collection.get(include=["metadatas"])
+    oldest = sorted(zip(entries["ids"], entries["metadatas"]), key=lambda e: e[1]["created_at"])[:excess]
+    collection.delete(ids=[entry_id for entry_id, _ in oldest])
+
+
+def clear() -> None:
+    """캐시를 비웁니다."""
+    collection = _get_collection()
+    ids = collection.get(include=[])["ids"]
+    if ids:
+        collection.delete(ids=ids)
+
+
+def prewarm(questions: List[str], agent=None) -> int:
+    """
+    질문 목록으로 에이전트를 실행하여 캐시를 미리 채웁니다 (이미 적중하는 질문은 건너뜀).
+
+    Returns:
+        새로 저장한 질문 수
+    """
+    from agent import create_agent, run_agent
+
+    if agent is None:
+        agent = create_agent(verbose=False)
+    added = 0
+    for question in questions:
+        result = run_agent(question, agent=agent, use_cache=True)
+        if "cache" in result:
+            print(f"  ✓ 이미 캐시됨: {question}")
+        elif "error" not in result:
+            added += 1
+            print(f"  + 저장: {question}")
+        else:
+            print(f"  ✗ 실패: {question}")
+    return added
+
+
+# ==================== CLI ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="의미 기반 답변 캐시 관리")
+    parser.add_argument("--prewarm", nargs="*", default=None, help="질문 목록으로 캐시 미리 채우기 (생략 시 기본 예시 질문)")
+    parser.add_argument("--stats", action="store_true", help="캐시 항목 수 출력")
+    parser.add_argument("--clear", action="store_true", help="캐시 비우기")
+    args = parser.parse_args()
+
+    if args.clear:
+        clear()
+        print("🗑️  답변 캐시를 비웠습니다.")
+    if args.prewarm is not None:
+        questions = args.prewarm or config.ANSWER_CACHE_PREWARM_QUESTIONS
+        print(f"🔥 답변 캐시 pre-warm ({len(questions)}개 질문)")
+        print(f"✅ {prewarm(questions)}개 저장")
+    if args.stats or not (args.clear or args.prewarm is not None):
+        print(f"📦 답변 캐시: {_get_collection().count()}개 항목 ({config.ANSWER_CACHE_PATH})")
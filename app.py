@@ -11,7 +11,14 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
 
 import config
+import metrics
 from agent import create_agent, run_agent
+from circuit_breaker import breaker_states
+from streaming import TokenStream
+from tools.vectordb_search import start_vectordb_preload, vectordb_status
+
+# 프로세스 시작 시 VectorDB 로드 + 임베딩 warm-up (모든 세션이 하나의 핸들 공유)
+start_vectordb_preload()
 
 
 # ==================== 페이지 설정 ====================
@@ -49,6 +56,9 @@ with st.sidebar:
 
     st.markdown("**1. VectorDB Search**")
     st.caption("논문에서 C-P-P 데이터 검색")
+    _vdb = vectordb_status()
+    _vdb_icon = {"ready": "✅", "loading": "⏳", "degraded": "⚠️", "error": "❌"}.get(_vdb["state"], "⏳")
+    st.caption(f"상태: {_vdb_icon} {_vdb['state']}")
 
     st.markdown("**2. Materials Project**")
     st.caption("DFT 계산 데이터 조회")
@@ -71,6 +81,23 @@ with st.sidebar:
     st.caption("DFT 계산 데이터 (cross-reference)")
     st.caption("✅ API 키 불필요")
 
+    # 서킷 브레이커 상태 (호출된 적 있는 LLM 제공자·도구만 표시)
+    _breakers = breaker_states()
+    if _breakers:
+        st.markdown("**외부 서비스 상태**")
+        for _name, _b in _breakers.items():
+            _b_icon = {"closed": "✅", "half_open": "⏳", "open": "❌"}[_b["state"]]
+            _detail = f"재시도까지 {_b['retry_in_sec']}초" if _b["state"] == "open" else f"최근 실패율 {_b['failure_rate']:.0%}"
+            st.caption(f"{_b_icon} {_name}: {_b['state']} ({_detail})")
+
+    # 누적 메트릭 (라우팅 비율·경로별 지연, prefetch 적중, 결과 병합으로 절약한 토큰 등)
+    with st.expander("📈 메트릭"):
+        _snapshot = metrics.snapshot()
+        if any(_snapshot.values()):
+            st.json(_snapshot, expanded=False)
+        else:
+            st.caption("아직 기록된 메트릭이 없습니다.")
+
     st.markdown("---")
     
     # 설정
@@ -91,6 +118,12 @@ with st.sidebar:
         value=False,
         help="에이전트의 사고 과정 표시"
     )
+
+    use_cache = st.checkbox(
+        "답변 캐시 사용",
+        value=config.ANSWER_CACHE,
+        help="비슷한 질문의 저장된 답변을 재사용 (끄면 항상 새로 검색)"
+    )
     
     # 대화 초기화
     if st.button("🔄 대화 초기화", use_container_width=True):
@@ -203,11 +236,18 @@ if prompt:
     with st.chat_message("assistant"):
         with st.spinner("🔍 검색 중..."):
             try:
-                result = run_agent(
+                # Final Answer 토큰을 생성되는 대로 표시 (에이전트는 별도 스레드에서 실행, streaming.py)
+                stream = TokenStream(lambda on_token: run_agent(
                     prompt,
                     agent=st.session_state.agent,
-                    return_steps=True  # 항상 steps 수집 (로그 이력 보존용)
-                )
+                    return_steps=True,  # 항상 steps 수집 (로그 이력 보존용)
+                    use_cache=use_cache,
+                    on_token=on_token
+                ))
+                answer_area = st.empty()
+                with answer_area:
+                    streamed = st.write_stream(stream)
+                result = stream.result
 
                 response = result["output"]
                 steps = result.get("intermediate_steps", [])
@@ -220,7 +260,11 @@ if prompt:
                             st.code(f"Tool: {step[0].tool}\nInput: {step[0].tool_input}", language="text")
                             st.text_area(f"Output {i}", str(step[1]), height=150, disabled=True, key=f"curr_{len(st.session_state.messages)}_{i}")
 
-                st.markdown(response)
+                # 토큰 없이 끝난 응답(캐시·빠른 경로·오류)이나 전달된 토큰과 다른 최종 답변은 전체를 표시
+                if not isinstance(streamed, str) or streamed.strip() != response.strip():
+                    answer_area.markdown(response)
+                if "cache" in result:
+                    st.caption(f"♻️ 캐시된 답변 (유사 질문: {result['cache']['question']})")
 
                 # 응답 저장 (steps 포함 — 나중에 verbose 로그 이력 표시에 사용)
                 st.session_state.messages.append({
@@ -0,0 +1,216 @@
+"""
+서킷 브레이커 모듈
+================
+Gemini 사용량 한도 초과, Materials Project·Crossref·Brave 장애 시에도 요청마다
+각자의 타임아웃을 기다린 뒤에야 fallback으로 넘어가는 문제를 막습니다.
+
+LLM 제공자·외부 도구별 브레이커를 프로세스 공유 레지스트리(get_breaker)로 관리합니다.
+
+- closed: 정상 호출. 최근 config.BREAKER_WINDOW개 호출 중 실패 비율이 config.BREAKER_FAILURE_RATE 이상이면
+  (최소 config.BREAKER_MIN_CALLS개) open으로 전환.
+  예외와 config.BREAKER_SLOW_CALL_SEC보다 느린 호출을 실패로 셈
+- open: 호출 없이 즉시 CircuitOpenError → 도구는 오류 Observation 또는 fallback, LLM은 보조 모델로 전환.
+  config.BREAKER_OPEN_SEC가 지나면 half-open
+- half-open: 시험 호출 1개만 허용. 성공하면 closed, 실패하면 다시 open
+
+상태는 메트릭 게이지 "breaker.<이름>.state"(0=closed, 1=half_open, 2=open)와
+카운터 "breaker.<이름>.opened", "breaker.<이름>.rejected"로 기록되고, Streamlit 사이드바에 표시됩니다.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from langchain_core.runnables import Runnable, RunnableConfig
+
+import config
+import metrics
+
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(RuntimeError):
+    """브레이커가 열려 있어 호출하지 않았음을 나타내는 예외."""
+
+    def __init__(self, name: str):
+        super().__init__(f"'{name}' 서킷 브레이커가 열려 있습니다 (최근 호출 실패율 초과).")
+        self.name = name
+
+
+class CircuitBreaker:
+    """
+    제공자·도구 하나의 서킷 브레이커 (스레드 안전).
+
+    Args:
+        name: 브레이커 이름 (예: "gemini", "crossref")
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.slow_call_sec = config.BREAKER_SLOW_CALL_SEC.get(name, config.BREAKER_SLOW_CALL_SEC["default"])
+        self._lock = threading.Lock()
+        self._window: Deque[bool] = deque(maxlen=config.BREAKER_WINDOW)  # True = 실패
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        metrics.gauge(f"breaker.{name}.state", _STATE_GAUGE[CLOSED])
+
+    # ---------- 상태 전환 (lock 안에서 호출) ----------
+    def _set_state(self, state: str) -> None:
+        self._state = state
+        metrics.gauge(f"breaker.{self.name}.state", _STATE_GAUGE[state])
+
+    def _open(self) -> None:
+        self._set_state(OPEN)
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        metrics.incr(f"breaker.{self.name}.opened")
+
+    def _close(self) -> None:
+        self._set_state(CLOSED)
+        self._window.clear()
+        self._probe_in_flight = False
+
+    # ---------- 공개 인터페이스 ----------
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= config.BREAKER_OPEN_SEC:
+                return HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """지금 호출해도 되는지 여부 (half-open이면 시험 호출 1개만 허용)."""
+        if not config.BREAKER_ENABLED:
+            return True
+        with self._lock:
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < config.BREAKER_OPEN_SEC:
+                    return False
+                self._set_state(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+            return True
+
+    def record(self, ok: bool, latency: float) -> None:
+        """호출 결과를 기록합니다 (느린 성공도 실패로 셈)."""
+        failed = not ok or latency > self.slow_call_sec
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if failed:
+                    self._open()
+                else:
+                    self._close()
+                return
+            self._window.append(failed)
+            if (
+                self._state == CLOSED
+                and len(self._window) >= config.BREAKER_MIN_CALLS
+                and sum(self._window) / len(self._window) >= config.BREAKER_FAILURE_RATE
+            ):
+                self._open()
+
+    def _abandon(self) -> None:
+        """결과 없이 끝난 호출(취소 등)의 시험 호출 자리를 반납합니다."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def call(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        브레이커를 거쳐 fn을 호출합니다.
+
+        Raises:
+            CircuitOpenError: 브레이커가 열려 있는 경우 (fn은 호출되지 않음)
+        """
+        if not config.BREAKER_ENABLED:
+            return fn(*args, **kwargs)
+        if not self.allow():
+            metrics.incr(f"breaker.{self.name}.rejected")
+            raise CircuitOpenError(self.name)
+        t0 = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record(False, time.monotonic() - t0)
+            raise
+        except BaseException:
+            self._abandon()
+            raise
+        self.record(True, time.monotonic() - t0)
+        return result
+
+    async def acall(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """call()의 비동기 버전 (fn은 코루틴 함수)."""
+        if not config.BREAKER_ENABLED:
+            return await fn(*args, **kwargs)
+        if not self.allow():
+            metrics.incr(f"breaker.{self.name}.rejected")
+            raise CircuitOpenError(self.name)
+        t0 = time.monotonic()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception:
+            self.record(False, time.monotonic() - t0)
+            raise
+        except BaseException:
+            self._abandon()  # 헤징에서 진 요청의 취소(CancelledError)는 실패로 세지 않음
+            raise
+        self.record(True, time.monotonic() - t0)
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        """사이드바·CLI 표시용 상태."""
+        state = self.state
+        with self._lock:
+            calls = len(self._window)
+            failure_rate = sum(self._window) / calls if calls else 0.0
+            retry_in = max(0.0, config.BREAKER_OPEN_SEC - (time.monotonic() - self._opened_at)) if state == OPEN else 0.0
+        return {"state": state, "calls": calls, "failure_rate": round(failure_rate, 2), "retry_in_sec": round(retry_in)}
+
+
+# ==================== 레지스트리 ====================
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """이름별 브레이커 (프로세스 공유, 최초 사용 시 생성)."""
+    with _registry_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """생성된 모든 브레이커의 상태 {이름: status()}."""
+    with _registry_lock:
+        breakers = dict(_breakers)
+    return {name: breaker.status() for name, breaker in sorted(breakers.items())}
+
+
+# ==================== LLM 래퍼 ====================
+class BreakerLLM(Runnable):
+    """
+    LLM 호출을 서킷 브레이커로 감싼 Runnable.
+    브레이커가 열려 있으면 바로 CircuitOpenError를 던지므로 with_fallbacks()·HedgedLLM이 즉시 보조 모델로 넘어갑니다.
+
+    Args:
+        llm: 감쌀 LLM
+        name: 브레이커 이름 (예: "gemini")
+    """
+
+    def __init__(self, llm: Runnable, name: str):
+        self.llm = llm
+        self.breaker = get_breaker(name)
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return self.breaker.call(self.llm.invoke, input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        return await self.breaker.acall(self.llm.ainvoke, input, config, **kwargs)
@@ -37,6 +37,31 @@ VECTOR_DB_PATH = PROJECT_ROOT / "chroma_db"
 DEFAULT_PDF_PATH = PROJECT_ROOT / "data" / "pdfs"
 
 
+def _parse_shards(spec: str) -> dict:
+    """
+    "이름=경로,이름=경로" 형식의 샤드 설정을 {이름: Path}로 변환합니다.
+    상대 경로는 PROJECT_ROOT 기준입니다.
+    """
+    shards = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, path = (part.strip() for part in item.split("=", 1))
+        if name and path:
+            shards[name] = Path(path) if Path(path).is_absolute() else PROJECT_ROOT / path
+    return shards
+
+
+# VectorDB 샤드 (코퍼스·연도·주제별로 분리된 Chroma 디렉토리, 각각 독립적으로 재구축 가능)
+# 예: VECTOR_DB_SHARDS="alloys=chroma_alloys,barriers=chroma_barriers"
+# 미설정 시 VECTOR_DB_PATH 단일 DB 사용. 첫 번째 샤드가 기본(primary) DB입니다.
+VECTOR_DB_SHARDS = _parse_shards(os.getenv("VECTOR_DB_SHARDS", "")) or {"default": VECTOR_DB_PATH}
+
+# blue/green 재구축 (index_versions.py): 새 버전을 `<DB 경로>.versions/`에 구축 후 `<DB 경로>.current` 포인터 교체
+VECTOR_DB_KEEP_VERSIONS = 2  # 보관할 버전 수 (활성 + rollback용)
+VECTOR_DB_POINTER_CHECK_SEC = 5  # 실행 중인 프로세스가 포인터 변경을 확인하는 주기 (초)
+
+
 # ==================== API 키 설정 ====================
 # Google Gemini API 키
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -64,11 +89,27 @@ BRAVE_API_KEY = os.getenv("BRAVE_API_KEY")
 LLM_MODEL_NAME = "gemini-2.5-flash"
 LLM_TEMPERATURE = 0.0  # 0에 가까울수록 결정론적, 1에 가까울수록 창의적
 LLM_MAX_OUTPUT_TOKENS = 2048  # 최대 출력 토큰 수
-LLM_STREAMING = False  # ReAct agent에서 streaming은 파싱 오류 유발 — False 유지
+# Final Answer 토큰 스트리밍 (streaming.py): 토큰은 콜백으로만 전달하고 ReAct 파싱은 완성된 응답으로 수행
+LLM_STREAMING = True
+
+# LLM 응답 캐시(llm_cache.py): temperature 0인 호출의 (모델 설정, 전체 프롬프트) → 응답을 SQLite에 저장
+LLM_CACHE = True
+LLM_CACHE_PATH = PROJECT_ROOT / "llm_cache.sqlite3"
+LLM_CACHE_MAX_ENTRIES = 5000
+LLM_CACHE_MAX_MB = 100
 
 # Groq fallback 모델 설정 (Gemini 실패 시 자동 사용)
 # 무료 티어: llama-3.3-70b-versatile 권장
 GROQ_MODEL_NAME = os.getenv("GROQ_MODEL_NAME", "openai/gpt-oss-20b")
+# Gemini → Groq 전환 방식 (GROQ_API_KEY 설정 시):
+#   "fallback": Gemini가 예외를 던진 뒤 Groq로 재시도 (with_fallbacks)
+#   "hedge": Gemini 응답이 최근 지연 백분위보다 늦으면 Groq에도 요청, 먼저 온 응답 사용 (hedging.py)
+LLM_FAILOVER_MODE = os.getenv("LLM_FAILOVER_MODE", "fallback")
+LLM_HEDGE_PERCENTILE = 90  # 이 백분위의 Gemini 응답 시간이 지나면 Groq에도 요청
+LLM_HEDGE_WINDOW = 50  # 백분위 계산에 사용할 최근 응답 수
+LLM_HEDGE_MIN_SAMPLES = 5  # 표본이 이보다 적으면 LLM_HEDGE_INITIAL_DELAY_SEC 사용
+LLM_HEDGE_INITIAL_DELAY_SEC = 8.0
+LLM_HEDGE_MIN_DELAY_SEC = 1.0  # 헤징 지연의 하한 (이보다 빠른 응답은 캐시 적중으로 보고 표본에서 제외)
 
 
 # ==================== Embedding 모델 설정 ====================
@@ -85,19 +126,124 @@ CHUNK_OVERLAP = 100  # 청크 간 오버랩 크기
 # VectorDB 검색 파라미터
 RETRIEVAL_TOP_K = 10  # 검색 시 반환할 상위 문서 수
 
+# 검색 엔진 선택: "chroma" (기본, Chroma HNSW) | "ivfpq" (대규모 코퍼스용 IVF-PQ 근사 검색)
+#               | "reduced" (PCA/prefix 차원 축소 검색 + 원본 벡터 재채점)
+# ivfpq 사용 전 `python ann_index.py --train`, reduced 사용 전 `python reduced_index.py --build` 실행
+# 근사 검색 엔진은 기본 VectorDB(VECTOR_DB_PATH)만 검색 (샤드 fan-out 없음)
+RETRIEVAL_ENGINE = os.getenv("RETRIEVAL_ENGINE", "chroma")
+ANN_FILTER_OVERSAMPLE = 4  # 계층형 검색의 논문 필터를 적용할 때 근사 인덱스에서 더 찾을 후보 배수
+IVFPQ_INDEX_PATH = PROJECT_ROOT / "ivfpq_index"
+IVFPQ_NLIST = 1024  # coarse 셀 수 (대략 sqrt(N) ~ 4*sqrt(N))
+IVFPQ_M = 64  # PQ 부분공간 수 = 벡터당 코드 바이트 수 (임베딩 차원의 약수여야 함)
+IVFPQ_NPROBE = 16  # 검색 시 탐색할 셀 수 (클수록 recall↑, 속도↓)
+IVFPQ_TRAIN_SAMPLE = 100000  # 학습에 사용할 샘플 벡터 수
+REDUCED_INDEX_PATH = PROJECT_ROOT / "reduced_index"
+REDUCED_METHOD = "pca"  # "pca" | "prefix" (Matryoshka 계열 임베딩 모델)
+REDUCED_DIM = 256  # 축소 차원
+REDUCED_RERANK_K = 100  # 원본 벡터로 재채점할 후보 수
+
+# 정규화된 청크 메타데이터 (doc_table.py): 문서 단위 필드·C-P-P 문자열을 압축 테이블 한 곳에 저장하고
+# 청크에는 문서 ID·C-P-P 행 번호만 저장 (새로 생성하는 DB에 적용)
+NORMALIZED_METADATA = True
+
+# Chroma HNSW 파라미터 (컬렉션 생성 시 적용, 기존 DB의 search_ef는 create_or_load_vectordb(hnsw={"search_ef": ...})로 명시할 때만 변경)
+# 조정 기준: `python hnsw_benchmark.py`로 recall@k·지연·구축 시간을 비교
+CHROMA_HNSW_SPACE = "l2"  # "l2" | "cosine" | "ip" (생성 후 변경 불가)
+CHROMA_HNSW_M = 16  # 노드당 최대 이웃 수 (클수록 recall↑, 메모리·구축 시간↑)
+CHROMA_HNSW_CONSTRUCTION_EF = 100  # 구축 시 후보 리스트 크기 (클수록 그래프 품질↑, 구축 시간↑)
+CHROMA_HNSW_SEARCH_EF = 100  # 검색 시 후보 리스트 크기 (클수록 recall↑, 지연↑)
+
+# 2단계 계층형 검색: 논문 단위 인덱스(doc_index.py)로 상위 N개 논문을 고른 뒤 그 논문의 청크만 검색
+# 논문 인덱스가 없으면 평면 청크 검색으로 동작
+HIERARCHICAL_RETRIEVAL = True
+DOC_INDEX_COLLECTION = "paper_index"  # 청크와 같은 Chroma 디렉토리의 별도 컬렉션
+DOC_TOP_N = 5  # 쿼리당 선택할 논문 수
+
+# C-P-P 전용 인덱스(cpp_index.py): "composition | process | property" 문자열만 임베딩한 소형 컬렉션
+# "cpp_first"이면 vectordb_search가 C-P-P 인덱스를 먼저 검색하고, 결과가 부족하면 전체 청크 검색으로 대체
+# 기본값은 "chunks" (C-P-P 결과에는 본문이 없으므로 환경 변수로 opt-in)
+VECTORDB_SEARCH_MODE = os.getenv("VECTORDB_SEARCH_MODE", "chunks")  # "cpp_first" | "chunks"
+CPP_INDEX_COLLECTION = "cpp_index"
+CPP_MIN_SCORE = 0.5  # 이 cosine 유사도 이상인 C-P-P 결과만 사용
+CPP_MIN_RESULTS = 3  # 쿼리당 사용 가능한 결과가 이보다 적으면 전체 청크 검색으로 대체
+
+# 검색 후처리: MMR 다양화 + 동일 출처·페이지 인접 청크 병합
+CONSOLIDATE_RESULTS = True
+RETRIEVAL_FETCH_K = 30  # MMR 후보 수 (top_k보다 크게)
+MMR_LAMBDA = 0.7  # 1.0 = 유사도만, 0.0 = 다양성만
+
+# 선행 검색: run_agent()가 질문 도착 즉시 원래 질문으로 vectordb 검색을 시작 (첫 LLM 호출과 동시)
+# 에이전트의 첫 vectordb_search 입력과 질문의 임베딩 유사도가 임계값 이상이면 선행 검색 결과를 바로 사용
+VECTORDB_PREFETCH = True
+VECTORDB_PREFETCH_MIN_SIMILARITY = 0.85
+
+# vectordb_search Observation 토큰 예산 (점수 높은 결과부터 채움)
+VECTORDB_OBSERVATION_TOKEN_BUDGET = 1500
+VECTORDB_FIELD_TOKEN_CAP = 60  # Composition/Process/Property 필드별 최대 토큰 수
+
 
 # ==================== Agent 설정 ====================
 # ReAct Agent의 최대 반복 횟수 (무한 루프 방지)
 AGENT_MAX_ITERATIONS = 10
-# Agent 타임아웃 (초 단위)
+# Agent 타임아웃 (초 단위) — 요청 마감 시각으로 도구 타임아웃에도 전파 (deadline.py)
 AGENT_TIMEOUT = 120
+AGENT_MIN_STEP_SEC = 10  # 남은 시간이 이보다 적으면 새 반복(LLM 호출 + 도구)을 시작하지 않음
+TOOL_MIN_TIMEOUT_SEC = 2  # 남은 시간이 이보다 적으면 도구를 실행하지 않음 (도구 타임아웃의 하한)
+# Scratchpad 압축(scratchpad.py): 최근 턴의 Observation만 그대로 두고, 오래된 것은 핵심 사실 요약으로 대체
+SCRATCHPAD_COMPRESSION = True
+SCRATCHPAD_KEEP_RECENT = 2  # 그대로 유지할 최근 턴 수
+SCRATCHPAD_COMPACT_TOKENS = 200  # 요약된 Observation 하나의 최대 토큰 수
+SCRATCHPAD_TOOL_TOKEN_BUDGET = {  # 유지되는 Observation의 도구별 최대 토큰 수
+    "vectordb_search": 1600,
+    "crossref_search": 900,
+    "web_search": 700,
+    "materials_project": 400,
+    "default": 800,
+}
+# 에피소드 단위 도구 호출 메모이제이션(tool_memo.py): 같은 요청 안에서 같은 도구·입력 재호출 시 이전 Observation 반환
+TOOL_MEMO = True
+TOOL_MEMO_CASE_INSENSITIVE = ("vectordb_search", "crossref_search", "web_search")  # 입력 대소문자를 무시할 도구
+# 의미 기반 답변 캐시(answer_cache.py): 과거 질문과 임베딩 유사도가 임계값 이상이면 저장된 답변 반환
+ANSWER_CACHE = True
+ANSWER_CACHE_PATH = PROJECT_ROOT / "answer_cache"
+ANSWER_CACHE_MIN_SIMILARITY = 0.95  # cosine 유사도 (높을수록 보수적)
+ANSWER_CACHE_TTL_SEC = 7 * 24 * 3600  # 저장 후 유효 기간
+ANSWER_CACHE_MAX_ENTRIES = 1000
+ANSWER_CACHE_PREWARM_QUESTIONS = [  # `python answer_cache.py --prewarm` 기본 질문 (app.py 예시 질문)
+    "Cu-Mg 합금의 저항률은?",
+    "Cu2O의 밴드갭은?",
+    "electromigration에 관한 최신 논문을 찾아줘",
+    "구리 합금의 시장 동향과 최신 뉴스에 대해 알려줘",
+]
+# Agent 실행 방식: "react" (턴당 Action 1개) | "parallel" (한 턴에 독립적인 Action 여러 개를 동시 실행, parallel_agent.py)
+AGENT_MODE = os.getenv("AGENT_MODE", "react")
+AGENT_MAX_PARALLEL_ACTIONS = 4  # parallel 모드에서 한 턴에 실행할 최대 Action 수
+# 빠른 경로 라우터(router.py): 화학식+물성 조회, 영어 주제어 논문 검색은 ReAct 루프 없이 도구를 바로 호출
+FAST_PATH_ROUTER = True
+ROUTER_MAX_QUERY_CHARS = 80  # 이보다 긴 질문은 항상 전체 에이전트로 처리
+ROUTER_LLM_ANSWER = False  # True면 도구 결과를 LLM 1회 호출로 문장화 (False면 템플릿 답변, LLM 호출 없음)
 
 
 # ==================== Tool 설정 ====================
-# Materials Project API 타임아웃
-MP_API_TIMEOUT = 30  # 초
-# Crossref API 타임아웃
-CROSSREF_API_TIMEOUT = 30  # 초
+# Materials Project API 타임아웃 (mp-api 클라이언트 기본값과 같은 상한)
+MP_API_TIMEOUT = 20  # 초
+# Crossref API 타임아웃 (habanero 기본값과 같은 상한)
+CROSSREF_API_TIMEOUT = 5  # 초
+# 웹 검색(Brave / DuckDuckGo) 타임아웃
+WEB_SEARCH_TIMEOUT = 10  # 초
+# 위 도구 타임아웃은 상한이며, 에이전트 실행 중에는 요청의 남은 시간으로 더 줄어듭니다 (request_context.tool_timeout)
+
+# 서킷 브레이커(circuit_breaker.py): LLM 제공자·외부 도구별로 최근 실패율이 높으면 호출 없이 즉시 실패/fallback
+BREAKER_ENABLED = True
+BREAKER_WINDOW = 20  # 실패율 계산에 사용할 최근 호출 수
+BREAKER_MIN_CALLS = 5  # 이보다 호출이 적으면 열지 않음
+BREAKER_FAILURE_RATE = 0.5  # 최근 호출 중 실패(예외·느린 호출) 비율이 이 이상이면 open
+BREAKER_OPEN_SEC = 30  # open 유지 시간 (이후 시험 호출 1개 허용)
+BREAKER_SLOW_CALL_SEC = {  # 이보다 오래 걸린 호출은 실패로 셈 (초)
+    "gemini": 45,
+    "groq": 30,
+    "default": 15,
+}
 
 
 # ==================== 로깅 설정 ====================
@@ -138,14 +284,18 @@ def print_config():
     print("="*50)
     print(f"📁 프로젝트 루트: {PROJECT_ROOT}")
     print(f"📁 VectorDB 경로: {VECTOR_DB_PATH}")
+    if len(VECTOR_DB_SHARDS) > 1:
+        print(f"🧩 VectorDB 샤드: {', '.join(VECTOR_DB_SHARDS)}")
     print(f"🤖 LLM 모델: {LLM_MODEL_NAME}")
     print(f"🌡️  Temperature: {LLM_TEMPERATURE}")
+    print(f"🧭 Agent 모드: {AGENT_MODE}")
     print(f"🔢 Embedding 모델: {EMBEDDING_MODEL_NAME}")
     print(f"🖥️  Ollama URL: {OLLAMA_BASE_URL}")
     print(f"📏 청크 크기: {CHUNK_SIZE}")
     print(f"📊 검색 Top-K: {RETRIEVAL_TOP_K}")
+    print(f"🔎 검색 엔진: {RETRIEVAL_ENGINE}")
     print(f"🔑 Materials Project API: {'설정됨' if MATERIALS_PROJECT_API_KEY else '미설정'}")
-    print(f"🔑 Groq API (fallback): {'설정됨 → ' + GROQ_MODEL_NAME if GROQ_API_KEY else '미설정 (Gemini만 사용)'}")
+    print(f"🔑 Groq API ({LLM_FAILOVER_MODE}): {'설정됨 → ' + GROQ_MODEL_NAME if GROQ_API_KEY else '미설정 (Gemini만 사용)'}")
     print(f"📧 Crossref mailto: {CROSSREF_MAILTO}")
     print("="*50 + "\n")
 
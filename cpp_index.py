@@ -0,0 +1,125 @@
+"""
+C-P-P 전용 벡터 인덱스 모듈
+==========================
+청크마다 "composition | process | property" 짧은 문자열만 임베딩한 보조 인덱스입니다.
+800토큰 청크 전체를 임베딩한 본 컬렉션보다 훨씬 작고 빠르며,
+에이전트가 주로 찾는 조성·공정·물성 값에 직접 매칭됩니다.
+
+- 세 필드가 모두 "N/A"인 청크는 제외
+- 항목 ID는 원본 청크 ID와 같음 (필요 시 본문 조회 가능)
+- 메타데이터: 정규화된 DB는 청크와 같은 (doc, cpp) 참조만 저장하고 검색 시 doc_table.expand_metadata()로 조인
+- 같은 Chroma 디렉토리의 별도 컬렉션(config.CPP_INDEX_COLLECTION)에 저장
+
+VectorDB 구축 파이프라인(C-P-P 추출 시)에서 자동으로 구축되며,
+기존 DB에는 `python cpp_index.py`로 추가할 수 있습니다 (index_versions.rebuild_indexes로 새 버전을 구축해 교체).
+"""
+
+import logging
+import sys
+import threading
+import weakref
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from typing import Any, Dict, Optional
+
+import config
+from doc_table import expand_metadata
+from index_versions import building_collection, swap_collection
+
+
+_CPP_KEYS = ("composition", "process", "property")
+
+
+def cpp_text(metadata: Dict[str, Any]) -> Optional[str]:
+    """청크 메타데이터를 "composition | process | property" 문자열로 만듭니다 (모두 N/A면 None)."""
+    values = [str(metadata.get(key) or "N/A").strip() or "N/A" for key in _CPP_KEYS]
+    if all(v == "N/A" for v in values):
+        return None
+    return " | ".join(values)
+
+
+# ==================== 구축 ====================
+def build_cpp_index(db, batch_size: int = 256) -> int:
+    """
+    청크 컬렉션의 C-P-P 메타데이터로 C-P-P 전용 인덱스를 (재)구축합니다.
+
+    Args:
+        db: Chroma VectorDB 인스턴스 (청크 컬렉션, db.embeddings로 임베딩)
+        batch_size: 한 번에 임베딩할 항목 수
+
+    Returns:
+        인덱스에 저장된 항목 수
+    """
+    collection = db._collection
+    total = collection.count()
+
+    # 임시 컬렉션에 구축한 뒤 기존 C-P-P 인덱스와 교체
+    cpp_collection = building_collection(db._client, config.CPP_INDEX_COLLECTION)
+
+    print(f"🧪 C-P-P 인덱스 구축 중 (총 {total}개 청크)...")
+    added = 0
+    for offset in range(0, total, batch_size):
+        batch = collection.get(include=["metadatas"], limit=batch_size, offset=offset)
+        if not batch["ids"]:
+            break
+        ids, texts, metadatas = [], [], []
+        for chunk_id, raw in zip(batch["ids"], batch["metadatas"]):
+            meta = expand_metadata(db, raw)
+            text = cpp_text(meta)
+            if text is None:
+                continue
+            ids.append(chunk_id)
+            texts.append(text)
+            if raw and "doc" in raw:
+                # 정규화된 DB: 문서 테이블 참조만 저장 (검색 시 expand_metadata로 조인)
+                metadatas.append({key: raw[key] for key in ("doc", "cpp", "page") if key in raw})
+            else:
+                metadatas.append({
+                    "source": meta.get("source", "Unknown"),
+                    "page": meta.get("page", -1),
+                    **{key: meta.get(key, "N/A") for key in _CPP_KEYS},
+                })
+        if not ids:
+            continue
+        cpp_collection.add(
+            ids=ids,
+            embeddings=db.embeddings.embed_documents(texts),
+            documents=texts,
+            metadatas=metadatas
+        )
+        added += len(ids)
+
+    swap_collection(db._client, config.CPP_INDEX_COLLECTION, cpp_collection)
+    _cpp_collections.pop(db, None)
+    print(f"✅ C-P-P 인덱스 구축 완료 ({added}개 항목, 모두 N/A인 {total - added}개 제외)\n")
+    return added
+
+
+# ==================== 조회 ====================
+# VectorDB 핸들별 C-P-P 인덱스 컬렉션 캐시 (없으면 None)
+_cpp_collections: "weakref.WeakKeyDictionary[Any, Optional[Any]]" = weakref.WeakKeyDictionary()
+_cpp_collections_lock = threading.Lock()
+
+
+def get_cpp_collection(db):
+    """VectorDB의 C-P-P 인덱스 컬렉션을 반환합니다 (없거나 비어 있으면 None)."""
+    with _cpp_collections_lock:
+        if db not in _cpp_collections:
+            try:
+                collection = db._client.get_collection(config.CPP_INDEX_COLLECTION)
+                _cpp_collections[db] = collection if collection.count() > 0 else None
+            except Exception:
+                logging.info("C-P-P 인덱스가 없습니다 — 전체 청크 검색을 사용합니다. (`python cpp_index.py`로 구축)")
+                _cpp_collections[db] = None
+        return _cpp_collections[db]
+
+
+# ==================== CLI ====================
+if __name__ == "__main__":
+    from index_versions import rebuild_indexes
+
+    # 서빙 중인 DB를 직접 수정하지 않고 새 버전(청크 복사 + C-P-P 인덱스 재구축)으로 교체
+    for name, path in config.VECTOR_DB_SHARDS.items():
+        if rebuild_indexes(Path(path), build_cpp_index, keep=(config.DOC_INDEX_COLLECTION,)) is None:
+            print(f"❌ C-P-P 인덱스 재구축 실패: {name} ({path})")
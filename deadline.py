@@ -0,0 +1,56 @@
+"""
+요청 마감 시각 기반 에이전트 실행 모듈
+==================================
+AgentExecutor의 max_execution_time은 반복을 시작할 때만 확인하므로, 에피소드 후반에
+고정 타임아웃(MP_API_TIMEOUT 등)을 가진 도구 호출이 시작되면 요청이 config.AGENT_TIMEOUT을
+크게 넘길 수 있습니다.
+
+- 마감 시각은 요청 컨텍스트(request_context.request_scope(timeout=...))에 저장
+- 도구: request_context.tool_timeout(기본값)으로 남은 시간에 맞춘 타임아웃 사용
+- DeadlineAgentExecutor:
+  - 남은 시간이 config.AGENT_MIN_STEP_SEC 미만이면 다음 반복(LLM 호출 + 도구)을 시작하지 않음
+  - 남은 시간이 config.TOOL_MIN_TIMEOUT_SEC 미만이면 도구를 실행하지 않고 건너뛴 사실을 Observation으로 기록
+  - 중단·건너뛴 횟수는 "agent.deadline.stopped", "agent.deadline.skipped_actions" 카운터로 기록
+
+병렬 모드(parallel_agent.ParallelAgentExecutor)도 이 클래스를 상속하므로 Action별로 같은 검사를 거칩니다.
+"""
+
+from langchain.agents import AgentExecutor
+from langchain_core.agents import AgentStep
+
+import config
+import metrics
+import prompts
+import request_context
+
+
+def _out_of_time() -> bool:
+    """도구를 시작하기에 남은 시간이 부족한지 여부."""
+    left = request_context.remaining()
+    if left is None or left >= config.TOOL_MIN_TIMEOUT_SEC:
+        return False
+    metrics.incr("agent.deadline.skipped_actions")
+    return True
+
+
+class DeadlineAgentExecutor(AgentExecutor):
+    """요청 마감 시각을 넘기지 않도록 새 반복·Action 시작을 제한하는 AgentExecutor."""
+
+    def _should_continue(self, iterations: int, time_elapsed: float) -> bool:
+        if not super()._should_continue(iterations, time_elapsed):
+            return False
+        left = request_context.remaining()
+        if left is not None and left < config.AGENT_MIN_STEP_SEC:
+            metrics.incr("agent.deadline.stopped")
+            return False
+        return True
+
+    def _perform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None) -> AgentStep:
+        if _out_of_time():
+            return AgentStep(action=agent_action, observation=prompts.DEADLINE_SKIPPED_NOTE)
+        return super()._perform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+
+    async def _aperform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None) -> AgentStep:
+        if _out_of_time():
+            return AgentStep(action=agent_action, observation=prompts.DEADLINE_SKIPPED_NOTE)
+        return await super()._aperform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
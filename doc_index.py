@@ -0,0 +1,159 @@
+"""
+논문(문서) 단위 인덱스 모듈
+==========================
+2단계 계층형 검색(hierarchical retrieval)을 위한 논문 단위 인덱스입니다.
+
+- 구축: 같은 source(논문)의 청크 임베딩 평균(정규화된 centroid)과
+  청크별 C-P-P 메타데이터를 빈도순으로 집계하여, 같은 Chroma 디렉토리의
+  별도 컬렉션(config.DOC_INDEX_COLLECTION)에 논문당 1개 항목으로 저장
+- 검색: 쿼리와 가까운 상위 N개 논문을 먼저 고른 뒤(select_sources),
+  청크 검색은 해당 논문의 청크로만 제한 (source 메타데이터 필터)
+
+VectorDB 구축 파이프라인(vectordb.build_vectordb_pipeline)에서 자동으로 구축되며,
+기존 DB에는 `python doc_index.py`로 추가할 수 있습니다 (index_versions.rebuild_indexes로 새 버전을 구축해 교체).
+"""
+
+import logging
+import sys
+import threading
+import weakref
+from collections import Counter, defaultdict
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+import config
+import metrics
+from doc_table import expand_metadata
+from index_versions import building_collection, swap_collection
+
+
+_CPP_KEYS = ("composition", "process", "property")
+_MAX_VALUES_PER_FIELD = 5  # 논문별로 집계할 C-P-P 필드당 최대 값 개수
+
+
+# ==================== 구축 ====================
+def _aggregate_cpp(values: List[str]) -> str:
+    """청크별 C-P-P 값을 빈도순으로 집계합니다 ("N/A"·빈 값 제외)."""
+    counts = Counter(v.strip() for v in values if v and v.strip() and v.strip() != "N/A")
+    if not counts:
+        return "N/A"
+    return "; ".join(value for value, _ in counts.most_common(_MAX_VALUES_PER_FIELD))
+
+
+def build_doc_index(db, batch_size: int = 5000) -> int:
+    """
+    청크 컬렉션으로부터 논문 단위 인덱스를 (재)구축합니다.
+
+    Args:
+        db: Chroma VectorDB 인스턴스 (청크 컬렉션)
+        batch_size: 한 번에 읽을 청크 수
+
+    Returns:
+        인덱스에 저장된 논문 수
+    """
+    collection = db._collection
+    total = collection.count()
+
+    sums: Dict[str, np.ndarray] = {}
+    counts: Dict[str, int] = defaultdict(int)
+    cpp: Dict[str, Dict[str, List[str]]] = defaultdict(lambda: defaultdict(list))
+    for offset in range(0, total, batch_size):
+        batch = collection.get(include=["embeddings", "metadatas"], limit=batch_size, offset=offset)
+        if not batch["ids"]:
+            break
+        vectors = np.asarray(batch["embeddings"], dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        for vector, meta in zip(vectors, batch["metadatas"]):
+            meta = expand_metadata(db, meta)
+            source = meta.get("source", "Unknown")
+            sums[source] = sums[source] + vector if source in sums else vector.copy()
+            counts[source] += 1
+            for key in _CPP_KEYS:
+                cpp[source][key].append(meta.get(key, "N/A"))
+
+    # 임시 컬렉션에 구축한 뒤 기존 논문 인덱스와 교체
+    doc_collection = building_collection(db._client, config.DOC_INDEX_COLLECTION)
+    if not sums:
+        swap_collection(db._client, config.DOC_INDEX_COLLECTION, doc_collection)
+        _doc_collections.pop(db, None)
+        return 0
+
+    sources = list(sums)
+    centroids = np.stack([sums[s] / counts[s] for s in sources])
+    centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+    metadatas = [
+        {
+            "source": source,
+            "n_chunks": counts[source],
+            **{key: _aggregate_cpp(cpp[source][key]) for key in _CPP_KEYS},
+        }
+        for source in sources
+    ]
+    for start in range(0, len(sources), batch_size):
+        end = start + batch_size
+        doc_collection.add(
+            ids=sources[start:end],
+            embeddings=centroids[start:end],
+            documents=[
+                " | ".join([meta["source"]] + [meta[key] for key in _CPP_KEYS])
+                for meta in metadatas[start:end]
+            ],
+            metadatas=metadatas[start:end]
+        )
+    swap_collection(db._client, config.DOC_INDEX_COLLECTION, doc_collection)
+    _doc_collections.pop(db, None)
+    print(f"✅ 논문 인덱스 구축 완료 ({len(sources)}개 논문, {total}개 청크)\n")
+    return len(sources)
+
+
+# ==================== 검색 ====================
+# VectorDB 핸들별 논문 인덱스 컬렉션 캐시 (없으면 None — 평면 검색으로 대체)
+_doc_collections: "weakref.WeakKeyDictionary[Any, Optional[Any]]" = weakref.WeakKeyDictionary()
+_doc_collections_lock = threading.Lock()
+
+
+def get_doc_collection(db):
+    """VectorDB의 논문 인덱스 컬렉션을 반환합니다 (없거나 비어 있으면 None)."""
+    with _doc_collections_lock:
+        if db not in _doc_collections:
+            try:
+                collection = db._client.get_collection(config.DOC_INDEX_COLLECTION)
+                _doc_collections[db] = collection if collection.count() > 0 else None
+            except Exception:
+                logging.info("논문 인덱스가 없습니다 — 평면 청크 검색을 사용합니다. (`python doc_index.py`로 구축)")
+                _doc_collections[db] = None
+        return _doc_collections[db]
+
+
+def select_sources(db, query_embeddings, top_n: int = config.DOC_TOP_N) -> Optional[List[str]]:
+    """
+    쿼리별 상위 top_n개 논문을 고르고, 그 합집합(source 목록)을 반환합니다.
+    다중 쿼리도 논문 인덱스 조회 1회 + 청크 조회 1회로 처리하기 위해 합집합을 사용합니다.
+
+    Returns:
+        source 리스트. 논문 인덱스가 없거나 논문 수가 top_n 이하라 가지치기 효과가 없으면 None
+    """
+    doc_collection = get_doc_collection(db)
+    if doc_collection is None:
+        return None
+    n_docs = doc_collection.count()
+    if n_docs <= top_n:
+        return None
+
+    res = doc_collection.query(query_embeddings=list(query_embeddings), n_results=top_n, include=[])
+    sources = list(dict.fromkeys(source for ids in res["ids"] for source in ids))
+    metrics.observe("vectordb.hierarchical.papers_pruned_ratio", 1 - len(sources) / n_docs)
+    return sources
+
+
+# ==================== CLI ====================
+if __name__ == "__main__":
+    from index_versions import rebuild_indexes
+
+    # 서빙 중인 DB를 직접 수정하지 않고 새 버전(청크 복사 + 논문 인덱스 재구축)으로 교체
+    for name, path in config.VECTOR_DB_SHARDS.items():
+        if rebuild_indexes(Path(path), build_doc_index, keep=(config.CPP_INDEX_COLLECTION,)) is None:
+            print(f"❌ 논문 인덱스 재구축 실패: {name} ({path})")
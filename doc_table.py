@@ -0,0 +1,225 @@
+"""
+정규화된 청크 메타데이터 모듈
+============================
+청크마다 반복 저장되던 문서 단위 필드(source, total_pages)와 긴 C-P-P 문자열을
+Chroma 디렉토리 안의 압축 테이블(doc_table.json.gz) 한 곳으로 옮깁니다.
+
+- 문서 테이블: 짧은 문서 ID("d0", "d1", ...) → {"source", "total_pages"}
+- C-P-P 테이블: 중복 제거된 (composition, process, property) 행 리스트
+- 청크 메타데이터: {"doc": 문서 ID, "cpp": C-P-P 행 번호, "page", "start_index"}만 저장
+
+검색 결과는 expand_metadata()로 원래 형식({"source", "total_pages", "composition", ...})으로
+다시 합쳐지므로(딕셔너리 조회) 호출 코드는 두 형식을 구분할 필요가 없습니다.
+테이블이 없는 기존(비정규화) DB의 메타데이터는 그대로 통과합니다.
+
+사용법:
+    python doc_table.py --measure     # 현재 DB로 비정규화/정규화 레이아웃의 디스크 크기·로드 시간 비교
+"""
+
+import gzip
+import json
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from typing import Any, Dict, List, Optional, Tuple
+
+
+TABLE_FILE = "doc_table.json.gz"
+_DOC_KEYS = ("source", "total_pages")
+_CPP_KEYS = ("composition", "process", "property")
+
+
+class DocTable:
+    """
+    문서 테이블 + C-P-P 문자열 테이블.
+
+    Attributes:
+        documents: {문서 ID: {"source": str, "total_pages": int}}
+        cpp_rows: [[composition, process, property], ...]
+    """
+
+    def __init__(self, documents: Optional[Dict[str, Dict[str, Any]]] = None, cpp_rows: Optional[List[List[str]]] = None):
+        self.documents = documents or {}
+        self.cpp_rows = cpp_rows or []
+        self._doc_ids = {doc["source"]: doc_id for doc_id, doc in self.documents.items()}
+        self._cpp_ids = {tuple(row): i for i, row in enumerate(self.cpp_rows)}
+
+    # ---------- 정규화 ----------
+    def normalize(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """청크 메타데이터를 (문서 ID, C-P-P 행 번호) 참조 형식으로 바꾸고 테이블에 등록합니다."""
+        source = metadata.get("source", "Unknown")
+        doc_id = self._doc_ids.get(source)
+        if doc_id is None:
+            doc_id = f"d{len(self.documents)}"
+            self._doc_ids[source] = doc_id
+            self.documents[doc_id] = {key: metadata.get(key) for key in _DOC_KEYS if metadata.get(key) is not None}
+            self.documents[doc_id]["source"] = source
+
+        compact = {k: v for k, v in metadata.items() if k not in _DOC_KEYS and k not in _CPP_KEYS}
+        compact["doc"] = doc_id
+        if any(key in metadata for key in _CPP_KEYS):
+            row = tuple(str(metadata.get(key, "N/A")) for key in _CPP_KEYS)
+            cpp_id = self._cpp_ids.get(row)
+            if cpp_id is None:
+                cpp_id = len(self.cpp_rows)
+                self._cpp_ids[row] = cpp_id
+                self.cpp_rows.append(list(row))
+            compact["cpp"] = cpp_id
+        return compact
+
+    # ---------- 조인 ----------
+    def expand(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """참조 형식의 청크 메타데이터를 원래 형식으로 되돌립니다."""
+        if "doc" not in metadata:
+            return metadata
+        full = {k: v for k, v in metadata.items() if k not in ("doc", "cpp")}
+        full.update(self.documents.get(metadata["doc"], {}))
+        if "cpp" in metadata:
+            full.update(zip(_CPP_KEYS, self.cpp_rows[metadata["cpp"]]))
+        return full
+
+    def doc_ids_for(self, sources: List[str]) -> List[str]:
+        return [self._doc_ids[s] for s in sources if s in self._doc_ids]
+
+    # ---------- 저장/로드 ----------
+    def save(self, directory: str) -> Path:
+        path = Path(directory) / TABLE_FILE
+        payload = {"format_version": 1, "documents": self.documents, "cpp_rows": self.cpp_rows}
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            f.write(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+        tmp.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["DocTable"]:
+        path = Path(directory) / TABLE_FILE
+        if not path.exists():
+            return None
+        with gzip.open(path, "rb") as f:
+            payload = json.loads(f.read().decode("utf-8"))
+        return cls(payload["documents"], payload["cpp_rows"])
+
+
+def normalize_metadatas(metadatas: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], DocTable]:
+    """메타데이터 리스트를 정규화하고 테이블을 함께 반환합니다."""
+    table = DocTable()
+    return [table.normalize(meta or {}) for meta in metadatas], table
+
+
+# ==================== DB별 테이블 캐시 ====================
+_tables: "weakref.WeakKeyDictionary[Any, Optional[DocTable]]" = weakref.WeakKeyDictionary()
+_tables_lock = threading.Lock()
+
+
+def persist_directory_of(db) -> str:
+    """Chroma 핸들의 저장 경로."""
+    return db._client.get_settings().persist_directory
+
+
+def get_doc_table(db) -> Optional[DocTable]:
+    """VectorDB의 문서 테이블을 반환합니다 (비정규화 DB면 None)."""
+    with _tables_lock:
+        if db not in _tables:
+            _tables[db] = DocTable.load(persist_directory_of(db))
+        return _tables[db]
+
+
+def expand_metadata(db, metadata: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """청크 메타데이터를 원래 형식으로 합칩니다 (비정규화 DB면 그대로 반환)."""
+    table = get_doc_table(db)
+    metadata = metadata or {}
+    return table.expand(metadata) if table is not None else metadata
+
+
+def source_filter(db, sources: List[str]) -> Dict[str, Any]:
+    """source 목록으로 청크를 제한하는 Chroma where 필터 (정규화 DB는 문서 ID로 변환)."""
+    table = get_doc_table(db)
+    if table is None:
+        return {"source": {"$in": sources}}
+    return {"doc": {"$in": table.doc_ids_for(sources)}}
+
+
+# ==================== 측정 ====================
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+def measure_layouts(db, batch_size: int = 5000) -> Dict[str, Dict[str, float]]:
+    """
+    현재 DB의 청크(임베딩 포함)를 비정규화/정규화 두 레이아웃으로 임시 디렉토리에 복사하여
+    디스크 크기와 로드 시간(클라이언트 열기 + 전체 메타데이터 조회·조인)을 비교합니다.
+    """
+    import chromadb
+    from chromadb.config import Settings
+
+    source = db._collection
+    rows = {"ids": [], "embeddings": [], "documents": [], "metadatas": []}
+    for offset in range(0, source.count(), batch_size):
+        batch = source.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+        rows["ids"].extend(batch["ids"])
+        rows["embeddings"].extend(batch["embeddings"])
+        rows["documents"].extend(batch["documents"])
+        rows["metadatas"].extend(expand_metadata(db, meta) for meta in batch["metadatas"])
+    normalized, table = normalize_metadatas(rows["metadatas"])
+
+    report = {}
+    for layout, metadatas in (("denormalized", rows["metadatas"]), ("normalized", normalized)):
+        workdir = Path(tempfile.mkdtemp(prefix=f"layout_{layout}_"))
+        try:
+            client = chromadb.PersistentClient(path=str(workdir), settings=Settings(anonymized_telemetry=False))
+            collection = client.create_collection("langchain")
+            for start in range(0, len(rows["ids"]), batch_size):
+                end = start + batch_size
+                collection.add(
+                    ids=rows["ids"][start:end],
+                    embeddings=rows["embeddings"][start:end],
+                    documents=rows["documents"][start:end],
+                    metadatas=metadatas[start:end]
+                )
+            if layout == "normalized":
+                table.save(str(workdir))
+            del client, collection
+
+            t0 = time.perf_counter()
+            client = chromadb.PersistentClient(path=str(workdir), settings=Settings(anonymized_telemetry=False))
+            loaded = client.get_collection("langchain").get(include=["metadatas"])
+            loaded_table = DocTable.load(str(workdir))
+            if loaded_table is not None:
+                [loaded_table.expand(meta) for meta in loaded["metadatas"]]
+            load_sec = time.perf_counter() - t0
+            report[layout] = {
+                "disk_mb": round(_dir_size(workdir) / 1e6, 3),
+                # 메타데이터가 저장되는 SQLite (HNSW 파일은 레이아웃과 무관하게 같은 크기)
+                "sqlite_mb": round((workdir / "chroma.sqlite3").stat().st_size / 1e6, 3),
+                "load_sec": round(load_sec, 3),
+            }
+            del client
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+# ==================== CLI ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="정규화된 청크 메타데이터 측정")
+    parser.add_argument("--measure", action="store_true", help="비정규화/정규화 레이아웃의 디스크 크기·로드 시간 비교")
+    args = parser.parse_args()
+
+    if args.measure:
+        from vectordb import create_or_load_vectordb
+        source_db = create_or_load_vectordb()
+        if source_db is None:
+            print("❌ VectorDB를 로드할 수 없습니다.")
+            sys.exit(1)
+        print(json.dumps(measure_layouts(source_db), ensure_ascii=False, indent=2))
+    else:
+        parser.print_help()
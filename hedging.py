@@ -0,0 +1,177 @@
+"""
+LLM 요청 헤징(hedging) 모듈
+=========================
+with_fallbacks()는 Gemini가 예외를 던진 뒤에야 Groq를 시도하므로, 결국 성공하지만 느린
+Gemini 응답은 꼬리 지연(tail latency)을 그대로 치릅니다.
+
+HedgedLLM은 기본(primary) LLM을 먼저 호출하고, 최근 응답 지연의
+config.LLM_HEDGE_PERCENTILE 백분위 시간 안에 응답이 없으면 보조(secondary) LLM에도 같은 요청을 보냅니다.
+먼저 도착한 정상 응답을 사용하고 나머지 요청은 취소합니다.
+
+- primary가 지연 전에 실패하면 바로 secondary 호출 (기존 fallback과 같은 동작)
+- 둘 중 하나가 실패하면 나머지의 응답을 기다림 (둘 다 실패하면 primary의 예외)
+- 취소: 비동기 경로(ainvoke)는 Task 취소, 동기 경로는 결과를 버림 (HTTP 요청 스레드는 중단할 수 없음)
+- 헤징 지연: 최근 config.LLM_HEDGE_WINDOW개 primary 응답 시간의 백분위
+  (표본이 config.LLM_HEDGE_MIN_SAMPLES개 미만이면 config.LLM_HEDGE_INITIAL_DELAY_SEC,
+  하한 config.LLM_HEDGE_MIN_DELAY_SEC — 이보다 빠른 캐시 적중 응답은 표본에서 제외)
+- 메트릭: "llm.hedge.fired", "llm.hedge.winner.<primary|secondary>", "llm.hedge.delay_sec", "llm.latency_sec.primary"
+
+config.LLM_FAILOVER_MODE = "hedge"일 때 agent._build_llm()에서 사용됩니다.
+`.bind(stop=...)` 등 Runnable 인터페이스는 그대로 동작합니다.
+
+사용법 (지연을 주입한 가짜 LLM으로 동작 확인):
+    python hedging.py
+"""
+
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Deque, Optional
+
+import numpy as np
+from langchain_core.runnables import Runnable, RunnableConfig
+
+import config
+import metrics
+
+
+class LatencyTracker:
+    """최근 응답 시간 표본과 헤징 지연 계산 (스레드 안전)."""
+
+    def __init__(self, window: int):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        if seconds < config.LLM_HEDGE_MIN_DELAY_SEC:
+            return  # 캐시 적중 등 네트워크 왕복이 없는 응답은 분포를 왜곡하므로 제외
+        with self._lock:
+            self._samples.append(seconds)
+
+    def hedge_delay(self) -> float:
+        """secondary를 호출하기 전에 primary를 기다릴 시간(초)."""
+        with self._lock:
+            samples = list(self._samples)
+        if len(samples) < config.LLM_HEDGE_MIN_SAMPLES:
+            return config.LLM_HEDGE_INITIAL_DELAY_SEC
+        return max(config.LLM_HEDGE_MIN_DELAY_SEC, float(np.percentile(samples, config.LLM_HEDGE_PERCENTILE)))
+
+
+class HedgedLLM(Runnable):
+    """
+    primary LLM이 느리면 secondary LLM에도 요청을 보내 먼저 온 응답을 사용하는 Runnable.
+
+    Args:
+        primary: 기본 LLM (예: Gemini)
+        secondary: 보조 LLM (예: Groq)
+        tracker: primary 응답 시간 추적기 (None이면 새로 생성)
+    """
+
+    def __init__(self, primary: Runnable, secondary: Runnable, tracker: Optional[LatencyTracker] = None):
+        self.primary = primary
+        self.secondary = secondary
+        self.tracker = tracker or LatencyTracker(config.LLM_HEDGE_WINDOW)
+
+    def _timed_primary(self, input: Any, config: Optional[RunnableConfig], **kwargs: Any) -> Any:
+        t0 = time.perf_counter()
+        result = self.primary.invoke(input, config, **kwargs)
+        elapsed = time.perf_counter() - t0
+        self.tracker.record(elapsed)
+        metrics.observe("llm.latency_sec.primary", elapsed)
+        return result
+
+    async def _atimed_primary(self, input: Any, config: Optional[RunnableConfig], **kwargs: Any) -> Any:
+        t0 = time.perf_counter()
+        result = await self.primary.ainvoke(input, config, **kwargs)
+        elapsed = time.perf_counter() - t0
+        self.tracker.record(elapsed)
+        metrics.observe("llm.latency_sec.primary", elapsed)
+        return result
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        delay = self.tracker.hedge_delay()
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm-hedge")
+        try:
+            # 요청 단위 컨텍스트(contextvars)를 LLM 호출 스레드로 전달
+            primary = pool.submit(contextvars.copy_context().run, self._timed_primary, input, config, **kwargs)
+            done, _ = wait([primary], timeout=delay)
+            if done and primary.exception() is None:
+                metrics.incr("llm.hedge.winner.primary")
+                return primary.result()
+
+            metrics.incr("llm.hedge.fired")
+            metrics.observe("llm.hedge.delay_sec", delay)
+            secondary = pool.submit(contextvars.copy_context().run, self.secondary.invoke, input, config, **kwargs)
+            pending = {primary, secondary}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        for other in pending:
+                            other.cancel()  # 아직 시작 전이면 취소, 실행 중이면 결과를 버림
+                        metrics.incr(f"llm.hedge.winner.{'primary' if future is primary else 'secondary'}")
+                        return future.result()
+                    logging.warning("%s LLM 호출 실패", "Primary" if future is primary else "Secondary",
+                                    exc_info=future.exception())
+            raise primary.exception()
+        finally:
+            pool.shutdown(wait=False)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        delay = self.tracker.hedge_delay()
+        primary = asyncio.ensure_future(self._atimed_primary(input, config, **kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done and primary.exception() is None:
+            metrics.incr("llm.hedge.winner.primary")
+            return primary.result()
+
+        metrics.incr("llm.hedge.fired")
+        metrics.observe("llm.hedge.delay_sec", delay)
+        secondary = asyncio.ensure_future(self.secondary.ainvoke(input, config, **kwargs))
+        pending = {primary, secondary}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        metrics.incr(f"llm.hedge.winner.{'primary' if task is primary else 'secondary'}")
+                        return task.result()
+                    logging.warning("%s LLM 호출 실패", "Primary" if task is primary else "Secondary",
+                                    exc_info=task.exception())
+            raise primary.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+# ==================== 테스트 코드 ====================
+if __name__ == "__main__":
+    from langchain_core.language_models import FakeListChatModel
+
+    class _DelayedFakeLLM(FakeListChatModel):
+        """응답마다 지연을 주입하는 가짜 LLM (delays를 순환)."""
+        delays: list = [0.0]
+        calls: int = 0
+
+        def _call(self, *args, **kwargs):
+            delay = self.delays[self.calls % len(self.delays)]
+            self.calls += 1
+            time.sleep(delay)
+            return super()._call(*args, **kwargs)
+
+    config.LLM_HEDGE_MIN_SAMPLES = 3
+    config.LLM_HEDGE_MIN_DELAY_SEC = 0.05
+    # primary: 평소 0.2초, 가끔 3초 (꼬리 지연) / secondary: 항상 0.5초
+    primary = _DelayedFakeLLM(responses=["primary"], delays=[0.2, 0.2, 0.2, 3.0, 0.2, 3.0])
+    secondary = _DelayedFakeLLM(responses=["secondary"], delays=[0.5])
+    hedged = HedgedLLM(primary, secondary)
+
+    for i in range(6):
+        t0 = time.perf_counter()
+        message = hedged.invoke("hello")
+        print(f"{i + 1}. {message.content:<9} {time.perf_counter() - t0:.2f}s (헤징 지연 {hedged.tracker.hedge_delay():.2f}s)")
+    print(metrics.snapshot()["counters"])
@@ -0,0 +1,192 @@
+"""
+Chroma HNSW 파라미터 벤치마크
+=============================
+HNSW 파라미터(space, M, construction_ef, search_ef) 조합을 바꿔 가며
+임시 Chroma 컬렉션을 구축하고 다음을 측정합니다.
+
+- 구축 시간(초), 인덱스 디스크 크기(MB)
+- 쿼리 지연 p50/p99 (ms, 단일 쿼리 순차 실행)
+- exact search 대비 recall@k
+
+임베딩은 저장된 Chroma 컬렉션(기본) 또는 합성 데이터(--synthetic)를 사용합니다.
+쿼리는 코퍼스 벡터에 작은 노이즈를 더한 벡터입니다.
+
+사용법:
+    python hnsw_benchmark.py                                  # 저장된 임베딩, 기본 스윕
+    python hnsw_benchmark.py --synthetic 20000 --dim 1024
+    python hnsw_benchmark.py --m 8 16 32 --construction-ef 100 200 --search-ef 10 50 100 200
+"""
+
+import itertools
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+
+import config
+from ann_index import exact_search, iter_collection_embeddings, recall_at_k
+
+
+# ==================== 데이터 ====================
+def synthetic_embeddings(n: int, dim: int, n_clusters: int = 50, seed: int = 0) -> np.ndarray:
+    """군집 구조가 있는 합성 임베딩을 만듭니다 (실제 임베딩처럼 주제별로 뭉침)."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, size=n)
+    return centers[labels] + 0.5 * rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def stored_embeddings(limit: Optional[int] = None) -> np.ndarray:
+    """저장된 Chroma 컬렉션의 임베딩을 읽습니다."""
+    from vectordb import create_or_load_vectordb
+
+    db = create_or_load_vectordb()
+    if db is None:
+        raise RuntimeError("VectorDB를 로드할 수 없습니다. --synthetic을 사용하세요.")
+    return np.concatenate([v for _, v in iter_collection_embeddings(db._collection, limit=limit)])
+
+
+def make_queries(vectors: np.ndarray, n_queries: int, noise: float = 0.05, seed: int = 1) -> np.ndarray:
+    """코퍼스 벡터에 노이즈를 더해 쿼리를 만듭니다."""
+    rng = np.random.default_rng(seed)
+    base = vectors[rng.choice(len(vectors), size=min(n_queries, len(vectors)), replace=False)]
+    scale = noise * np.linalg.norm(base, axis=1, keepdims=True) / np.sqrt(vectors.shape[1])
+    return (base + scale * rng.normal(size=base.shape)).astype(np.float32)
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+# ==================== 벤치마크 ====================
+def run_benchmark(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    spaces: Sequence[str] = ("l2",),
+    ms: Sequence[int] = (8, 16, 32),
+    construction_efs: Sequence[int] = (100, 200),
+    search_efs: Sequence[int] = (10, 50, 100, 200),
+    k: int = 10,
+    batch_size: int = 5000
+) -> List[Dict[str, Any]]:
+    """
+    파라미터 조합별로 구축·검색을 측정합니다.
+    구축 파라미터(space, M, construction_ef) 조합마다 컬렉션을 한 번 구축하고,
+    search_ef는 같은 컬렉션에서 바꿔 가며 측정합니다.
+
+    Returns:
+        조합별 결과 딕셔너리 리스트
+    """
+    import chromadb
+    from chromadb.config import Settings
+
+    ids = [str(i) for i in range(len(vectors))]
+    exact = {
+        # cosine/ip는 정규화 벡터 기준, l2는 원본 벡터 기준 정답
+        space: exact_search(iter([(ids, vectors)]), queries, k=k, normalize=(space != "l2"))
+        for space in spaces
+    }
+
+    rows = []
+    for space, m, construction_ef in itertools.product(spaces, ms, construction_efs):
+        workdir = Path(tempfile.mkdtemp(prefix="hnsw_bench_"))
+        try:
+            client = chromadb.PersistentClient(path=str(workdir), settings=Settings(anonymized_telemetry=False))
+            collection = client.create_collection(
+                name="bench",
+                configuration={"hnsw": {
+                    "space": space,
+                    "max_neighbors": m,
+                    "ef_construction": construction_ef,
+                    "ef_search": max(search_efs),
+                }}
+            )
+            data = vectors if space == "l2" else vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+            t0 = time.perf_counter()
+            for start in range(0, len(data), batch_size):
+                collection.add(ids=ids[start:start + batch_size], embeddings=data[start:start + batch_size])
+            build_sec = time.perf_counter() - t0
+            index_mb = _dir_size(workdir) / 1e6
+
+            for search_ef in search_efs:
+                collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+                collection.query(query_embeddings=queries[:1].tolist(), n_results=k, include=[])  # warm-up
+                latencies, approx = [], []
+                for q in queries:
+                    t0 = time.perf_counter()
+                    res = collection.query(query_embeddings=[q.tolist()], n_results=k, include=[])
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                    approx.append(res["ids"][0])
+                rows.append({
+                    "space": space,
+                    "M": m,
+                    "construction_ef": construction_ef,
+                    "search_ef": search_ef,
+                    "build_sec": round(build_sec, 3),
+                    "index_mb": round(index_mb, 2),
+                    "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+                    "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+                    f"recall@{k}": round(recall_at_k(approx, exact[space], k), 4),
+                })
+                print(json.dumps(rows[-1], ensure_ascii=False))
+            del client
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return rows
+
+
+def print_table(rows: List[Dict[str, Any]]) -> None:
+    """결과를 표 형태로 출력합니다."""
+    if not rows:
+        return
+    headers = list(rows[0])
+    widths = [max(len(h), *(len(str(r[h])) for r in rows)) for h in headers]
+    print("  ".join(h.rjust(w) for h, w in zip(headers, widths)))
+    for r in rows:
+        print("  ".join(str(r[h]).rjust(w) for h, w in zip(headers, widths)))
+
+
+# ==================== CLI ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Chroma HNSW 파라미터 스윕 벤치마크")
+    parser.add_argument("--synthetic", type=int, default=0, help="합성 벡터 수 (0이면 저장된 임베딩 사용)")
+    parser.add_argument("--dim", type=int, default=1024, help="합성 벡터 차원")
+    parser.add_argument("--limit", type=int, default=None, help="저장된 임베딩 최대 사용 개수")
+    parser.add_argument("--queries", type=int, default=200, help="쿼리 수")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--space", nargs="+", default=[config.CHROMA_HNSW_SPACE], choices=["l2", "cosine", "ip"])
+    parser.add_argument("--m", nargs="+", type=int, default=[8, 16, 32])
+    parser.add_argument("--construction-ef", nargs="+", type=int, default=[100, 200])
+    parser.add_argument("--search-ef", nargs="+", type=int, default=[10, 50, 100, 200])
+    parser.add_argument("--output", type=str, default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        data = synthetic_embeddings(args.synthetic, args.dim)
+    else:
+        data = stored_embeddings(args.limit)
+    print(f"📏 HNSW 벤치마크: {len(data)}개 벡터 (dim={data.shape[1]}), 쿼리 {args.queries}개\n")
+
+    results = run_benchmark(
+        data,
+        make_queries(data, args.queries),
+        spaces=args.space,
+        ms=args.m,
+        construction_efs=args.construction_ef,
+        search_efs=args.search_ef,
+        k=args.k
+    )
+    print()
+    print_table(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n✅ 결과 저장: {args.output}")
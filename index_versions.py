@@ -0,0 +1,392 @@
+"""
+VectorDB 버전 관리 모듈 (blue/green 재구축)
+==========================================
+서빙 중인 Chroma 디렉토리를 지우지 않고 재구축·임베딩 모델 교체를 수행합니다.
+
+- 새 버전은 `<DB 경로>.versions/<타임스탬프>-<모델>/`에 생성
+- 검증(문서 수, 자기 자신 검색, 쿼리 임베딩 차원) 통과 후에만
+  포인터 파일 `<DB 경로>.current`를 원자적으로 교체 (임시 파일 작성 → os.replace)
+- 실행 중인 프로세스는 포인터 변경을 감지하여 새 버전을 백그라운드로 로드한 뒤 핸들을 교체
+  (tools/vectordb_search.VectorDBManager) → 다운타임 없음, 반쯤 구축된 인덱스 노출 없음
+- 포인터에는 해당 버전의 임베딩 모델이 기록되어, config.EMBEDDING_MODEL_NAME을 바꾼 뒤
+  새 버전이 활성화되기 전까지는 기존 모델로 계속 서빙
+- 최근 config.VECTOR_DB_KEEP_VERSIONS개 버전만 유지 (이전 버전으로 rollback 가능)
+
+IVF-PQ·차원 축소 인덱스(ann_index.py, reduced_index.py)는 별도 파일이므로
+새 버전 활성화 후 다시 학습/구축해야 합니다.
+
+사용법:
+    python index_versions.py status
+    python index_versions.py rebuild ./data/pdfs          # PDF로 새 버전 구축 후 교체
+    python index_versions.py migrate --model bge-m3       # 기존 청크를 새 모델로 재임베딩 후 교체
+    python index_versions.py rollback                     # 직전 버전으로 되돌리기
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np
+
+import config
+
+
+_VERSION_INFO = "version.json"  # 버전 디렉토리별 구축 정보 (임베딩 모델·문서 수·차원)
+
+
+# ==================== 경로/포인터 ====================
+def _pointer_file(base: Path) -> Path:
+    base = Path(base)
+    return base.parent / f"{base.name}.current"
+
+
+def versions_dir(base: Path) -> Path:
+    """버전 디렉토리들이 저장되는 상위 디렉토리."""
+    base = Path(base)
+    return base.parent / f"{base.name}.versions"
+
+
+def read_pointer(base: Path) -> Optional[Dict[str, Any]]:
+    """포인터 파일 내용을 반환합니다 (없거나 손상되면 None)."""
+    pointer = _pointer_file(base)
+    try:
+        return json.loads(pointer.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logging.warning("VectorDB 포인터 파일을 읽을 수 없습니다: %s", pointer, exc_info=True)
+        return None
+
+
+def current_path(base: Path) -> Path:
+    """
+    현재 활성 버전의 디렉토리를 반환합니다.
+    포인터가 없으면 base 자체(버전 관리 이전의 단일 디렉토리)를 사용합니다.
+    """
+    pointer = read_pointer(base)
+    if pointer is None:
+        return Path(base)
+    return versions_dir(base) / pointer["version"]
+
+
+def current_embedding_model(base: Path) -> str:
+    """활성 버전을 구축한 임베딩 모델 (포인터가 없으면 config.EMBEDDING_MODEL_NAME)."""
+    pointer = read_pointer(base)
+    return (pointer or {}).get("embedding_model") or config.EMBEDDING_MODEL_NAME
+
+
+def new_version_dir(base: Path, embedding_model: str) -> Path:
+    """새 버전 디렉토리 경로를 만듭니다 (디렉토리는 아직 생성하지 않음)."""
+    tag = re.sub(r"[^A-Za-z0-9._-]+", "_", embedding_model)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    version = versions_dir(base) / f"{stamp}-{tag}"
+    n = 1
+    while version.exists():  # 같은 초에 구축한 버전(활성 버전일 수 있음)을 덮어쓰지 않음
+        n += 1
+        version = versions_dir(base) / f"{stamp}.{n:02d}-{tag}"  # "." > "-": 이름순 = 구축순
+    return version
+
+
+def list_versions(base: Path) -> List[Path]:
+    """버전 디렉토리 목록 (오래된 순)."""
+    root = versions_dir(base)
+    if not root.exists():
+        return []
+    return sorted(p for p in root.iterdir() if p.is_dir())
+
+
+# ==================== 검증/활성화 ====================
+def validate_version(db, expected_count: Optional[int] = None) -> Dict[str, Any]:
+    """
+    새로 구축한 버전이 서빙 가능한지 확인합니다.
+
+    - 문서 수 > 0 (expected_count가 주어지면 일치)
+    - 저장된 임베딩 하나로 검색하면 자기 자신이 1위
+    - 현재 임베딩 모델의 쿼리 임베딩 차원 == 저장된 임베딩 차원
+
+    Raises:
+        ValueError: 검증 실패
+    """
+    collection = db._collection
+    count = collection.count()
+    if count == 0:
+        raise ValueError("새 버전에 문서가 없습니다.")
+    if expected_count is not None and count != expected_count:
+        raise ValueError(f"문서 수 불일치: {count} (기대값 {expected_count})")
+
+    sample = collection.get(limit=1, include=["embeddings"])
+    stored = np.asarray(sample["embeddings"][0], dtype=np.float32)
+    hit = collection.query(query_embeddings=[stored.tolist()], n_results=1, include=[])
+    if hit["ids"][0][:1] != sample["ids"][:1]:
+        raise ValueError("자기 자신 검색 검증 실패 (인덱스 손상 가능)")
+
+    query_dim = len(db.embeddings.embed_query("validation"))
+    if query_dim != stored.shape[0]:
+        raise ValueError(f"쿼리 임베딩 차원({query_dim})이 저장된 임베딩 차원({stored.shape[0]})과 다릅니다.")
+    return {"count": count, "dim": int(stored.shape[0])}
+
+
+def activate_version(base: Path, version: Path, embedding_model: str, info: Optional[Dict[str, Any]] = None) -> None:
+    """
+    포인터를 새 버전으로 원자적으로 교체하고 오래된 버전을 정리합니다.
+    """
+    base, version = Path(base), Path(version)
+    pointer = {
+        "version": version.name,
+        "embedding_model": embedding_model,
+        "activated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        **(info or {}),
+    }
+    pointer_file = _pointer_file(base)
+    tmp = pointer_file.with_name(pointer_file.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(pointer, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, pointer_file)  # 원자적 교체
+    print(f"🔀 활성 VectorDB 버전 교체: {version.name} ({embedding_model})")
+    _prune_versions(base, keep=config.VECTOR_DB_KEEP_VERSIONS)
+
+
+def _prune_versions(base: Path, keep: int) -> None:
+    """활성 버전을 제외하고 최근 keep개 버전만 남깁니다."""
+    active = current_path(base)
+    versions = list_versions(base)
+    for old in versions[:-keep] if keep > 0 else versions:
+        if old != active:
+            shutil.rmtree(old, ignore_errors=True)
+            logging.info("오래된 VectorDB 버전 삭제: %s", old)
+
+
+def blue_green_build(
+    base: Path,
+    build_fn: Callable[[str], Any],
+    embedding_model: str = config.EMBEDDING_MODEL_NAME,
+    expected_count: Optional[int] = None
+):
+    """
+    build_fn(새 버전 경로)으로 새 버전을 구축하고, 검증 통과 시 활성화합니다.
+    실패하면 새 버전 디렉토리만 삭제하며 서빙 중인 버전은 그대로 유지됩니다.
+
+    Returns:
+        새 버전의 VectorDB 인스턴스 (실패 시 None)
+    """
+    version = new_version_dir(base, embedding_model)
+    version.parent.mkdir(parents=True, exist_ok=True)
+    print(f"🟩 새 VectorDB 버전 구축: {version}")
+    try:
+        db = build_fn(str(version))
+        if db is None:
+            raise ValueError("VectorDB 생성 실패")
+        info = validate_version(db, expected_count=expected_count)
+        (version / _VERSION_INFO).write_text(
+            json.dumps({"embedding_model": embedding_model, **info}, ensure_ascii=False, indent=2),
+            encoding="utf-8"
+        )
+    except Exception:
+        logging.exception("새 VectorDB 버전 구축/검증 실패 — 기존 버전 유지")
+        shutil.rmtree(version, ignore_errors=True)
+        return None
+    activate_version(base, version, embedding_model, info)
+    return db
+
+
+# ==================== 임베딩 모델 마이그레이션 ====================
+def migrate_embeddings(
+    base: Path = config.VECTOR_DB_PATH,
+    embedding_model: str = config.EMBEDDING_MODEL_NAME,
+    batch_size: int = 256
+):
+    """
+    활성 버전의 청크(본문·C-P-P 메타데이터)를 새 임베딩 모델로 재임베딩하여
+    새 버전으로 구축하고 교체합니다. PDF 파싱·C-P-P 추출은 다시 하지 않습니다.
+
+    Returns:
+        새 버전의 VectorDB 인스턴스 (실패 시 None)
+    """
+    from langchain_chroma import Chroma
+    from langchain_ollama import OllamaEmbeddings
+    from vectordb import create_or_load_vectordb, hnsw_configuration
+    from doc_index import build_doc_index
+    from doc_table import get_doc_table
+    from cpp_index import build_cpp_index
+
+    source = create_or_load_vectordb(persist_directory=str(base))
+    if source is None:
+        print("❌ 원본 VectorDB를 로드할 수 없습니다.")
+        return None
+    total = source._collection.count()
+
+    def _build(persist_directory: str):
+        embeddings = OllamaEmbeddings(model=embedding_model, base_url=config.OLLAMA_BASE_URL)
+        db = Chroma(
+            persist_directory=persist_directory,
+            embedding_function=embeddings,
+            collection_configuration=hnsw_configuration()
+        )
+        print(f"🔁 재임베딩 중 ({total}개 청크, {embedding_model})...")
+        for offset in range(0, total, batch_size):
+            batch = source._collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+            if not batch["ids"]:
+                break
+            documents = [doc or "" for doc in batch["documents"]]
+            db._collection.add(
+                ids=batch["ids"],
+                embeddings=embeddings.embed_documents(documents),
+                documents=documents,
+                metadatas=batch["metadatas"]
+            )
+        # 정규화된 메타데이터는 문서 테이블을 함께 복사 (청크 메타데이터는 그대로 참조)
+        table = get_doc_table(source)
+        if table is not None:
+            table.save(persist_directory)
+        build_doc_index(db)
+        build_cpp_index(db)
+        return db
+
+    return blue_green_build(base, _build, embedding_model=embedding_model, expected_count=total)
+
+
+# ==================== 보조 인덱스 재구축 ====================
+def building_collection(client, name: str):
+    """보조 인덱스를 구축할 임시 컬렉션 (이전 실패로 남은 임시 컬렉션은 삭제)."""
+    tmp_name = f"{name}__building"
+    try:
+        client.delete_collection(tmp_name)
+    except Exception:
+        pass
+    return client.create_collection(name=tmp_name, metadata={"hnsw:space": "cosine"})
+
+
+def swap_collection(client, name: str, building) -> None:
+    """구축을 마친 임시 컬렉션을 name으로 교체합니다 (기존 컬렉션이 비어 보이는 구간은 이름 변경 순간뿐)."""
+    try:
+        client.delete_collection(name)
+    except Exception:
+        pass
+    building.modify(name=name)
+
+
+def _copy_collection(source, target, batch_size: int = 5000) -> None:
+    """컬렉션의 ID·본문·메타데이터·임베딩을 그대로 복사합니다 (재임베딩 없음)."""
+    for offset in range(0, source.count(), batch_size):
+        batch = source.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+        if not batch["ids"]:
+            break
+        target.add(
+            ids=batch["ids"],
+            embeddings=batch["embeddings"],
+            documents=batch["documents"],
+            metadatas=batch["metadatas"]
+        )
+
+
+def rebuild_indexes(
+    base: Path,
+    rebuild: Callable[[Any], Any],
+    keep: Sequence[str] = ()
+):
+    """
+    활성 버전의 청크(임베딩 포함)를 재임베딩 없이 새 버전으로 복사한 뒤 rebuild(db)로 보조 인덱스
+    (논문 인덱스·C-P-P 인덱스)를 구축하고, 검증 통과 시 교체합니다.
+    서빙 중인 DB의 보조 컬렉션을 지우고 다시 만드는 동안 검색이 빈 컬렉션을 보는 일이 없습니다.
+
+    Args:
+        base: VectorDB 경로 (샤드 경로)
+        rebuild: 새 버전의 VectorDB 인스턴스를 받아 보조 인덱스를 구축하는 함수
+        keep: 그대로 복사할 보조 컬렉션 이름 (예: config.CPP_INDEX_COLLECTION)
+
+    Returns:
+        새 버전의 VectorDB 인스턴스 (실패 시 None)
+    """
+    from langchain_chroma import Chroma
+    from vectordb import create_or_load_vectordb, hnsw_configuration
+    from doc_table import get_doc_table
+
+    source = create_or_load_vectordb(persist_directory=str(base))
+    if source is None:
+        print("❌ 원본 VectorDB를 로드할 수 없습니다.")
+        return None
+    model = current_embedding_model(base)
+    total = source._collection.count()
+
+    def _build(persist_directory: str):
+        db = Chroma(
+            persist_directory=persist_directory,
+            embedding_function=source.embeddings,
+            collection_configuration=hnsw_configuration()
+        )
+        print(f"📋 청크 복사 중 ({total}개, 재임베딩 없음)...")
+        _copy_collection(source._collection, db._collection)
+        table = get_doc_table(source)
+        if table is not None:
+            table.save(persist_directory)
+        for name in keep:
+            try:
+                aux = source._client.get_collection(name)
+            except Exception:
+                continue  # 원본에 없는 보조 인덱스
+            _copy_collection(aux, db._client.create_collection(name=name, metadata=aux.metadata))
+        rebuild(db)
+        return db
+
+    return blue_green_build(base, _build, embedding_model=model, expected_count=total)
+
+
+def rollback(base: Path = config.VECTOR_DB_PATH) -> bool:
+    """활성 버전 직전의 버전으로 포인터를 되돌립니다 (검증 후 교체)."""
+    from vectordb import create_or_load_vectordb
+
+    active = current_path(base)
+    older = [v for v in list_versions(base) if v.name < active.name and (v / _VERSION_INFO).exists()]
+    if not older:
+        print("❌ 되돌릴 이전 버전이 없습니다.")
+        return False
+    previous = older[-1]
+    model = json.loads((previous / _VERSION_INFO).read_text(encoding="utf-8"))["embedding_model"]
+    try:
+        info = validate_version(create_or_load_vectordb(persist_directory=str(previous), embedding_model=model))
+    except Exception:
+        logging.exception("이전 버전 검증 실패 — rollback 중단")
+        return False
+    activate_version(base, previous, model, info)
+    return True
+
+
+# ==================== CLI ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="VectorDB blue/green 재구축·모델 마이그레이션")
+    parser.add_argument("--db", type=str, default=str(config.VECTOR_DB_PATH), help="VectorDB 경로 (샤드 경로)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="활성 버전과 보관 중인 버전 목록")
+    p_rebuild = sub.add_parser("rebuild", help="PDF로 새 버전 구축 후 교체")
+    p_rebuild.add_argument("pdf_path", type=str, help="PDF 파일 또는 폴더 경로")
+    p_rebuild.add_argument("--no-cpp", action="store_true", help="C-P-P 추출 생략")
+    p_migrate = sub.add_parser("migrate", help="기존 청크를 새 임베딩 모델로 재임베딩 후 교체")
+    p_migrate.add_argument("--model", type=str, default=config.EMBEDDING_MODEL_NAME, help="새 임베딩 모델")
+    sub.add_parser("rollback", help="직전 버전으로 되돌리기")
+    args = parser.parse_args()
+
+    db_path = Path(args.db)
+    if args.command == "status":
+        print(json.dumps({
+            "active": str(current_path(db_path)),
+            "pointer": read_pointer(db_path),
+            "versions": [v.name for v in list_versions(db_path)],
+        }, ensure_ascii=False, indent=2))
+    elif args.command == "rebuild":
+        from vectordb import build_vectordb_pipeline
+        build_vectordb_pipeline(args.pdf_path, extract_cpp=not args.no_cpp, force_recreate=True, persist_directory=str(db_path))
+    elif args.command == "migrate":
+        migrate_embeddings(db_path, embedding_model=args.model)
+    else:
+        rollback(db_path)
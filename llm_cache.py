@@ -0,0 +1,155 @@
+"""
+LLM 응답 정확 일치 캐시
+=====================
+config.LLM_TEMPERATURE = 0.0에서는 같은 프롬프트에 대한 Gemini/Groq 응답이 사실상 같으므로,
+자주 묻는 질문의 첫 ReAct 단계처럼 반복되는 호출은 저장된 응답을 바로 반환합니다.
+
+- LangChain BaseCache 구현 → 채팅 모델의 cache 파라미터로 연결 (agent._build_llm)
+- 키: (제공자·모델·temperature·stop 등이 포함된 LangChain llm_string, 전체 프롬프트)의 SHA-256
+- 저장소: SQLite 파일(config.LLM_CACHE_PATH), 프로세스 간 공유
+- 크기 제한: 항목 수(config.LLM_CACHE_MAX_ENTRIES)·용량(config.LLM_CACHE_MAX_MB) 초과 시
+  가장 오래 사용되지 않은 항목부터 삭제 (LRU)
+- temperature > 0인 모델에는 연결하지 않음 (should_cache)
+
+사용법:
+    python llm_cache.py --stats
+    python llm_cache.py --clear
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+import config
+import metrics
+
+
+def should_cache(temperature: float) -> bool:
+    """이 temperature의 LLM 호출을 캐시할지 여부 (결정적인 호출만 캐시)."""
+    return config.LLM_CACHE and temperature <= 0.0
+
+
+class BoundedSQLiteCache(BaseCache):
+    """
+    크기 제한이 있는 SQLite LLM 응답 캐시 (LRU 삭제).
+
+    Args:
+        path: SQLite 파일 경로
+        max_entries: 최대 항목 수
+        max_bytes: 저장된 응답의 최대 총 크기 (바이트)
+    """
+
+    def __init__(self, path: Path, max_entries: int, max_bytes: int):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache(last_used)")
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+        if row is None:
+            metrics.incr("llm_cache.miss")
+            return None
+        try:
+            generations = [loads(item) for item in json.loads(row[0])]
+        except Exception:
+            logging.warning("손상된 LLM 캐시 항목을 무시합니다: %s", key, exc_info=True)
+            metrics.incr("llm_cache.miss")
+            return None
+        metrics.incr("llm_cache.hit")
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        value = json.dumps([dumps(generation) for generation in return_val])
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (self._key(prompt, llm_string), value, len(value.encode("utf-8")), now, now)
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        """항목 수·총 크기 제한을 넘으면 가장 오래 사용되지 않은 항목부터 삭제합니다 (lock 안에서 호출)."""
+        count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self._conn.execute("SELECT key, size FROM llm_cache ORDER BY last_used").fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            evicted += 1
+        metrics.incr("llm_cache.evicted", evicted)
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        return {"entries": count, "size_mb": round(total / 1e6, 3), "path": str(self.path)}
+
+
+_cache: Optional[BoundedSQLiteCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> BoundedSQLiteCache:
+    """프로세스 공유 LLM 캐시 (최초 사용 시 생성)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = BoundedSQLiteCache(
+                config.LLM_CACHE_PATH,
+                max_entries=config.LLM_CACHE_MAX_ENTRIES,
+                max_bytes=int(config.LLM_CACHE_MAX_MB * 1e6)
+            )
+        return _cache
+
+
+# ==================== CLI ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="LLM 응답 캐시 관리")
+    parser.add_argument("--stats", action="store_true", help="항목 수·크기 출력")
+    parser.add_argument("--clear", action="store_true", help="캐시 비우기")
+    args = parser.parse_args()
+
+    if args.clear:
+        get_llm_cache().clear()
+        print("🗑️  LLM 캐시를 비웠습니다.")
+    print(json.dumps(get_llm_cache().stats(), ensure_ascii=False, indent=2))
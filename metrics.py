@@ -0,0 +1,79 @@
+"""
+경량 메트릭 레지스트리
+====================
+검색·에이전트 파이프라인의 카운터, 게이지(현재 상태 값)와 지연 시간을 프로세스 단위로 수집합니다.
+스레드 안전하며, snapshot()으로 조회합니다.
+- CLI: agent.py 대화형 모드에서 "metrics" 입력, 또는 `python agent.py --query ... --metrics`
+- Streamlit: 사이드바 "📈 메트릭" 패널
+"""
+
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Any
+
+import numpy as np
+
+
+# 지표별로 보관할 최근 관측값 수 (백분위 계산용)
+_MAX_SAMPLES = 1000
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = defaultdict(float)
+_gauges: Dict[str, float] = {}
+_samples: Dict[str, deque] = defaultdict(lambda: deque(maxlen=_MAX_SAMPLES))
+
+
+def incr(name: str, value: float = 1.0) -> None:
+    """카운터를 증가시킵니다."""
+    with _lock:
+        _counters[name] += value
+
+
+def gauge(name: str, value: float) -> None:
+    """게이지를 현재 값으로 설정합니다 (예: 서킷 브레이커 상태)."""
+    with _lock:
+        _gauges[name] = float(value)
+
+
+def observe(name: str, value: float) -> None:
+    """관측값(지연 시간, 토큰 수 등)을 기록합니다."""
+    with _lock:
+        _samples[name].append(float(value))
+
+
+def snapshot() -> Dict[str, Any]:
+    """
+    현재까지의 카운터와 관측값 요약을 반환합니다.
+
+    Returns:
+        {
+            "counters": {name: value},
+            "gauges": {name: value},
+            "observations": {name: {"count", "mean", "p50", "p95"}}
+        }
+    """
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        samples = {name: list(values) for name, values in _samples.items()}
+
+    observations = {}
+    for name, values in samples.items():
+        if not values:
+            continue
+        arr = np.asarray(values)
+        observations[name] = {
+            "count": len(values),
+            "mean": round(float(arr.mean()), 3),
+            "p50": round(float(np.percentile(arr, 50)), 3),
+            "p95": round(float(np.percentile(arr, 95)), 3),
+        }
+    return {"counters": counters, "gauges": gauges, "observations": observations}
+
+
+def reset() -> None:
+    """모든 메트릭을 초기화합니다."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _samples.clear()
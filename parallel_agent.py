@@ -0,0 +1,147 @@
+"""
+병렬 도구 호출 에이전트 모듈
+==========================
+create_react_agent는 LLM 한 턴에 Action을 하나만 허용하므로, 서로 독립적인 도구 호출
+(예: vectordb_search → materials_project)도 LLM 왕복 2회 + 도구 순차 실행 2회가 필요합니다.
+
+이 모듈의 에이전트는 한 턴에 여러 개의 Action / Action Input 쌍을 출력할 수 있고,
+AgentExecutor가 이를 스레드 풀에서 동시에 실행합니다.
+다중 소스 질문의 지연 시간 ≈ LLM 1턴 + 가장 느린 도구 1회.
+
+- ParallelReActOutputParser: Action 블록이 여러 개면 AgentAction 리스트 반환 (1개면 기존 ReAct 파서와 동일)
+- scratchpad.format_scratchpad: 같은 턴의 Observation을 도구 이름과 함께 나란히 기록
+- ParallelAgentExecutor: 한 턴의 Action들을 동시에 실행 (비동기 경로는 AgentExecutor가 이미 gather로 실행)
+
+config.AGENT_MODE = "parallel"일 때 agent.create_agent()에서 사용됩니다.
+"""
+
+import contextvars
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from langchain.agents.output_parsers import ReActSingleInputOutputParser
+from langchain.agents.output_parsers.react_single_input import (
+    FINAL_ANSWER_ACTION,
+    FINAL_ANSWER_AND_PARSABLE_ACTION_ERROR_MESSAGE,
+)
+from langchain_core.agents import AgentAction, AgentFinish, AgentStep
+from langchain_core.exceptions import OutputParserException
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable
+
+import config
+import metrics
+from deadline import DeadlineAgentExecutor
+from scratchpad import create_agent_runnable
+
+
+# "Action: ...\nAction Input: ..." 블록 (다음 Action 또는 텍스트 끝까지, Action 앞의 Thought 줄은 입력에서 제외)
+_ACTION_BLOCK = re.compile(
+    r"Action\s*\d*\s*:[\s]*(.*?)\n\s*Action\s*\d*\s*Input\s*\d*\s*:[\s]*(.*?)(?=\n\s*(?:Thought\s*:[^\n]*\n\s*)?Action\s*\d*\s*:|\Z)",
+    re.DOTALL
+)
+
+
+# ==================== 출력 파서 ====================
+class ParallelReActOutputParser(ReActSingleInputOutputParser):
+    """
+    한 턴에 여러 Action을 허용하는 ReAct 출력 파서.
+
+    Action 블록이 2개 이상이면 AgentAction 리스트를 반환합니다.
+    첫 번째 Action의 log에만 LLM 출력 전체를 담아 scratchpad에 한 번만 기록되게 합니다.
+    동일한 (도구, 입력) 쌍은 한 번만 실행하며, 최대 config.AGENT_MAX_PARALLEL_ACTIONS개까지 사용합니다.
+    """
+
+    def parse(self, text: str) -> Union[AgentAction, AgentFinish, List[AgentAction]]:
+        blocks = _ACTION_BLOCK.findall(text)
+        if len(blocks) < 2:
+            return super().parse(text)
+        if FINAL_ANSWER_ACTION in text:
+            raise OutputParserException(f"{FINAL_ANSWER_AND_PARSABLE_ACTION_ERROR_MESSAGE}: {text}")
+
+        actions: List[AgentAction] = []
+        seen = set()
+        for tool, tool_input in blocks:
+            tool = tool.strip()
+            tool_input = tool_input.strip().strip('"')
+            if (tool, tool_input) in seen:
+                continue
+            seen.add((tool, tool_input))
+            actions.append(AgentAction(tool, tool_input, text if not actions else ""))
+            if len(actions) >= config.AGENT_MAX_PARALLEL_ACTIONS:
+                break
+        return actions if len(actions) > 1 else actions[0]
+
+    @property
+    def _type(self) -> str:
+        return "react-parallel-input"
+
+
+# ==================== Agent 생성 ====================
+def create_parallel_agent(
+    llm,
+    tools: Sequence[Any],
+    prompt: BasePromptTemplate
+) -> Runnable:
+    """
+    병렬 Action 출력을 허용하는 ReAct 에이전트 Runnable을 생성합니다.
+    create_react_agent와 같은 구성이며 출력 파서만 다릅니다 (scratchpad는 scratchpad.format_scratchpad).
+    """
+    return create_agent_runnable(llm, tools, prompt, ParallelReActOutputParser())
+
+
+# ==================== Executor ====================
+# 현재 턴에서 아직 실행되지 않은 Action 목록 (동시에 실행 중인 다른 요청과 섞이지 않도록 컨텍스트별 관리)
+_current_batch: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "parallel_agent_batch", default=None
+)
+
+
+class ParallelAgentExecutor(DeadlineAgentExecutor):
+    """
+    한 턴의 여러 Action을 스레드 풀에서 동시에 실행하는 AgentExecutor.
+
+    AgentExecutor._iter_next_step은 Action들을 모두 yield한 뒤 _perform_agent_action을
+    순서대로 호출합니다. 첫 호출 시점에 같은 턴의 Action 전체를 스레드 풀에 제출하고,
+    이후 호출은 해당 Action의 결과만 기다리므로 결과 순서는 그대로 유지됩니다.
+    """
+
+    def _iter_next_step(self, name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager=None):
+        batch: Dict[str, Any] = {"actions": [], "futures": {}}
+        token = _current_batch.set(batch)
+        try:
+            for item in super()._iter_next_step(
+                name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+            ):
+                if isinstance(item, AgentAction):
+                    batch["actions"].append(item)
+                yield item
+        finally:
+            _current_batch.reset(token)
+
+    def _perform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None) -> AgentStep:
+        batch = _current_batch.get()
+        if batch is None or len(batch["actions"]) < 2:
+            return super()._perform_agent_action(name_to_tool_map, color_mapping, agent_action, run_manager)
+
+        futures: Dict[int, Future] = batch["futures"]
+        if not futures:
+            actions = batch["actions"]
+            metrics.observe("agent.parallel.actions_per_step", len(actions))
+            batch["started"] = time.perf_counter()
+            pool = ThreadPoolExecutor(max_workers=len(actions), thread_name_prefix="agent-tool")
+            for action in actions:
+                # 요청 단위 컨텍스트(contextvars)를 도구 스레드로 전달
+                ctx = contextvars.copy_context()
+                futures[id(action)] = pool.submit(
+                    ctx.run, super()._perform_agent_action,
+                    name_to_tool_map, color_mapping, action, run_manager
+                )
+            pool.shutdown(wait=False)
+
+        step = futures[id(agent_action)].result()
+        if agent_action is batch["actions"][-1]:
+            metrics.observe("agent.parallel.step_sec", time.perf_counter() - batch["started"])
+        return step
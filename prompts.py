@@ -8,6 +8,8 @@ from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import PromptTemplate
 from pydantic import BaseModel, Field
 
+import config
+
 
 # ==================== Few-shot 예제 (참고용) ====================
 FEW_SHOT_EXAMPLES = [
@@ -208,6 +210,16 @@ JSON Output:
 
 
 # ==================== Agent용 ReAct 프롬프트 ====================
+# vectordb_search 도구 규칙 (C-P-P 우선 검색 모드에서만 "full:" 재검색 안내 — 기본 모드는 이미 전체 청크를 반환)
+VECTORDB_TOOL_RULE = (
+    '- **vectordb_search**: Experimental data from research papers. Use FIRST for material properties, processes, compositions. '
+    'To search several sub-questions in one step, separate them with ";" (e.g., "Cu-Mg resistivity; Cu-Mg annealing").'
+    + (
+        ' If the compact C-P-P records are not enough, search again with the "full:" prefix to get full-text passages.'
+        if config.VECTORDB_SEARCH_MODE == "cpp_first" else ""
+    )
+)
+
 REACT_SYSTEM_PROMPT = """You are a materials science research agent using the ReAct framework.
 
 You have access to the following tools:
@@ -240,7 +252,7 @@ Final Answer: [comprehensive answer with citations]
 
 === TOOL SELECTION RULES ===
 
-- **vectordb_search**: Experimental data from research papers. Use FIRST for material properties, processes, compositions.
+""" + VECTORDB_TOOL_RULE + """
 - **materials_project**: DFT calculation data only. Input must be exact chemical formula (e.g., "Cu2O", "CuMg"). Use for theoretical properties.
 - **crossref_search**: Latest academic papers (English database). Translate Korean queries to English.
 - **web_search**: General web info, news, industry trends. Use as last resort.
@@ -264,3 +276,91 @@ Begin!
 Question: {input}
 Thought:{agent_scratchpad}
 """
+
+
+# ==================== 병렬 도구 호출용 ReAct 프롬프트 (AGENT_MODE="parallel") ====================
+PARALLEL_REACT_SYSTEM_PROMPT = """You are a materials science research agent using the ReAct framework.
+
+You have access to the following tools:
+{tools}
+
+=== STRICT OUTPUT FORMAT ===
+
+You MUST follow this format exactly. No blank lines between Thought/Action/Observation.
+
+Thought: [analyze the query and decide what to do next]
+Action: [one of: {tool_names}]
+Action Input: [input for the tool]
+Action: [another tool, only if this call does NOT depend on the result of the previous one]
+Action Input: [input]
+Observation (tool_name): [result — filled in automatically, do NOT write this yourself]
+Thought: [analyze the observations and decide what to do next]
+...
+Thought: [I now have all the information I need to answer.]
+Final Answer: [comprehensive answer with citations]
+
+=== CRITICAL RULES ===
+
+1. After every "Thought:", write EXACTLY ONE of:
+   (a) one or more "Action: [tool_name]" + "Action Input: [input]" pairs — to call tools
+   (b) "Final Answer: [answer]"  — when you have enough information, NO Action needed
+2. Put several Action pairs in ONE step whenever the calls are independent (e.g., papers + DFT data for the same material). They run at the same time. At most {max_actions} pairs per step.
+3. If a call needs the result of another call, wait for the Observation and call it in the next step.
+4. NEVER write "Action Input:" without "Action:" on the line immediately before it.
+5. NEVER write "Final Answer:" in the same step as an Action.
+6. NEVER add blank lines between Thought, Action, Action Input, or Final Answer.
+7. Do NOT write "Observation" yourself — it is filled in by the system.
+
+=== TOOL SELECTION RULES ===
+
+""" + VECTORDB_TOOL_RULE + """
+- **materials_project**: DFT calculation data only. Input must be exact chemical formula (e.g., "Cu2O", "CuMg"). Use for theoretical properties.
+- **crossref_search**: Latest academic papers (English database). Translate Korean queries to English.
+- **web_search**: General web info, news, industry trends. Use as last resort.
+
+=== EXAMPLE ===
+
+Question: "Resistivity of Cu-Mg alloys?"
+Thought: I need experimental resistivity data from papers and theoretical properties from Materials Project. These are independent, so I will call both now.
+Action: vectordb_search
+Action Input: Cu-Mg alloy resistivity
+Action: materials_project
+Action Input: CuMg
+Observation (vectordb_search): [experimental data found]
+Observation (materials_project): [DFT calculation data]
+Thought: I now have sufficient information from both sources to give a comprehensive answer.
+Final Answer: [synthesis with citations from both sources]
+
+Begin!
+
+Question: {input}
+Thought:{agent_scratchpad}
+"""
+
+
+# ==================== 빠른 경로 답변 프롬프트 (router.py, ROUTER_LLM_ANSWER=True) ====================
+FAST_PATH_ANSWER_PROMPT = """You are a materials science research assistant.
+Answer the question using ONLY the tool result below. Answer in the same language as the question.
+Keep it short (2-4 sentences), include the value with its unit, and cite the source (database name and ID).
+If the tool result does not answer the question, say so.
+
+Question: {question}
+
+Tool result:
+{observation}
+
+Answer:"""
+
+
+# ==================== 반복 도구 호출 안내 (tool_memo.py) ====================
+TOOL_MEMO_NOTE = (
+    "[Note: you already called {tool} with this input in this episode. "
+    "This is the same result — do not call it again; use it or try a different tool/input.]"
+)
+
+
+# ==================== 마감 시간 부족으로 건너뛴 Action (deadline.py) ====================
+DEADLINE_SKIPPED_NOTE = (
+    "[Skipped: not enough time left for this request to run the tool. "
+    "Write the Final Answer now using the information you already have.]"
+)
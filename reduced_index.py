@@ -0,0 +1,264 @@
+"""
+차원 축소 인덱스 모듈
+====================
+고차원 임베딩을 PCA 투영 또는 앞부분 절단(prefix truncation, Matryoshka 계열 모델)으로
+축소한 벡터로 1차 검색하고, 상위 후보만 원본(full) 벡터로 재채점합니다.
+
+- 1차 검색: 축소 벡터 (N, r) 행렬에 대한 cosine 유사도 (memory-map, 배치 단위)
+- 재채점: 상위 rerank_k 후보의 원본 벡터를 Chroma에서 ID로 조회하여 정확한 cosine으로 재정렬
+  (tools/vectordb_search에서 IVF-PQ와 같은 경로로 처리)
+
+사용법:
+    python reduced_index.py --build                 # Chroma 임베딩으로 구축 + 벤치마크
+    python reduced_index.py --build --method prefix --dim 256
+"""
+
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from typing import Iterator, List, Optional, Tuple
+import numpy as np
+
+import config
+from ann_index import exact_search, iter_collection_embeddings, recall_at_k, sample_embeddings
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+
+class ReducedIndex:
+    """
+    차원 축소 검색 인덱스.
+
+    Attributes:
+        method: "pca" (학습된 투영) | "prefix" (앞 dim개 성분만 사용, Matryoshka 모델용)
+        dim: 축소 차원
+    """
+
+    def __init__(self, method: str = "pca", dim: int = 256):
+        if method not in ("pca", "prefix"):
+            raise ValueError(f"지원하지 않는 차원 축소 방식: {method}")
+        self.method = method
+        self.dim = dim
+        self.full_dim: Optional[int] = None
+        self.mean: Optional[np.ndarray] = None        # (full_dim,) — PCA 전용
+        self.components: Optional[np.ndarray] = None  # (full_dim, dim) — PCA 전용
+        self.vectors: Optional[np.ndarray] = None     # (N, dim) 정규화된 축소 벡터
+        self.ids: Optional[np.ndarray] = None
+        self.stats: dict = {}
+
+    # ---------- 투영 ----------
+    def fit(self, sample: np.ndarray) -> None:
+        """
+        샘플 벡터로 투영을 학습합니다 (prefix 방식은 차원만 기록).
+        """
+        x = _normalize(np.asarray(sample, dtype=np.float32))
+        self.full_dim = x.shape[1]
+        if self.dim >= self.full_dim:
+            raise ValueError(f"축소 차원({self.dim})이 원본 차원({self.full_dim}) 이상입니다.")
+        if self.method == "pca":
+            self.mean = x.mean(axis=0)
+            # 공분산 고유벡터 = 중심화 행렬의 우특이벡터
+            _, _, vt = np.linalg.svd(x - self.mean, full_matrices=False)
+            self.components = np.ascontiguousarray(vt[:self.dim].T)
+
+    def project(self, x: np.ndarray) -> np.ndarray:
+        """원본 벡터를 정규화된 축소 벡터로 변환합니다."""
+        x = _normalize(np.atleast_2d(np.asarray(x, dtype=np.float32)))
+        if self.method == "pca":
+            reduced = (x - self.mean) @ self.components
+        else:
+            reduced = x[:, :self.dim]
+        return _normalize(reduced).astype(np.float32)
+
+    def add_batches(self, batches: Iterator[Tuple[List[str], np.ndarray]]) -> None:
+        """(ids, vectors) 배치를 축소하여 인덱스를 구성합니다."""
+        reduced, all_ids = [], []
+        for ids, vectors in batches:
+            reduced.append(self.project(vectors))
+            all_ids.extend(ids)
+        self.vectors = np.concatenate(reduced) if reduced else np.empty((0, self.dim), dtype=np.float32)
+        self.ids = np.asarray(all_ids, dtype=np.str_)
+
+    # ---------- 검색 ----------
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int = 10,
+        batch_size: int = 200000
+    ) -> Tuple[List[List[str]], np.ndarray]:
+        """
+        축소 공간에서 cosine 유사도 상위 k개를 찾습니다.
+
+        Returns:
+            (ids, scores) — ids는 쿼리별 ID 리스트, scores는 (q, k) 축소 공간 유사도
+        """
+        q = self.project(queries)
+        k = min(k, len(self.ids))
+        best_scores = np.full((len(q), 0), -np.inf, dtype=np.float32)
+        best_pos = np.empty((len(q), 0), dtype=np.int64)
+        for start in range(0, len(self.vectors), batch_size):
+            block = np.asarray(self.vectors[start:start + batch_size])
+            scores = np.concatenate([best_scores, q @ block.T], axis=1)
+            pos = np.concatenate(
+                [best_pos, np.broadcast_to(np.arange(start, start + len(block)), (len(q), len(block)))],
+                axis=1
+            )
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_pos = np.take_along_axis(pos, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_pos = np.take_along_axis(best_pos, order, axis=1)
+        return [[str(i) for i in self.ids[row]] for row in best_pos], best_scores
+
+    # ---------- 저장/로드 ----------
+    def save(self, path: Path) -> None:
+        """인덱스를 디렉토리에 저장합니다 (배열별 .npy + meta.json)."""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "vectors.npy", self.vectors)
+        np.save(path / "ids.npy", self.ids)
+        if self.method == "pca":
+            np.save(path / "mean.npy", self.mean)
+            np.save(path / "components.npy", self.components)
+        meta = {
+            "method": self.method,
+            "dim": self.dim,
+            "full_dim": self.full_dim,
+            "count": int(len(self.ids)),
+            "embedding_model": config.EMBEDDING_MODEL_NAME,
+            "stats": self.stats,
+        }
+        (path / "meta.json").write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "ReducedIndex":
+        """저장된 인덱스를 로드합니다 (축소 벡터와 ID는 memory-map)."""
+        path = Path(path)
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("embedding_model") != config.EMBEDDING_MODEL_NAME:
+            logging.warning(
+                "차원 축소 인덱스의 임베딩 모델(%s)이 현재 설정(%s)과 다릅니다. 재구축하세요.",
+                meta.get("embedding_model"), config.EMBEDDING_MODEL_NAME
+            )
+        index = cls(meta["method"], meta["dim"])
+        mode = "r" if mmap else None
+        index.full_dim = meta["full_dim"]
+        index.vectors = np.load(path / "vectors.npy", mmap_mode=mode)
+        index.ids = np.load(path / "ids.npy", mmap_mode=mode)
+        if index.method == "pca":
+            index.mean = np.load(path / "mean.npy")
+            index.components = np.load(path / "components.npy")
+        index.stats = meta.get("stats", {})
+        return index
+
+
+# ==================== 벤치마크 ====================
+def benchmark(
+    index: ReducedIndex,
+    collection,
+    n_queries: int = 100,
+    k: int = 10,
+    rerank_k: int = config.REDUCED_RERANK_K,
+    seed: int = 1
+) -> dict:
+    """
+    원본 차원 exact search 대비 메모리·지연·recall@k를 측정합니다.
+    (원본 벡터는 벤치마크를 위해서만 메모리에 올립니다)
+    """
+    ids, full = [], []
+    for batch_ids, vectors in iter_collection_embeddings(collection):
+        ids.extend(batch_ids)
+        full.append(_normalize(vectors))
+    full = np.concatenate(full)
+    id_arr = np.asarray(ids, dtype=object)
+    position = {doc_id: i for i, doc_id in enumerate(ids)}
+
+    queries = sample_embeddings(collection, n_queries, seed=seed)
+    exact = exact_search(iter([(ids, full)]), queries, k=k)
+
+    # 기준선: 원본 차원 brute-force
+    t0 = time.perf_counter()
+    exact_search(iter([(ids, full)]), queries, k=k)
+    full_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+
+    # 축소 공간 검색 → 원본 벡터 재채점
+    t0 = time.perf_counter()
+    cand_ids, _ = index.search(queries, k=rerank_k)
+    q_full = _normalize(queries)
+    approx = []
+    for qi, cands in enumerate(cand_ids):
+        pos = np.asarray([position[c] for c in cands])
+        scores = full[pos] @ q_full[qi]
+        approx.append(list(id_arr[pos[np.argsort(-scores)[:k]]]))
+    reduced_ms = (time.perf_counter() - t0) * 1000 / len(queries)
+
+    # 재채점 없이 축소 공간 순위만 사용할 때
+    no_rerank, _ = index.search(queries, k=k)
+
+    return {
+        "full_bytes": int(full.nbytes),
+        "reduced_bytes": int(index.vectors.nbytes),
+        "memory_ratio": round(index.vectors.nbytes / full.nbytes, 4),
+        "full_latency_ms": round(full_ms, 3),
+        "reduced_rerank_latency_ms": round(reduced_ms, 3),
+        f"recall@{k}_rerank": round(recall_at_k(approx, exact, k), 4),
+        f"recall@{k}_no_rerank": round(recall_at_k(no_rerank, exact, k), 4),
+        "rerank_k": rerank_k,
+    }
+
+
+def build_from_vectordb(
+    index_path: Path = config.REDUCED_INDEX_PATH,
+    method: str = config.REDUCED_METHOD,
+    dim: int = config.REDUCED_DIM,
+    sample_size: int = 50000,
+    run_benchmark: bool = True
+) -> Optional[ReducedIndex]:
+    """
+    Chroma에 저장된 임베딩으로 차원 축소 인덱스를 구축하고 저장합니다.
+    """
+    from vectordb import create_or_load_vectordb
+
+    db = create_or_load_vectordb()
+    if db is None:
+        print("❌ VectorDB를 로드할 수 없습니다.")
+        return None
+    collection = db._collection
+
+    print(f"📉 차원 축소 인덱스 구축 중 (method={method}, dim={dim})...")
+    index = ReducedIndex(method=method, dim=dim)
+    index.fit(sample_embeddings(collection, sample_size))
+    index.add_batches(iter_collection_embeddings(collection))
+
+    if run_benchmark:
+        print("📏 벤치마크 중 (원본 차원 exact search 대비)...")
+        index.stats = benchmark(index, collection)
+
+    index.save(index_path)
+    print(f"✅ 차원 축소 인덱스 저장: {index_path}")
+    print(json.dumps(index.stats, ensure_ascii=False, indent=2))
+    return index
+
+
+# ==================== CLI ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="차원 축소 인덱스 구축/벤치마크")
+    parser.add_argument("--build", action="store_true", help="Chroma 임베딩으로 인덱스 구축")
+    parser.add_argument("--method", choices=["pca", "prefix"], default=config.REDUCED_METHOD)
+    parser.add_argument("--dim", type=int, default=config.REDUCED_DIM)
+    args = parser.parse_args()
+
+    if args.build:
+        build_from_vectordb(method=args.method, dim=args.dim)
+    else:
+        parser.print_help()
@@ -0,0 +1,93 @@
+"""
+요청 단위 컨텍스트 모듈
+======================
+run_agent() 호출 하나(사용자 질문 하나)에 속한 상태를 contextvars로 관리합니다.
+도구 함수는 인자를 바꾸지 않고도 현재 요청의 상태(선행 검색 결과 등)를 조회할 수 있습니다.
+
+- 같은 스레드에서 실행되는 도구, Tool.ainvoke 경로, 병렬 에이전트의 도구 스레드
+  (parallel_agent가 컨텍스트를 복사해 전달)에서 모두 같은 컨텍스트가 보입니다.
+- 동시에 처리 중인 다른 요청(Streamlit 세션 등)과는 섞이지 않습니다.
+
+요청 마감 시각(deadline)도 함께 관리합니다. 도구는 tool_timeout()으로 고정 타임아웃 대신
+남은 시간에 맞춘 타임아웃을 사용하고, deadline.DeadlineAgentExecutor는 남은 시간이 부족하면
+새 Action을 시작하지 않습니다.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import config
+
+
+class RequestContext:
+    """
+    요청 하나의 상태.
+
+    Attributes:
+        query: 사용자 질문
+        started: 요청 시작 시각 (time.monotonic)
+        deadline: 요청 마감 시각 (time.monotonic, 제한 없으면 None)
+        state: 모듈별 요청 상태 (예: "vectordb_prefetch")
+    """
+
+    def __init__(self, query: str, timeout: Optional[float] = None):
+        self.query = query
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout if timeout else None
+        self.state: Dict[str, Any] = {}
+
+    def elapsed(self) -> float:
+        """요청 시작 후 경과 시간(초)."""
+        return time.monotonic() - self.started
+
+    def remaining(self) -> Optional[float]:
+        """마감까지 남은 시간(초, 음수 가능). 마감이 없으면 None."""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+
+_current: contextvars.ContextVar[Optional[RequestContext]] = contextvars.ContextVar(
+    "request_context", default=None
+)
+
+
+def current() -> Optional[RequestContext]:
+    """현재 요청 컨텍스트 (run_agent 밖에서 호출되면 None)."""
+    return _current.get()
+
+
+def remaining() -> Optional[float]:
+    """현재 요청의 남은 시간(초). 요청 컨텍스트 밖이거나 마감이 없으면 None."""
+    ctx = _current.get()
+    return ctx.remaining() if ctx is not None else None
+
+
+def tool_timeout(default: float) -> float:
+    """
+    도구의 네트워크 호출 타임아웃: 기본값과 요청의 남은 시간 중 작은 값.
+    마감이 지났더라도 config.TOOL_MIN_TIMEOUT_SEC보다 짧게 주지는 않습니다.
+    """
+    left = remaining()
+    if left is None:
+        return default
+    return max(config.TOOL_MIN_TIMEOUT_SEC, min(default, left))
+
+
+@contextmanager
+def request_scope(query: str, timeout: Optional[float] = None) -> Iterator[RequestContext]:
+    """
+    요청 컨텍스트를 열고, 블록이 끝나면 이전 컨텍스트로 되돌립니다.
+
+    Args:
+        query: 사용자 질문
+        timeout: 요청 제한 시간(초). None이면 마감 없음
+    """
+    ctx = RequestContext(query, timeout)
+    token = _current.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _current.reset(token)
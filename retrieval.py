@@ -0,0 +1,314 @@
+"""
+검색 후처리 모듈
+===============
+VectorDB 검색 후보를 Agent에 전달하기 전에 정리합니다.
+
+1. MMR (Maximal Marginal Relevance): 쿼리와의 유사도는 높으면서 서로 중복되지 않는
+   청크를 선택 (후보 임베딩에 대해 numpy로 벡터화)
+2. 인접 청크 병합: 동일 출처·동일 페이지의 청크를 CHUNK_OVERLAP 중복 구간을 제거하여
+   하나의 구간(span)으로 합침
+3. 컨텍스트 패킹: 토큰 예산 안에서 점수 높은 결과부터, 검색어가 포함된 문장 위주로 채움
+"""
+
+import logging
+import re
+from typing import Callable, List, Dict, Any, Tuple
+
+import numpy as np
+
+import config
+import metrics
+from vectordb import tiktoken_len, tokenizer
+
+
+# 오버랩 탐지 시 최소 일치 길이 (문자 수) — 우연한 짧은 일치 방지
+_MIN_OVERLAP_CHARS = 20
+
+
+# ==================== MMR ====================
+def _normalize_rows(x: np.ndarray) -> np.ndarray:
+    return x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+
+
+def cosine_scores(query_embedding, embeddings) -> np.ndarray:
+    """쿼리 임베딩과 후보 임베딩들 사이의 cosine 유사도를 계산합니다."""
+    q = _normalize_rows(np.atleast_2d(np.asarray(query_embedding, dtype=np.float32)))
+    e = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    return (e @ q.T).ravel()
+
+
+def mmr_select(
+    query_embedding,
+    embeddings,
+    k: int,
+    lambda_mult: float = config.MMR_LAMBDA
+) -> List[int]:
+    """
+    MMR로 k개 후보의 인덱스를 선택합니다.
+
+    score(i) = λ · sim(q, d_i) − (1 − λ) · max_{j∈선택됨} sim(d_i, d_j)
+
+    Args:
+        query_embedding: 쿼리 임베딩 (d,)
+        embeddings: 후보 임베딩 (n, d)
+        k: 선택할 개수
+        lambda_mult: 관련성 가중치 (1.0이면 순수 유사도 순)
+
+    Returns:
+        선택된 후보 인덱스 리스트 (선택 순서)
+    """
+    e = _normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    n = len(e)
+    if n == 0:
+        return []
+    k = min(k, n)
+
+    relevance = cosine_scores(query_embedding, e)
+    pairwise = e @ e.T
+
+    selected = [int(relevance.argmax())]
+    # 각 후보와 선택된 집합 사이의 최대 유사도 (선택할 때마다 갱신)
+    redundancy = pairwise[selected[0]].copy()
+    remaining = np.ones(n, dtype=bool)
+    remaining[selected[0]] = False
+
+    while len(selected) < k:
+        mmr = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        mmr[~remaining] = -np.inf
+        nxt = int(mmr.argmax())
+        selected.append(nxt)
+        remaining[nxt] = False
+        np.maximum(redundancy, pairwise[nxt], out=redundancy)
+    return selected
+
+
+# ==================== 인접 청크 병합 ====================
+def _overlap_length(left: str, right: str, max_chars: int) -> int:
+    """left의 접미사와 right의 접두사가 일치하는 최대 길이를 찾습니다."""
+    limit = min(len(left), len(right), max_chars)
+    for size in range(limit, _MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _join_span(left: Dict[str, Any], right: Dict[str, Any]) -> str:
+    """정렬된 두 청크를 중복 구간 없이 이어 붙입니다."""
+    a, b = left["content"], right["content"]
+    a_start = left["metadata"].get("start_index")
+    b_start = right["metadata"].get("start_index")
+    # start_index가 있으면 위치로 정확히 계산
+    if isinstance(a_start, int) and isinstance(b_start, int) and a_start >= 0 and b_start >= 0:
+        overlap = a_start + len(a) - b_start
+        if 0 < overlap <= len(b):
+            return a + b[overlap:]
+        if overlap >= len(b):
+            return a
+        return a + "\n...\n" + b
+    # start_index가 없는 기존 DB: 텍스트 접미사/접두사 일치로 오버랩 탐지
+    # (CHUNK_OVERLAP은 토큰 단위이므로 문자 기준 상한은 넉넉하게 잡음)
+    overlap = _overlap_length(a, b, max_chars=config.CHUNK_OVERLAP * 8)
+    if overlap:
+        return a + b[overlap:]
+    return a + "\n...\n" + b
+
+
+def merge_adjacent(candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    동일 출처·동일 페이지의 청크를 하나의 구간으로 병합합니다.
+    병합된 구간의 순위와 점수는 그룹 내 최고 순위 청크를 따릅니다.
+
+    Args:
+        candidates: {"content", "metadata", "score", ...} 딕셔너리 리스트 (순위순)
+
+    Returns:
+        병합된 후보 리스트 (순위순)
+    """
+    groups: Dict[Tuple[Any, Any], List[Dict[str, Any]]] = {}
+    order = []
+    for cand in candidates:
+        key = (cand["metadata"].get("source"), cand["metadata"].get("page"))
+        if key not in groups:
+            groups[key] = []
+            order.append(key)
+        groups[key].append(cand)
+
+    merged = []
+    for key in order:
+        group = groups[key]
+        head = group[0]
+        if len(group) > 1:
+            # 페이지 내 위치 순으로 정렬 (start_index가 없으면 원래 순위 유지)
+            group = sorted(group, key=lambda c: c["metadata"].get("start_index", 0))
+            # span의 metadata(start_index)는 첫 청크 기준 → 끝 위치 = start_index + len(content)
+            span = group[0]
+            for nxt in group[1:]:
+                span = {**span, "content": _join_span(span, nxt)}
+            head = {
+                **head,
+                "content": span["content"],
+                "merged_chunks": len(group),
+            }
+        merged.append(head)
+    return merged
+
+
+# ==================== 통합 후처리 ====================
+def consolidate(
+    query_embedding,
+    candidates: List[Dict[str, Any]],
+    top_k: int,
+    lambda_mult: float = config.MMR_LAMBDA
+) -> List[Dict[str, Any]]:
+    """
+    MMR 다양화 → 인접 청크 병합을 수행하고 절감된 토큰 수를 기록합니다.
+
+    Args:
+        query_embedding: 쿼리 임베딩
+        candidates: 유사도 순 후보 리스트. 각 항목은 "content", "metadata",
+            "embedding", "score" 키를 가집니다.
+        top_k: 최종 선택할 청크 수 (병합 전 기준)
+
+    Returns:
+        정리된 후보 리스트
+    """
+    if not candidates:
+        return []
+
+    embeddings = np.asarray([c["embedding"] for c in candidates], dtype=np.float32)
+    picked = mmr_select(query_embedding, embeddings, top_k, lambda_mult)
+    # 최종 출력은 관련성(점수) 순으로 정렬
+    selected = sorted((candidates[i] for i in picked), key=lambda c: c["score"], reverse=True)
+    # 기준선: 선택된 청크를 병합 없이 그대로 전달했을 때의 토큰 수
+    baseline_tokens = sum(tiktoken_len(c["content"]) for c in selected)
+    merged = merge_adjacent(selected)
+
+    final_tokens = sum(tiktoken_len(c["content"]) for c in merged)
+    saved = max(baseline_tokens - final_tokens, 0)
+    metrics.incr("vectordb.consolidation.tokens_saved", saved)
+    metrics.observe("vectordb.consolidation.tokens_out", final_tokens)
+    logging.info(
+        "검색 후처리: 청크 %d → %d개, 토큰 %d → %d (%d 절감)",
+        len(selected), len(merged), baseline_tokens, final_tokens, saved
+    )
+    return merged
+
+
+# ==================== 토큰 예산 기반 컨텍스트 패킹 ====================
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_TERM_PATTERN = re.compile(r"[0-9A-Za-z가-힣]+")
+_MIN_CONTENT_TOKENS = 40  # 결과 하나에 최소한 담을 본문 토큰 수
+_STOPWORDS = {
+    "the", "of", "and", "or", "in", "on", "for", "to", "a", "an", "with", "by",
+    "is", "are", "what", "how", "alloy", "alloys",
+}
+
+
+def query_terms(query: str) -> List[str]:
+    """쿼리에서 검색어(소문자, 불용어 제외)를 추출합니다. "Cu-Mg" → ["cu", "mg"]."""
+    terms = [t.lower() for t in _TERM_PATTERN.findall(query or "")]
+    return list(dict.fromkeys(t for t in terms if t not in _STOPWORDS))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """텍스트를 최대 토큰 수로 자릅니다."""
+    tokens = tokenizer.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return tokenizer.decode(tokens[:max_tokens]).rstrip() + "..."
+
+
+def select_sentences(text: str, terms: List[str], max_tokens: int) -> str:
+    """
+    검색어를 많이 포함한 문장부터 max_tokens 이내로 선택하고, 원문 순서로 이어 붙입니다.
+    건너뛴 구간은 " … "로 표시합니다 (구분 기호도 예산에 포함). 검색어가 하나도 없으면 앞부분부터 채웁니다.
+    """
+    sentences = [s.strip() for s in _SENTENCE_SPLIT.split(text) if s and s.strip()]
+    if not sentences or max_tokens <= 0:
+        return ""
+
+    lowered = [s.lower() for s in sentences]
+    hits = [sum(1 for t in terms if t in s) for s in lowered]
+    # 검색어 적중 수 내림차순, 동점이면 원문 순서
+    ranking = sorted(range(len(sentences)), key=lambda i: (-hits[i], i))
+
+    chosen: List[int] = []
+    for i in ranking:
+        candidate = sorted(chosen + [i])
+        if tiktoken_len(_join_sentences(sentences, candidate)) <= max_tokens:
+            chosen = candidate
+        elif not chosen:
+            # 첫 문장조차 길면 잘라서 포함하고 더 이상 추가하지 않음 (잘림 표시 "..."까지 예산 안으로)
+            limit = max_tokens
+            truncated = truncate_tokens(sentences[i], limit)
+            while limit > 1 and tiktoken_len(truncated) > max_tokens:
+                limit -= 1
+                truncated = truncate_tokens(sentences[i], limit)
+            return truncated
+    return _join_sentences(sentences, chosen)
+
+
+def _join_sentences(sentences: List[str], chosen: List[int]) -> str:
+    """선택한 문장(원문 순서)을 이어 붙이고, 건너뛴 구간은 "…"로 표시합니다."""
+    parts = []
+    for prev, cur in zip([None] + chosen[:-1], chosen):
+        if prev is not None and cur != prev + 1:
+            parts.append("…")
+        parts.append(sentences[cur])
+    return " ".join(parts)
+
+
+def pack_results(
+    results: List[Dict[str, Any]],
+    query: str,
+    render: Callable[[int, Dict[str, Any]], str],
+    token_budget: int = config.VECTORDB_OBSERVATION_TOKEN_BUDGET,
+    field_token_cap: int = config.VECTORDB_FIELD_TOKEN_CAP
+) -> Tuple[List[str], int]:
+    """
+    검색 결과를 토큰 예산 안에 점수 높은 순으로 채워 넣습니다.
+
+    결과마다 C-P-P 필드는 field_token_cap 토큰으로 제한하고, 본문은 남은 예산을
+    남은 결과 수로 나눈 몫만큼 검색어가 포함된 문장 위주로 선택합니다.
+    (앞 결과가 몫을 다 쓰지 않으면 남은 예산은 뒤 결과로 넘어감)
+
+    Args:
+        results: 검색 결과 리스트 ("content", "score", C-P-P 필드 포함)
+        query: 검색 쿼리 (결과에 "query" 키가 있으면 그 쿼리를 우선 사용)
+        render: (순번, 결과) → 출력 블록 문자열
+        token_budget: 전체 토큰 예산
+        field_token_cap: C-P-P 필드별 최대 토큰 수
+
+    Returns:
+        (출력 블록 리스트, 사용한 토큰 수)
+    """
+    ranked = sorted(results, key=lambda r: r.get("score", 0.0), reverse=True)
+    blocks, used = [], 0
+
+    for n, result in enumerate(ranked):
+        remaining = token_budget - used
+        packed = {
+            **result,
+            "composition": truncate_tokens(result.get("composition") or "N/A", field_token_cap),
+            "process": truncate_tokens(result.get("process") or "N/A", field_token_cap),
+            "property": truncate_tokens(result.get("property") or "N/A", field_token_cap),
+            "content": "",
+        }
+        header_tokens = tiktoken_len(render(len(blocks) + 1, packed))
+        # 본문을 의미 있게 담을 수 없으면 이후(점수 낮은) 결과는 생략
+        if remaining - header_tokens < _MIN_CONTENT_TOKENS:
+            break
+        share = max(remaining // (len(ranked) - n) - header_tokens, _MIN_CONTENT_TOKENS)
+
+        terms = query_terms(result.get("query") or query)
+        packed["content"] = select_sentences(result.get("content", ""), terms, share)
+        block = render(len(blocks) + 1, packed)
+        cost = tiktoken_len(block)
+        if used + cost > token_budget:
+            # 이 결과만 건너뛰고, 더 짧은 뒤 결과는 계속 시도
+            continue
+        blocks.append(block)
+        used += cost
+
+    metrics.observe("vectordb.observation_tokens", used)
+    return blocks, used
@@ -0,0 +1,236 @@
+"""
+규칙 기반 빠른 경로(fast-path) 라우터
+==================================
+단순 조회 질문은 ReAct 루프(LLM 최소 2회 호출) 없이 알맞은 도구를 바로 호출하고
+템플릿(또는 선택적으로 LLM 1회)으로 답변을 만듭니다.
+
+- "mp_property": 화학식 1개 + Materials Project 물성 1개 (예: "Cu2O의 밴드갭은?")
+  → materials_project "<화학식> property:<필드>"
+- "literature": 영어 주제어 + 논문 + 검색 동사 (예: "electromigration에 관한 최신 논문을 찾아줘")
+  → crossref_search "<주제어>". 논문 내용을 묻는 질문(어떤·요약·what·say 등)이나 검색 동사가 없는 질문은 제외
+- 그 외(비교·이유·실험 데이터 등 추론이 필요한 질문)와 도구 호출이 실패한 경우는 None → 전체 에이전트
+
+경로별 횟수는 "router.route.<경로>" 카운터, 지연 시간은 "router.latency_sec.<경로>" 관측값으로 기록됩니다.
+"""
+
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.agents import AgentAction
+
+import config
+import metrics
+import prompts
+
+
+# ==================== 질문 분류 ====================
+_ELEMENTS = set("""
+H He Li Be B C N O F Ne Na Mg Al Si P S Cl Ar K Ca Sc Ti V Cr Mn Fe Co Ni Cu Zn Ga Ge As Se Br Kr
+Rb Sr Y Zr Nb Mo Tc Ru Rh Pd Ag Cd In Sn Sb Te I Xe Cs Ba La Ce Pr Nd Pm Sm Eu Gd Tb Dy Ho Er Tm Yb
+Lu Hf Ta W Re Os Ir Pt Au Hg Tl Pb Bi Po At Rn Fr Ra Ac Th Pa U Np Pu Am Cm Bk Cf Es Fm Md No Lr
+""".split())
+# 단일 원소 기호 중 영어 단어와 겹치거나(In, As, ...) 한 글자라 오인식 가능성이 큰 것은 화학식으로 보지 않음
+_AMBIGUOUS_SINGLE = {"In", "As", "He", "No", "Be", "At", "Am", "Es"}
+
+_FORMULA_RE = re.compile(r"(?<![A-Za-z0-9])((?:[A-Z][a-z]?\d*(?:\.\d+)?)+)(?![A-Za-z0-9])")
+_ELEMENT_RE = re.compile(r"([A-Z][a-z]?)(\d*(?:\.\d+)?)")
+
+# Materials Project 필드 → (질문 키워드, 표시 이름, 단위)
+_MP_PROPERTIES = {
+    "band_gap": (("밴드갭", "밴드 갭", "band gap", "bandgap"), "밴드갭", "eV"),
+    "formation_energy_per_atom": (("형성 에너지", "형성에너지", "formation energy"), "원자당 형성 에너지", "eV/atom"),
+    "density": (("밀도", "density"), "밀도", "g/cm³"),
+    "crystal_system": (("결정계", "결정 구조", "결정구조", "crystal system", "crystal structure"), "결정계", ""),
+    "space_group": (("공간군", "space group"), "공간군", ""),
+    "is_stable": (("안정성", "안정한가", "stability", "is stable"), "열역학적 안정성", ""),
+}
+# 한글이 없는 질문에 쓰는 영어 표시 이름
+_MP_LABELS_EN = {
+    "band_gap": "band gap",
+    "formation_energy_per_atom": "formation energy per atom",
+    "density": "density",
+    "crystal_system": "crystal system",
+    "space_group": "space group",
+    "is_stable": "thermodynamic stability",
+}
+
+# 추론·비교·실험 데이터가 필요한 질문 (전체 에이전트로 처리)
+_REASONING_WORDS_KO = ("왜", "어떻게", "비교", "차이", "영향", "설명", "이유", "원리", "메커니즘", "실험", "공정", "합금")
+_REASONING_RE = re.compile(
+    r"\b(why|how|compare|versus|vs|difference|effect|explain|mechanism|experiment\w*|process\w*|alloys?)\b",
+    re.IGNORECASE
+)
+
+_LITERATURE_WORDS = ("논문", "paper", "papers", "literature", "publication", "publications")
+# 논문 검색 요청에 필요한 검색 동사 (없으면 논문 내용에 대한 질문일 수 있으므로 전체 에이전트)
+_SEARCH_VERBS_KO = ("찾아", "검색", "추천", "목록")
+_SEARCH_VERB_RE = re.compile(r"\b(find|search|list|recommend)\b", re.IGNORECASE)
+# 논문 내용·선택을 묻는 질문 (검색 결과 목록으로는 답할 수 없음)
+_QUESTION_WORDS_KO = ("어떤", "어느", "무엇", "뭐", "요약", "말하", "내용", "결론", "결과", "주장")
+_QUESTION_RE = re.compile(
+    r"\b(which|what|who|whether|summari[sz]e|summary|say|says|said|tell|claim\w*|conclu\w*|findings?|results?)\b",
+    re.IGNORECASE
+)
+# 논문 검색 요청에서 주제어가 아닌 표현 (긴 표현부터 제거)
+_LITERATURE_FILLERS_KO = sorted((
+    "에 관한", "에 대한", "에 관해", "관련된", "관련", "최신", "최근", "논문들", "논문", "을", "를", "은", "는",
+    "찾아주세요", "찾아 주세요", "찾아줘", "찾아 줘", "검색해주세요", "검색해 주세요", "검색해줘", "검색해 줘",
+    "알려줘", "알려 줘", "알려주세요", "보여줘", "보여 줘", "추천해주세요", "추천해 주세요", "추천해줘", "추천해 줘", "목록", "좀", "들",
+), key=len, reverse=True)
+_LITERATURE_FILLERS_EN = {
+    "find", "search", "show", "list", "recommend", "give", "me", "recent", "latest", "new", "papers", "paper",
+    "literature", "publications", "publication", "on", "about", "regarding", "for", "the", "a", "of",
+    "please", "some", "articles", "article",
+}
+
+
+def _formulas(query: str) -> List[str]:
+    """질문에서 화학식(원소 기호로만 구성된 토큰)을 찾습니다."""
+    found = []
+    for token in _FORMULA_RE.findall(query):
+        parts = _ELEMENT_RE.findall(token)
+        if not parts or any(symbol not in _ELEMENTS for symbol, _ in parts):
+            continue
+        if len(parts) == 1 and not parts[0][1] and (len(token) == 1 or token in _AMBIGUOUS_SINGLE):
+            continue
+        found.append(token)
+    return list(dict.fromkeys(found))
+
+
+def _mp_properties(query: str) -> List[str]:
+    lowered = query.lower()
+    return [field for field, (keywords, _, _) in _MP_PROPERTIES.items() if any(k in lowered for k in keywords)]
+
+
+def _literature_topic(query: str) -> Optional[str]:
+    """논문 검색 요청이면 영어 주제어를, 아니면 None을 반환합니다 (한글 주제어는 번역이 필요하므로 None)."""
+    if any(word in query for word in _QUESTION_WORDS_KO) or _QUESTION_RE.search(query):
+        return None
+    if not (any(verb in query for verb in _SEARCH_VERBS_KO) or _SEARCH_VERB_RE.search(query)):
+        return None
+    remainder = query
+    for filler in _LITERATURE_FILLERS_KO:
+        remainder = remainder.replace(filler, " ")
+    remainder = re.sub(r"[?？!.,]", " ", remainder)
+    if re.search(r"[가-힣]", remainder):
+        return None
+    words = [w for w in remainder.split() if w.lower() not in _LITERATURE_FILLERS_EN]
+    return " ".join(words) or None
+
+
+def classify(query: str) -> Optional[Dict[str, str]]:
+    """
+    질문을 빠른 경로로 분류합니다.
+
+    Returns:
+        {"route": "mp_property", "formula", "property"} | {"route": "literature", "topic"} | None (전체 에이전트)
+    """
+    query = query.strip()
+    if not query or len(query) > config.ROUTER_MAX_QUERY_CHARS:
+        return None
+
+    if any(word in query for word in _REASONING_WORDS_KO) or _REASONING_RE.search(query):
+        return None
+
+    # 논문을 언급한 질문은 명시적인 검색 요청만 빠른 경로로 처리
+    if any(word in query.lower() for word in _LITERATURE_WORDS):
+        topic = _literature_topic(query)
+        return {"route": "literature", "topic": topic} if topic is not None else None
+
+    formulas = _formulas(query)
+    properties = _mp_properties(query)
+    if len(formulas) == 1 and len(properties) == 1:
+        return {"route": "mp_property", "formula": formulas[0], "property": properties[0]}
+    return None
+
+
+# ==================== 답변 생성 ====================
+def _is_error(observation: str) -> bool:
+    return observation.startswith("오류") or observation.startswith("검색 결과가 없습니다")
+
+
+def _template_answer(decision: Dict[str, str], observation: str, query: str) -> str:
+    """도구 결과로 템플릿 답변을 만듭니다 (질문에 한글이 없으면 영어 템플릿)."""
+    english = not re.search(r"[가-힣]", query)
+    if decision["route"] == "literature":
+        if english:
+            return f"Crossref search results for '{decision['topic']}':\n\n{observation}"
+        return f"'{decision['topic']}' 관련 논문 검색 결과입니다 (Crossref).\n\n{observation}"
+
+    _, label, unit = _MP_PROPERTIES[decision["property"]]
+    lines = observation.splitlines()
+    prefix = f"{decision['property']}:"
+    value = next((line[len(prefix):].strip() for line in lines if line.startswith(prefix)), None)
+    if value is None:
+        # 단일 속성 형식이 아니면 (속성 없음 경고 등) 전체 결과를 그대로 표시
+        if english:
+            return f"Materials Project results for {decision['formula']} (DFT-calculated values):\n\n{observation}"
+        return f"{decision['formula']}의 Materials Project 조회 결과입니다 (DFT 계산값).\n\n{observation}"
+    value_text = f"{value}{' ' + unit if unit and value != 'N/A' else ''}"
+    if english:
+        answer = f"**{_MP_LABELS_EN[decision['property']].capitalize()} of {decision['formula']}: {value_text}**\n\n"
+        answer += f"- Source: Materials Project DFT calculation ({lines[0]})"
+        if decision["property"] == "band_gap":
+            answer += "\n- Note: DFT (GGA/PBE) band gaps tend to underestimate experimental values."
+        return answer
+    answer = f"**{decision['formula']}의 {label}: {value_text}**\n\n"
+    answer += f"- 출처: Materials Project DFT 계산값 ({lines[0]})"  # "Material: Cu2O (ID: mp-361)"
+    if decision["property"] == "band_gap":
+        answer += "\n- 참고: DFT(GGA/PBE) 밴드갭은 실험값보다 작게 계산되는 경향이 있습니다."
+    return answer
+
+
+def _phrase_answer(llm, query: str, observation: str) -> Optional[str]:
+    """LLM 1회 호출로 도구 결과를 답변 문장으로 다듬습니다 (실패 시 None → 템플릿 답변)."""
+    try:
+        message = llm.invoke(prompts.FAST_PATH_ANSWER_PROMPT.format(question=query, observation=observation))
+        return str(getattr(message, "content", message)).strip() or None
+    except Exception:
+        logging.exception("Fast-path answer phrasing failed")
+        return None
+
+
+def run_fast_path(query: str, tools: Dict[str, Any], llm=None) -> Optional[Dict[str, Any]]:
+    """
+    빠른 경로로 처리할 수 있으면 도구를 바로 호출하여 답변합니다.
+
+    Args:
+        query: 사용자 질문
+        tools: {도구 이름: Tool} (에이전트와 같은 도구 인스턴스)
+        llm: 답변을 다듬을 LLM (None이면 템플릿 답변)
+
+    Returns:
+        run_agent()와 같은 형식의 응답 + "route". 처리할 수 없으면 None
+    """
+    decision = classify(query)
+    if decision is None:
+        return None
+
+    t0 = time.perf_counter()
+    if decision["route"] == "mp_property":
+        action = AgentAction("materials_project", f"{decision['formula']} property:{decision['property']}", "")
+    else:
+        action = AgentAction("crossref_search", decision["topic"], "")
+    tool = tools.get(action.tool)
+    if tool is None:
+        return None
+
+    try:
+        observation = str(tool.run(action.tool_input))
+    except Exception:
+        logging.exception("Fast-path tool call failed: %s", action.tool)
+        observation = "오류: 도구 호출 실패"
+    if _is_error(observation):
+        metrics.incr(f"router.fallback.{decision['route']}")
+        return None
+
+    output = (_phrase_answer(llm, query, observation) if llm is not None else None) or _template_answer(decision, observation, query)
+    metrics.incr(f"router.route.{decision['route']}")
+    metrics.observe(f"router.latency_sec.{decision['route']}", time.perf_counter() - t0)
+    return {
+        "output": output,
+        "intermediate_steps": [(action, observation)],
+        "route": decision["route"],
+    }
@@ -0,0 +1,158 @@
+"""
+에이전트 scratchpad 관리 모듈
+===========================
+ReAct의 agent_scratchpad는 매 턴 이전의 모든 Thought와 Observation 전체를 다시 포함하므로,
+Observation이 수천 토큰인 검색 결과일 때 에피소드가 길어질수록 프롬프트 크기와 지연 시간이
+거의 제곱으로 늘어납니다.
+
+- 최근 config.SCRATCHPAD_KEEP_RECENT개 턴의 Observation은 그대로 유지
+  (단, 도구별 토큰 예산 config.SCRATCHPAD_TOOL_TOKEN_BUDGET으로 절단)
+- 그보다 오래된 Observation은 도구별 핵심 사실만 추출한 요약으로 대체
+  (vectordb: 출처·페이지·C-P-P, crossref: 제목·저널·연도·DOI, web: 제목·링크, 그 외: 앞부분)
+- 턴별 프롬프트 토큰 수를 "agent.prompt_tokens", "agent.prompt_tokens.iter<n>" 메트릭으로 기록
+
+한 턴에 여러 Action이 있는 병렬 모드(parallel_agent.py)도 같은 포맷을 사용합니다.
+log가 빈 Action은 직전 턴에 속하며, 그 턴의 Observation에는 도구 이름이 붙습니다.
+"""
+
+import re
+from typing import Any, List, Sequence, Tuple
+
+from langchain.tools.render import render_text_description
+from langchain_core.agents import AgentAction
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda
+
+import config
+import metrics
+from retrieval import truncate_tokens
+from vectordb import tiktoken_len
+
+
+# ==================== Observation 요약 ====================
+_VECTORDB_HEADER = re.compile(r"^\[\d+\]\s")
+_VECTORDB_FIELDS = ("📌 Composition:", "🔧 Process:", "📊 Property:")
+_NUMBERED_TITLE = re.compile(r"^\d+\.\s")
+
+
+def _compact_vectordb(observation: str) -> List[str]:
+    """vectordb_search 결과 → "[n] 출처 (p.x) | composition | process | property" (본문 제외)."""
+    facts: List[str] = []
+    for line in observation.splitlines():
+        stripped = line.strip()
+        if _VECTORDB_HEADER.match(stripped):
+            facts.append(stripped)
+        elif facts and stripped.startswith(_VECTORDB_FIELDS):
+            value = stripped.split(":", 1)[1].strip()
+            if value and value != "N/A":
+                facts[-1] += f" | {value}"
+    return facts
+
+
+def _compact_listing(observation: str, keep_prefixes: Tuple[str, ...]) -> List[str]:
+    """번호 목록 형식 결과(crossref, web) → 항목별 제목 + 지정한 필드."""
+    facts: List[str] = []
+    for line in observation.splitlines():
+        stripped = line.strip()
+        if _NUMBERED_TITLE.match(stripped):
+            facts.append(stripped)
+        elif facts and stripped.startswith(keep_prefixes):
+            facts[-1] += f" | {stripped}"
+    return facts
+
+
+def compact_observation(tool: str, observation: str) -> str:
+    """
+    오래된 Observation을 핵심 사실만 남긴 요약으로 바꿉니다 (최대 config.SCRATCHPAD_COMPACT_TOKENS 토큰).
+    오류 메시지 등 알려진 형식이 아니면 앞부분만 남깁니다.
+    """
+    if tool == "vectordb_search":
+        facts = _compact_vectordb(observation)
+    elif tool == "crossref_search":
+        facts = _compact_listing(observation, ("저널:", "DOI:"))
+    elif tool == "web_search":
+        facts = _compact_listing(observation, ("링크:",))
+    else:
+        facts = [line.strip() for line in observation.splitlines() if line.strip()]
+    summary = "\n".join(facts) if facts else observation
+    return "[요약] " + truncate_tokens(summary, config.SCRATCHPAD_COMPACT_TOKENS)
+
+
+def budget_observation(tool: str, observation: str) -> str:
+    """Observation을 도구별 토큰 예산으로 자릅니다."""
+    budget = config.SCRATCHPAD_TOOL_TOKEN_BUDGET.get(tool, config.SCRATCHPAD_TOOL_TOKEN_BUDGET["default"])
+    return truncate_tokens(str(observation), budget)
+
+
+# ==================== Scratchpad 포맷 ====================
+def _turn_ids(intermediate_steps: Sequence[Tuple[AgentAction, str]]) -> List[int]:
+    """단계별 턴 번호 (log가 빈 Action은 직전 턴에 속함)."""
+    ids, turn = [], -1
+    for i, (action, _) in enumerate(intermediate_steps):
+        if action.log or i == 0:
+            turn += 1
+        ids.append(turn)
+    return ids
+
+
+def format_scratchpad(intermediate_steps: Sequence[Tuple[AgentAction, str]]) -> str:
+    """
+    중간 단계를 scratchpad 문자열로 만듭니다.
+    config.SCRATCHPAD_COMPRESSION이 False면 Observation을 그대로 기록합니다 (format_log_to_str과 같은 형식).
+    """
+    turns = _turn_ids(intermediate_steps)
+    n_turns = turns[-1] + 1 if turns else 0
+    thoughts = ""
+    for i, (action, observation) in enumerate(intermediate_steps):
+        observation = str(observation)
+        if config.SCRATCHPAD_COMPRESSION:
+            if turns[i] < n_turns - config.SCRATCHPAD_KEEP_RECENT:
+                observation = compact_observation(action.tool, observation)
+            else:
+                observation = budget_observation(action.tool, observation)
+
+        in_batch = turns.count(turns[i]) > 1
+        thoughts += action.log
+        thoughts += f"\nObservation ({action.tool}): {observation}" if in_batch else f"\nObservation: {observation}"
+        if i + 1 == len(intermediate_steps) or turns[i + 1] != turns[i]:
+            thoughts += "\nThought: "
+    return thoughts
+
+
+# ==================== Agent Runnable ====================
+def create_agent_runnable(
+    llm,
+    tools: Sequence[Any],
+    prompt: BasePromptTemplate,
+    output_parser
+) -> Runnable:
+    """
+    ReAct 에이전트 Runnable을 생성합니다 (create_react_agent와 같은 구성).
+    scratchpad는 format_scratchpad()로 만들고, 턴별 프롬프트 토큰 수를 기록합니다.
+    """
+    missing_vars = {"tools", "tool_names", "agent_scratchpad"}.difference(
+        prompt.input_variables + list(prompt.partial_variables)
+    )
+    if missing_vars:
+        raise ValueError(f"Prompt missing required variables: {missing_vars}")
+
+    prompt = prompt.partial(
+        tools=render_text_description(list(tools)),
+        tool_names=", ".join(t.name for t in tools)
+    )
+
+    def render_prompt(inputs):
+        steps = inputs["intermediate_steps"]
+        values = {k: v for k, v in inputs.items() if k != "intermediate_steps"}
+        prompt_value = prompt.invoke({**values, "agent_scratchpad": format_scratchpad(steps)})
+        tokens = tiktoken_len(prompt_value.to_string())
+        iteration = (_turn_ids(steps)[-1] + 2) if steps else 1
+        metrics.observe("agent.prompt_tokens", tokens)
+        metrics.observe(f"agent.prompt_tokens.iter{iteration}", tokens)
+        return prompt_value
+
+    return (
+        RunnableLambda(render_prompt)
+        | llm.bind(stop=["\nObservation"])
+        | output_parser
+    )
@@ -0,0 +1,316 @@
+"""
+VectorDB 스냅샷 내보내기/가져오기 모듈
+====================================
+Chroma 컬렉션을 버전이 명시된 단일 스냅샷 디렉토리로 내보내고,
+새 서빙 노드에서 재임베딩 없이 그대로 가져옵니다.
+가져오기는 index_versions의 blue/green 새 버전으로 구축되므로 서빙 중인 버전을 덮어쓰지 않습니다.
+논문 인덱스는 청크 임베딩에서 다시 집계하고, C-P-P 인덱스는 C-P-P 문자열만 다시 임베딩합니다.
+
+스냅샷 구성:
+    manifest.json     형식 버전, 임베딩 모델, 차원, 문서 수, 파일별 SHA-256 체크섬
+    embeddings.f32    (count, dim) float32 연속 배열 (헤더 없음 → np.memmap으로 즉시 로드)
+    chunks.json.gz    ID·본문·메타데이터 컬럼형 테이블 ({"컬럼명": [값, ...]})
+
+사용법:
+    python snapshot.py export ./snapshots/2025-06-01
+    python snapshot.py import ./snapshots/2025-06-01 [--target ./chroma_db] [--force]
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent))
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+
+import config
+from doc_table import DocTable, expand_metadata
+
+
+SNAPSHOT_FORMAT_VERSION = 1
+_MANIFEST = "manifest.json"
+_EMBEDDINGS = "embeddings.f32"
+_TABLE = "chunks.json.gz"
+_CPP_KEYS = ("composition", "process", "property")
+
+
+# ==================== 유틸리티 ====================
+def _sha256(path: Path, block_size: int = 1 << 20) -> str:
+    """파일의 SHA-256 체크섬을 계산합니다."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _iter_collection(collection, batch_size: int = 5000) -> Iterator[Dict[str, Any]]:
+    """Chroma 컬렉션의 ID·본문·메타데이터·임베딩을 배치 단위로 읽습니다."""
+    total = collection.count()
+    for offset in range(0, total, batch_size):
+        batch = collection.get(
+            include=["embeddings", "documents", "metadatas"],
+            limit=batch_size,
+            offset=offset
+        )
+        if not batch["ids"]:
+            break
+        yield batch
+
+
+# ==================== 내보내기 ====================
+def export_snapshot(
+    db,
+    out_dir: Path,
+    batch_size: int = 5000,
+    embedding_model: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Chroma 컬렉션을 스냅샷 디렉토리로 내보냅니다.
+
+    Args:
+        db: Chroma VectorDB 인스턴스
+        out_dir: 스냅샷 디렉토리 (비어 있거나 없어야 함)
+        batch_size: 한 번에 읽을 청크 수
+        embedding_model: db를 구축한 임베딩 모델
+                         (None이면 config.VECTOR_DB_PATH 활성 버전의 모델, index_versions.current_embedding_model)
+
+    Returns:
+        manifest 딕셔너리
+    """
+    from index_versions import current_embedding_model
+
+    out_dir = Path(out_dir)
+    if out_dir.exists() and any(out_dir.iterdir()):
+        raise FileExistsError(f"스냅샷 디렉토리가 비어 있지 않습니다: {out_dir}")
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    collection = db._collection
+    total = collection.count()
+    if total == 0:
+        raise ValueError("내보낼 청크가 없습니다.")
+
+    ids: List[str] = []
+    documents: List[str] = []
+    metadatas: List[Dict[str, Any]] = []
+    embeddings: Optional[np.memmap] = None
+    dim = 0
+    written = 0
+
+    print(f"📤 스냅샷 내보내기 중 ({total}개 청크)...")
+    for batch in _iter_collection(collection, batch_size):
+        vectors = np.asarray(batch["embeddings"], dtype=np.float32)
+        if embeddings is None:
+            dim = vectors.shape[1]
+            embeddings = np.memmap(out_dir / _EMBEDDINGS, dtype=np.float32, mode="w+", shape=(total, dim))
+        embeddings[written:written + len(vectors)] = vectors
+        written += len(vectors)
+        ids.extend(batch["ids"])
+        documents.extend(doc or "" for doc in batch["documents"])
+        # 정규화된 DB도 스냅샷에는 원래 형식으로 저장 (노드 간 이식성)
+        metadatas.extend(expand_metadata(db, meta) for meta in batch["metadatas"])
+    embeddings.flush()
+    del embeddings
+
+    # 메타데이터 키 합집합으로 컬럼 구성 (없는 값은 null)
+    keys = sorted({key for meta in metadatas for key in meta})
+    columns: Dict[str, List[Any]] = {"id": ids, "document": documents}
+    for key in keys:
+        columns[f"meta.{key}"] = [meta.get(key) for meta in metadatas]
+    # mtime=0: 같은 내용이면 같은 체크섬
+    with open(out_dir / _TABLE, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+        f.write(json.dumps(columns, ensure_ascii=False).encode("utf-8"))
+
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "embedding_model": embedding_model or current_embedding_model(config.VECTOR_DB_PATH),
+        "collection_name": collection.name,
+        "count": written,
+        "dim": dim,
+        "dtype": "float32",
+        "files": {
+            name: {"sha256": _sha256(out_dir / name), "bytes": (out_dir / name).stat().st_size}
+            for name in (_EMBEDDINGS, _TABLE)
+        },
+    }
+    (out_dir / _MANIFEST).write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"✅ 스냅샷 저장 완료: {out_dir} ({written}개, dim={dim})\n")
+    return manifest
+
+
+# ==================== 로드 ====================
+class Snapshot:
+    """
+    memory-map으로 연 스냅샷. 임베딩은 접근하는 부분만 디스크에서 읽습니다.
+
+    Attributes:
+        manifest: manifest.json 내용
+        embeddings: (count, dim) float32 np.memmap (읽기 전용)
+        columns: ID·본문·메타데이터 컬럼 ({"컬럼명": [값, ...]})
+    """
+
+    def __init__(self, path: Path, verify: bool = True):
+        self.path = Path(path)
+        self.manifest = json.loads((self.path / _MANIFEST).read_text(encoding="utf-8"))
+        if self.manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 스냅샷 형식 버전: {self.manifest.get('format_version')}")
+        if verify:
+            self.verify()
+        self.embeddings = np.memmap(
+            self.path / _EMBEDDINGS,
+            dtype=np.float32,
+            mode="r",
+            shape=(self.manifest["count"], self.manifest["dim"])
+        )
+        with gzip.open(self.path / _TABLE, "rb") as f:
+            self.columns: Dict[str, List[Any]] = json.loads(f.read().decode("utf-8"))
+
+    def verify(self) -> None:
+        """파일 크기와 SHA-256 체크섬을 manifest와 대조합니다."""
+        for name, info in self.manifest["files"].items():
+            file_path = self.path / name
+            if file_path.stat().st_size != info["bytes"] or _sha256(file_path) != info["sha256"]:
+                raise ValueError(f"스냅샷 파일 체크섬 불일치: {file_path}")
+
+    def __len__(self) -> int:
+        return self.manifest["count"]
+
+    @property
+    def ids(self) -> List[str]:
+        return self.columns["id"]
+
+    def rows(self, start: int, end: int) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+        """[start, end) 구간의 ID·본문·메타데이터를 반환합니다 (null 메타데이터는 제외)."""
+        meta_keys = [key for key in self.columns if key.startswith("meta.")]
+        metadatas = [
+            {key[len("meta."):]: self.columns[key][i] for key in meta_keys if self.columns[key][i] is not None}
+            for i in range(start, end)
+        ]
+        return self.columns["id"][start:end], self.columns["document"][start:end], metadatas
+
+    def iter_batches(self, batch_size: int = 10000) -> Iterator[Tuple[List[str], np.ndarray]]:
+        """(ids, embeddings) 배치를 반환합니다. ann_index의 학습/평가 함수에 그대로 사용할 수 있습니다."""
+        ids = self.ids
+        for start in range(0, len(self), batch_size):
+            end = min(start + batch_size, len(self))
+            yield ids[start:end], np.asarray(self.embeddings[start:end])
+
+
+def load_snapshot(path: Path, verify: bool = True) -> Snapshot:
+    """스냅샷을 memory-map으로 엽니다."""
+    return Snapshot(path, verify=verify)
+
+
+# ==================== 가져오기 ====================
+def import_snapshot(
+    snapshot_dir: Path,
+    persist_directory: str = str(config.VECTOR_DB_PATH),
+    force: bool = False,
+    batch_size: int = 5000
+):
+    """
+    스냅샷을 Chroma DB의 새 버전으로 가져옵니다. 저장된 임베딩을 그대로 사용하므로 재임베딩하지 않습니다.
+
+    index_versions.blue_green_build()로 새 버전 디렉토리에 구축하고 검증 통과 시 활성화하므로
+    서빙 중인 버전은 덮어쓰지 않습니다. 포인터에는 스냅샷의 임베딩 모델이 기록됩니다.
+
+    Args:
+        snapshot_dir: 스냅샷 디렉토리
+        persist_directory: VectorDB 경로 (샤드 경로, 버전 디렉토리의 기준)
+        force: 임베딩 모델 불일치를 무시
+
+    Returns:
+        새 버전의 Chroma VectorDB 인스턴스 (구축·검증 실패 시 None)
+    """
+    from langchain_chroma import Chroma
+    from langchain_ollama import OllamaEmbeddings
+    from index_versions import blue_green_build
+    from vectordb import hnsw_configuration
+
+    snap = load_snapshot(snapshot_dir)
+    model = snap.manifest.get("embedding_model") or config.EMBEDDING_MODEL_NAME
+    if model != config.EMBEDDING_MODEL_NAME and not force:
+        raise ValueError(
+            f"스냅샷 임베딩 모델({model})이 현재 설정({config.EMBEDDING_MODEL_NAME})과 다릅니다. "
+            "--force로 무시할 수 있지만 검색 품질이 보장되지 않습니다."
+        )
+
+    def _build(version_dir: str):
+        # 쿼리는 저장된 벡터를 만든 모델로 임베딩해야 함
+        embeddings = OllamaEmbeddings(model=model, base_url=config.OLLAMA_BASE_URL)
+        db = Chroma(
+            persist_directory=version_dir,
+            embedding_function=embeddings,
+            collection_configuration=hnsw_configuration()
+        )
+
+        if db._collection.count():
+            # 기존 청크의 문서 테이블을 덮어쓰면 참조(doc, cpp)가 깨지므로 빈 컬렉션에만 가져옴
+            raise FileExistsError(f"대상 컬렉션이 비어 있지 않습니다: {version_dir}")
+
+        print(f"📥 스냅샷 가져오는 중 ({len(snap)}개 청크, 재임베딩 없음)...")
+        t0 = time.perf_counter()
+        # 문서 테이블은 배치를 정규화하면서 채움 (전체 행을 따로 만들지 않음)
+        table = DocTable() if config.NORMALIZED_METADATA else None
+        for start in range(0, len(snap), batch_size):
+            end = min(start + batch_size, len(snap))
+            ids, documents, metadatas = snap.rows(start, end)
+            if table is not None:
+                metadatas = [table.normalize(meta) for meta in metadatas]
+            db._collection.add(
+                ids=ids,
+                embeddings=np.asarray(snap.embeddings[start:end]),
+                documents=documents,
+                metadatas=metadatas
+            )
+        if table is not None:
+            table.save(version_dir)
+        # 논문 단위 인덱스는 청크 임베딩에서 다시 집계 (재임베딩 없음)
+        from doc_index import build_doc_index
+        build_doc_index(db)
+        # C-P-P 전용 인덱스: 구축 파이프라인과 같이 C-P-P 메타데이터가 있을 때만 (짧은 C-P-P 문자열만 임베딩)
+        if any(f"meta.{key}" in snap.columns for key in _CPP_KEYS):
+            from cpp_index import build_cpp_index
+            build_cpp_index(db)
+        logging.info("스냅샷 가져오기 %.1f초", time.perf_counter() - t0)
+        print(f"✅ 스냅샷 가져오기 완료: {version_dir} ({time.perf_counter() - t0:.1f}초)\n")
+        return db
+
+    return blue_green_build(Path(persist_directory), _build, embedding_model=model, expected_count=len(snap))
+
+
+# ==================== CLI ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="VectorDB 스냅샷 내보내기/가져오기")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="Chroma 컬렉션을 스냅샷으로 내보내기")
+    p_export.add_argument("out_dir", type=str, help="스냅샷 디렉토리")
+    p_export.add_argument("--source", type=str, default=str(config.VECTOR_DB_PATH), help="원본 Chroma DB 경로")
+
+    p_import = sub.add_parser("import", help="스냅샷을 Chroma DB로 가져오기")
+    p_import.add_argument("snapshot_dir", type=str, help="스냅샷 디렉토리")
+    p_import.add_argument("--target", type=str, default=str(config.VECTOR_DB_PATH), help="VectorDB 경로 (새 버전으로 추가)")
+    p_import.add_argument("--force", action="store_true", help="임베딩 모델 불일치 무시")
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        from index_versions import current_embedding_model
+        from vectordb import create_or_load_vectordb
+        source_db = create_or_load_vectordb(persist_directory=args.source)
+        if source_db is None:
+            print("❌ 원본 VectorDB를 로드할 수 없습니다.")
+            sys.exit(1)
+        export_snapshot(source_db, Path(args.out_dir), embedding_model=current_embedding_model(args.source))
+    else:
+        if import_snapshot(Path(args.snapshot_dir), persist_directory=args.target, force=args.force) is None:
+            sys.exit(1)
@@ -0,0 +1,224 @@
+"""
+Final Answer 토큰 스트리밍 모듈
+============================
+ReAct 에이전트의 마지막 LLM 호출(Final Answer)은 토큰 단위로 생성되지만, 출력 파서는 완성된
+응답을 받아야 Action / Final Answer를 구분할 수 있어 사용자는 응답이 끝날 때까지 기다려야 했습니다.
+
+파싱은 그대로 완성된 응답으로 하고, 생성 중인 토큰은 콜백으로 따로 받아 전달합니다.
+
+- FinalAnswerStreamParser: LLM 호출 하나의 토큰을 누적하다가 "Final Answer:"가 나오면 그 뒤 토큰만 전달,
+  "Action:"이 먼저 나오면 아무것도 전달하지 않음 (도구 호출 턴). Final Answer 뒤에 "Action:" 줄이 나오면
+  ReAct 파서가 실패할 턴이므로 그 줄부터는 전달하지 않음
+- FinalAnswerStreamHandler: LLM 호출(run)별 파서를 두고, 가장 먼저 Final Answer에 도달한 호출의 토큰만
+  on_token 콜백으로 전달 (헤징으로 두 모델이 동시에 생성해도 섞이지 않음). 전달 중인 호출이 실패하거나
+  그 턴의 파싱이 실패하면(on_chain_error) 소유권을 풀어 에이전트가 재시도한 턴의 Final Answer를 전달
+- TokenStream: run_agent(on_token=...)를 별도 스레드에서 실행하고 토큰을 iterator로 전달 (Streamlit st.write_stream)
+
+LLM 응답 캐시·답변 캐시·빠른 경로로 처리된 요청은 토큰이 전달되지 않으므로, 호출 측은 최종 output을 표시합니다.
+config.LLM_STREAMING이 False면 agent.run_agent()가 핸들러를 연결하지 않습니다.
+"""
+
+import contextvars
+import queue
+import re
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional
+from uuid import UUID
+
+from langchain.agents.output_parsers.react_single_input import FINAL_ANSWER_ACTION
+from langchain_core.callbacks import BaseCallbackHandler
+
+import metrics
+
+
+_ACTION_RE = re.compile(r"^\s*Action\s*\d*\s*:", re.MULTILINE)
+# 아직 끝나지 않은 줄이 "Action:" 줄이 될 수 있는지 (그 줄은 판단될 때까지 전달을 보류)
+_ACTION_PREFIX_RE = re.compile(r"\s*(A(c(t(i(o(n\s*\d*\s*)?)?)?)?)?)?")
+
+
+class FinalAnswerStreamParser:
+    """
+    LLM 호출 하나의 토큰을 받아 Final Answer 부분만 돌려주는 증분 파서.
+
+    state: "pending"(판단 전) → "final"(Final Answer 전달 중) | "action"(도구 호출 턴, 전달 안 함)
+    "final" → "invalid": Final Answer 뒤에 "Action:" 줄이 나옴 (파싱 실패로 재시도될 턴, 이후 전달 안 함)
+    """
+
+    def __init__(self):
+        self.state = "pending"
+        self._buffer = ""
+        self._line = ""  # "final" 상태에서 "Action:" 줄인지 판단될 때까지 보류 중인 마지막 줄
+        self._started = False  # Final Answer의 첫 비공백 문자를 전달했는지
+
+    def feed(self, token: str) -> str:
+        """토큰을 추가하고, 사용자에게 전달할 텍스트를 반환합니다 (없으면 "")."""
+        if self.state in ("action", "invalid"):
+            return ""
+        if self.state == "final":
+            return self._emit(token)
+
+        self._buffer += token
+        marker = self._buffer.find(FINAL_ANSWER_ACTION)
+        action = _ACTION_RE.search(self._buffer)
+        if action is not None and (marker == -1 or action.start() < marker):
+            self.state = "action"
+            return ""
+        if marker == -1:
+            return ""
+        self.state = "final"
+        return self._emit(self._buffer[marker + len(FINAL_ANSWER_ACTION):])
+
+    def _emit(self, text: str) -> str:
+        # 완성된 줄은 "Action:" 줄이 아니면 전달, 마지막 줄은 "Action:"이 될 수 없을 때만 전달
+        text = self._line + text
+        lines = text.split("\n")
+        out = []
+        for i, line in enumerate(lines):
+            if _ACTION_RE.match(line):
+                self.state = "invalid"
+                self._line = ""
+                return self._strip("\n".join(out)) if out else ""
+            if i == len(lines) - 1 and _ACTION_PREFIX_RE.fullmatch(line):
+                self._line = line
+                break
+            out.append(line)
+        else:
+            self._line = ""
+        text = "\n".join(out)
+        if len(out) < len(lines):
+            text += "\n" if out else ""
+        return self._strip(text)
+
+    def flush(self) -> str:
+        """LLM 호출이 끝났을 때 보류 중인 마지막 줄을 돌려줍니다 (Final Answer 전달 중일 때만)."""
+        line, self._line = self._line, ""
+        return self._strip(line) if self.state == "final" else ""
+
+    def _strip(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+
+class FinalAnswerStreamHandler(BaseCallbackHandler):
+    """
+    Final Answer 토큰을 on_token으로 전달하는 콜백 핸들러.
+
+    tap_output_iter/tap_output_aiter를 구현하므로 langchain_core가 모델의 streaming API를 사용하고
+    토큰마다 on_llm_new_token을 호출합니다 (완성된 응답은 그대로 출력 파서로 전달).
+
+    Args:
+        on_token: Final Answer 토큰을 받을 콜백
+    """
+
+    def __init__(self, on_token: Callable[[str], None]):
+        self.on_token = on_token
+        self._parsers: Dict[UUID, FinalAnswerStreamParser] = {}
+        self._parents: Dict[UUID, Optional[UUID]] = {}  # run → 부모 run (파싱 실패한 턴의 LLM 호출을 찾는 데 사용)
+        self._owner: Optional[UUID] = None
+        self._lock = threading.Lock()
+        self.text = ""
+
+    # _StreamingCallbackHandler 프로토콜 (출력은 그대로 통과)
+    def tap_output_iter(self, run_id: UUID, output: Iterator[Any]) -> Iterator[Any]:
+        return output
+
+    def tap_output_aiter(self, run_id: UUID, output):
+        return output
+
+    def on_chain_start(self, serialized: Any, inputs: Any, *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                         **kwargs: Any) -> None:
+        with self._lock:
+            if self._owner is not None and run_id != self._owner:
+                return
+            self._parents.setdefault(run_id, parent_run_id)
+            parser = self._parsers.setdefault(run_id, FinalAnswerStreamParser())
+            text = parser.feed(token)
+            if parser.state == "final" and self._owner is None:
+                self._owner = run_id
+                metrics.incr("agent.stream.final_answers")
+            elif parser.state == "invalid" and run_id == self._owner:
+                # Final Answer 뒤에 Action이 나온 턴 → 에이전트가 재시도하므로 다음 턴의 Final Answer를 전달
+                self._release()
+            if not text:
+                return
+            self.text += text
+        self.on_token(text)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            if run_id != self._owner:
+                return
+            text = self._parsers[run_id].flush()
+            if not text:
+                return
+            self.text += text
+        self.on_token(text)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        # 전달 중이던 호출이 실패하면 (Groq fallback 등) 다음 호출의 Final Answer를 전달
+        with self._lock:
+            self._parsers.pop(run_id, None)
+            if run_id == self._owner:
+                self._release()
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        # 전달 중이던 호출을 포함한 에이전트 단계가 실패하면 (출력 파싱 실패 → 재시도) 다음 턴의 Final Answer를 전달
+        with self._lock:
+            if self._owner is None:
+                return
+            ancestor = self._parents.get(self._owner)
+            while ancestor is not None and ancestor != run_id:
+                ancestor = self._parents.get(ancestor)
+            if ancestor == run_id:
+                self._parsers.pop(self._owner, None)
+                self._release()
+
+    def _release(self) -> None:
+        """전달 소유권을 풉니다 (lock을 잡은 상태에서 호출)."""
+        self._owner = None
+        self.text = ""
+        metrics.incr("agent.stream.released")
+
+
+class TokenStream:
+    """
+    run(on_token)을 별도 스레드에서 실행하고 Final Answer 토큰을 iterator로 전달합니다.
+    반복이 끝나면 result에 run()의 반환값이 들어 있습니다 (예외는 반복 중에 다시 발생).
+
+    Args:
+        run: on_token 콜백을 받아 실행할 함수 (예: lambda on_token: run_agent(q, on_token=on_token))
+    """
+
+    _DONE = object()
+
+    def __init__(self, run: Callable[[Callable[[str], None]], Any]):
+        self._run = run
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self.result: Any = None
+        self._error: Optional[BaseException] = None
+
+    def _target(self) -> None:
+        try:
+            self.result = self._run(self._queue.put)
+        except BaseException as e:
+            self._error = e
+        finally:
+            self._queue.put(self._DONE)
+
+    def __iter__(self) -> Iterator[str]:
+        ctx = contextvars.copy_context()
+        threading.Thread(target=ctx.run, args=(self._target,), name="agent-stream", daemon=True).start()
+        while True:
+            item = self._queue.get()
+            if item is self._DONE:
+                break
+            yield item
+        if self._error is not None:
+            raise self._error
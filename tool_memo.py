@@ -0,0 +1,93 @@
+"""
+에피소드 단위 도구 호출 메모이제이션
+================================
+ReAct 에이전트는 한 에피소드 안에서 같은 도구를 같은(또는 공백·따옴표만 다른) 입력으로
+다시 호출하는 경우가 많습니다 (예: materials_project "CuMg" → " CuMg ").
+memoize_tools()로 감싼 도구는 현재 요청(request_context)에서 이미 얻은 Observation을
+네트워크 호출 없이 바로 반환하고, 같은 결과라는 짧은 안내를 앞에 붙여 반복 호출 루프를 억제합니다.
+
+- 키: (도구 이름, 정규화한 입력) — 앞뒤 공백·따옴표 제거, 연속 공백 축약.
+  config.TOOL_MEMO_CASE_INSENSITIVE 도구는 대소문자도 무시 (화학식 도구는 "Co" ≠ "CO"이므로 제외)
+- 범위: run_agent() 요청 하나 (request_context 상태 "tool_memo", 빠른 경로와 전체 에이전트가 공유).
+  요청 컨텍스트 밖(run_agent() 없이 도구를 직접 호출)에서는 그대로 도구를 호출
+- "오류"로 시작하는 Observation은 저장하지 않음 (일시적 오류는 다시 시도)
+- 적중/미적중 횟수는 "agent.tool_memo.hit", "agent.tool_memo.miss" 카운터로 기록
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.tools import BaseTool, Tool
+
+import config
+import metrics
+import prompts
+import request_context
+
+
+_STATE_KEY = "tool_memo"
+_QUOTES = "\"'`“”‘’"
+
+
+def normalize_input(tool_name: str, tool_input: Any) -> str:
+    """메모이제이션 키에 사용할 도구 입력 정규화."""
+    text = re.sub(r"\s+", " ", str(tool_input)).strip().strip(_QUOTES).strip()
+    if tool_name in config.TOOL_MEMO_CASE_INSENSITIVE:
+        text = text.lower()
+    return text
+
+
+def _memo() -> Optional[Dict[Tuple[str, str], str]]:
+    """현재 요청의 메모 (요청 컨텍스트 밖이면 None)."""
+    ctx = request_context.current()
+    if ctx is None:
+        return None
+    return ctx.state.setdefault(_STATE_KEY, {})
+
+
+def _lookup(tool_name: str, tool_input: Any) -> Tuple[Optional[Dict[Tuple[str, str], str]], Tuple[str, str], Optional[str]]:
+    memo = _memo()
+    key = (tool_name, normalize_input(tool_name, tool_input))
+    if memo is None:
+        return None, key, None
+    observation = memo.get(key)
+    if observation is not None:
+        metrics.incr("agent.tool_memo.hit")
+        return memo, key, prompts.TOOL_MEMO_NOTE.format(tool=tool_name) + "\n" + observation
+    metrics.incr("agent.tool_memo.miss")
+    return memo, key, None
+
+
+def _remember(memo: Optional[Dict[Tuple[str, str], str]], key: Tuple[str, str], observation: Any) -> None:
+    text = str(observation)
+    if memo is not None and not text.startswith("오류"):
+        memo[key] = text
+
+
+def memoize_tool(tool: BaseTool) -> Tool:
+    """도구 하나를 에피소드 단위 메모이제이션으로 감쌉니다 (이름·설명은 그대로)."""
+
+    def run(tool_input: str) -> str:
+        memo, key, cached = _lookup(tool.name, tool_input)
+        if cached is not None:
+            return cached
+        observation = tool.run(tool_input)
+        _remember(memo, key, observation)
+        return observation
+
+    async def arun(tool_input: str) -> str:
+        memo, key, cached = _lookup(tool.name, tool_input)
+        if cached is not None:
+            return cached
+        observation = await tool.arun(tool_input)
+        _remember(memo, key, observation)
+        return observation
+
+    return Tool(name=tool.name, description=tool.description, func=run, coroutine=arun)
+
+
+def memoize_tools(tools: Sequence[BaseTool]) -> List[BaseTool]:
+    """도구 목록을 메모이제이션 도구로 감쌉니다 (config.TOOL_MEMO가 False면 그대로 반환)."""
+    if not config.TOOL_MEMO:
+        return list(tools)
+    return [memoize_tool(tool) for tool in tools]
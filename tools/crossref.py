@@ -13,9 +13,13 @@ from typing import List, Dict, Any
 from habanero import Crossref
 from langchain_core.tools import Tool
 import config
+from request_context import tool_timeout
+from circuit_breaker import CircuitOpenError, get_breaker
 
-# Crossref 클라이언트 (세션 재사용)
-_cr = Crossref(mailto=config.CROSSREF_MAILTO)
+
+def _client() -> Crossref:
+    """Crossref 클라이언트 (타임아웃은 요청의 남은 시간에 맞춰 호출마다 지정)."""
+    return Crossref(mailto=config.CROSSREF_MAILTO, timeout=tool_timeout(config.CROSSREF_API_TIMEOUT))
 
 
 def search_crossref(
@@ -47,7 +51,8 @@ def search_crossref(
         ]
     """
     try:
-        results = _cr.works(
+        results = get_breaker("crossref").call(
+            _client().works,
             query=query,
             limit=rows,
             sort=sort,
@@ -116,6 +121,8 @@ def search_crossref(
         
         return papers
         
+    except CircuitOpenError as e:
+        return [{"error": f"{e} 잠시 후 다시 시도하세요.", "query": query}]
     except Exception:
         logging.exception("Crossref API error")
         return [{
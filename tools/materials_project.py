@@ -13,6 +13,8 @@ from typing import Optional, Dict, Any
 from mp_api.client import MPRester
 from langchain_core.tools import Tool
 import config
+from request_context import tool_timeout
+from circuit_breaker import CircuitOpenError, get_breaker
 
 
 def search_materials_project(
@@ -49,8 +51,11 @@ def search_materials_project(
     
     try:
         with MPRester(config.MATERIALS_PROJECT_API_KEY) as mpr:
-            # formula로 검색
-            docs = mpr.summary.search(
+            # 요청의 남은 시간에 맞춘 타임아웃 (기본값 config.MP_API_TIMEOUT)
+            mpr.summary.timeout = tool_timeout(config.MP_API_TIMEOUT)
+            # formula로 검색 (서킷 브레이커가 열려 있으면 호출하지 않음)
+            docs = get_breaker("materials_project").call(
+                mpr.summary.search,
                 formula=formula,
                 fields=[
                     "material_id",
@@ -113,6 +118,8 @@ def search_materials_project(
             
             return result
             
+    except CircuitOpenError as e:
+        return {"error": f"{e} 잠시 후 다시 시도하세요.", "formula": formula}
     except Exception:
         logging.exception("Materials Project API error: %s", formula)
         return {
@@ -14,6 +14,7 @@ from typing import List, Dict, Any
 import requests
 
 import config
+from request_context import tool_timeout
 
 
 def search_oqmd(
@@ -56,7 +57,7 @@ def search_oqmd(
         response = requests.get(
             url,
             params=params,
-            timeout=config.OQMD_API_TIMEOUT
+            timeout=tool_timeout(config.OQMD_API_TIMEOUT)
         )
         response.raise_for_status()
         data = response.json()
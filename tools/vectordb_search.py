@@ -4,36 +4,443 @@ VectorDB Search Tool
 VectorDB에서 C-P-P 메타데이터를 포함한 문서를 검색하는 도구입니다.
 """
 
+import asyncio
 import logging
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
 from langchain_core.tools import Tool
 import config
+import metrics
+import request_context
+from cpp_index import get_cpp_collection
+from doc_index import select_sources
+from doc_table import expand_metadata, source_filter
+from index_versions import current_path
+from retrieval import consolidate, cosine_scores, pack_results
 from vectordb import create_or_load_vectordb
 
 
-# 전역 VectorDB 인스턴스 (lazy loading)
-_vectordb = None
+# ==================== 리소스 관리 (스레드 안전 싱글톤) ====================
+class VectorDBManager:
+    """
+    VectorDB·IVF-PQ 인덱스 핸들을 프로세스 내에서 하나만 생성하여 공유합니다.
+
+    - start_background_load(): 프로세스 시작 시 백그라운드 스레드에서 DB를 열고
+      Ollama 임베딩 모델에 warm-up 요청을 보내 첫 질문의 cold-start를 제거
+    - get(): 로드가 끝났으면 즉시 반환, 진행 중이면 완료까지 대기 (중복 생성 없음)
+    - get_shards(): config.VECTOR_DB_SHARDS의 모든 샤드 핸들 ({이름: DB})
+    - status(): 준비 상태(health) 조회
+    - 활성 버전 포인터(index_versions.py)가 바뀌면 새 버전을 백그라운드로 로드·warm-up한 뒤
+      핸들을 교체 (교체 전까지 기존 버전으로 계속 서빙)
+
+    Chroma 핸들은 읽기 전용으로만 사용하므로 여러 스레드(Streamlit 세션)가 공유해도 안전합니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._shards: Dict[str, Any] = {}
+        self._paths: Dict[str, Path] = {}  # 샤드별 로드된 활성 버전 경로
+        self._last_check = 0.0
+        self._swap_thread: Optional[threading.Thread] = None
+        self._ann_index = None
+        self._thread: Optional[threading.Thread] = None
+        self._state = "idle"  # idle → loading → ready | degraded | error
+        self._error: Optional[str] = None
+        self._timings: Dict[str, float] = {}
+
+    def start_background_load(self) -> None:
+        """백그라운드 로드를 시작합니다 (여러 번 호출해도 한 번만 실행)."""
+        with self._lock:
+            if self._thread is not None or self._shards:
+                return
+            self._state = "loading"
+            self._thread = threading.Thread(target=self._background_load, name="vectordb-loader", daemon=True)
+            self._thread.start()
+
+    def _background_load(self) -> None:
+        try:
+            self.get()
+        except Exception:
+            # 실패 상태는 status()로 노출, 이후 get() 호출 시 재시도
+            logging.exception("VectorDB 백그라운드 로드 실패")
+
+    def get(self):
+        """기본(primary) VectorDB 인스턴스를 반환합니다 (필요 시 로드, 스레드 안전)."""
+        return next(iter(self.get_shards().values()))
+
+    def get_shards(self) -> Dict[str, Any]:
+        """모든 샤드의 VectorDB 인스턴스를 반환합니다 (필요 시 로드, 스레드 안전)."""
+        shards = self._shards
+        if shards:
+            self._check_for_new_version()
+            return shards
+        with self._lock:
+            if not self._shards:
+                self._state = "loading"
+                t0 = time.perf_counter()
+                loaded = {}
+                for name, path in config.VECTOR_DB_SHARDS.items():
+                    active = current_path(path)
+                    db = create_or_load_vectordb(persist_directory=str(path))
+                    if db is None:
+                        logging.warning("VectorDB 샤드 로드 실패: %s (%s)", name, path)
+                        continue
+                    loaded[name] = db
+                    self._paths[name] = active
+                if not loaded:
+                    self._state = "error"
+                    self._error = "VectorDB를 로드할 수 없습니다."
+                    raise RuntimeError("VectorDB를 로드할 수 없습니다. vectordb.py로 먼저 DB를 생성하세요.")
+                self._timings["load_sec"] = round(time.perf_counter() - t0, 3)
+                self._warm_up(next(iter(loaded.values())))
+                if len(loaded) < len(config.VECTOR_DB_SHARDS):
+                    self._state = "degraded"
+                    self._error = f"일부 샤드 로드 실패 ({len(loaded)}/{len(config.VECTOR_DB_SHARDS)})"
+                self._shards = loaded
+            return self._shards
+
+    def _check_for_new_version(self) -> None:
+        """
+        활성 버전 포인터가 바뀌었는지 주기적으로(config.VECTOR_DB_POINTER_CHECK_SEC) 확인하고,
+        바뀌었으면 백그라운드 교체를 시작합니다. 검색 요청은 기다리지 않습니다.
+        """
+        now = time.monotonic()
+        if now - self._last_check < config.VECTOR_DB_POINTER_CHECK_SEC:
+            return
+        with self._lock:
+            if now - self._last_check < config.VECTOR_DB_POINTER_CHECK_SEC:
+                return
+            self._last_check = now
+            if self._swap_thread is not None and self._swap_thread.is_alive():
+                return
+            changed = {
+                name: path for name, path in config.VECTOR_DB_SHARDS.items()
+                if current_path(path) != self._paths.get(name)
+            }
+            if not changed:
+                return
+            self._swap_thread = threading.Thread(
+                target=self._swap_versions, args=(changed,), name="vectordb-swap", daemon=True
+            )
+            self._swap_thread.start()
+
+    def _swap_versions(self, changed: Dict[str, Path]) -> None:
+        """바뀐 샤드의 새 버전을 로드·warm-up한 뒤 핸들 딕셔너리를 한 번에 교체합니다."""
+        loaded, paths = {}, {}
+        for name, path in changed.items():
+            active = current_path(path)
+            try:
+                db = create_or_load_vectordb(persist_directory=str(path))
+                if db is None:
+                    raise RuntimeError("VectorDB 로드 실패")
+                db.embeddings.embed_query("warm-up")
+            except Exception:
+                logging.exception("새 VectorDB 버전 로드 실패 — 기존 버전 유지: %s (%s)", name, active)
+                continue
+            loaded[name], paths[name] = db, active
+        if not loaded:
+            return
+        with self._lock:
+            self._shards = {**self._shards, **loaded}  # 참조 교체 (진행 중인 검색은 기존 핸들 사용)
+            self._paths.update(paths)
+            if self._ann_index is not None:
+                logging.warning("VectorDB 버전이 바뀌었습니다. IVF-PQ/차원 축소 인덱스를 다시 구축하세요.")
+                self._ann_index = None
+        logging.info("VectorDB 활성 버전 교체 완료: %s", {n: p.name for n, p in paths.items()})
+        metrics.incr("vectordb.version_swaps")
+
+    def _warm_up(self, db) -> None:
+        """임베딩 모델을 메모리에 올리기 위해 짧은 임베딩 요청을 보냅니다."""
+        t0 = time.perf_counter()
+        try:
+            db.embeddings.embed_query("warm-up")
+            self._state = "ready"
+            self._error = None
+        except Exception:
+            logging.warning("임베딩 모델 warm-up 실패 (Ollama 상태 확인)", exc_info=True)
+            self._state = "degraded"
+            self._error = "임베딩 모델 warm-up 실패"
+        self._timings["warmup_sec"] = round(time.perf_counter() - t0, 3)
+
+    def get_ann_index(self):
+        """
+        config.RETRIEVAL_ENGINE에 해당하는 근사 검색 인덱스(IVF-PQ 또는 차원 축소)를
+        반환합니다 (memory-map 로드, 스레드 안전).
+        """
+        index = self._ann_index
+        if index is not None:
+            return index
+        with self._lock:
+            if self._ann_index is None:
+                if config.RETRIEVAL_ENGINE == "reduced":
+                    from reduced_index import ReducedIndex as index_cls
+                    path, build_cmd = config.REDUCED_INDEX_PATH, "python reduced_index.py --build"
+                else:
+                    from ann_index import IVFPQIndex as index_cls
+                    path, build_cmd = config.IVFPQ_INDEX_PATH, "python ann_index.py --train"
+                if not path.exists():
+                    raise RuntimeError(f"검색 인덱스가 없습니다. `{build_cmd}`로 먼저 구축하세요.")
+                if len(config.VECTOR_DB_SHARDS) > 1:
+                    logging.warning(
+                        "RETRIEVAL_ENGINE=%s는 인덱스를 학습한 기본 VectorDB만 검색합니다 (샤드 %d개 중 나머지는 제외).",
+                        config.RETRIEVAL_ENGINE, len(config.VECTOR_DB_SHARDS)
+                    )
+                self._ann_index = index_cls.load(path)
+            return self._ann_index
+
+    def is_ready(self) -> bool:
+        return bool(self._shards)
+
+    def status(self) -> Dict[str, Any]:
+        """
+        현재 준비 상태를 반환합니다.
+
+        Returns:
+            {"state": str, "ready": bool, "error": str | None, "shards": list,
+             "versions": {샤드: 활성 버전 디렉토리명}, "load_sec": float, "warmup_sec": float}
+        """
+        return {
+            "state": self._state,
+            "ready": self.is_ready(),
+            "error": self._error,
+            "shards": list(self._shards),
+            "versions": {name: path.name for name, path in self._paths.items()},
+            **self._timings,
+        }
+
+
+_manager = VectorDBManager()
+
+
+def start_vectordb_preload() -> None:
+    """
+    VectorDB 로드와 임베딩 모델 warm-up을 백그라운드에서 시작합니다.
+    프로세스 시작 시(app.py, create_agent) 호출합니다.
+    """
+    _manager.start_background_load()
+
+
+def vectordb_status() -> Dict[str, Any]:
+    """VectorDB 준비 상태(health)를 반환합니다."""
+    return _manager.status()
 
 
 def get_vectordb():
     """
-    VectorDB 인스턴스를 가져옵니다 (싱글톤 패턴).
+    VectorDB 인스턴스를 가져옵니다 (스레드 안전 싱글톤).
     """
-    global _vectordb
-    if _vectordb is None:
-        _vectordb = create_or_load_vectordb()
-        if _vectordb is None:
-            raise RuntimeError("VectorDB를 로드할 수 없습니다. vectordb.py로 먼저 DB를 생성하세요.")
-    return _vectordb
+    return _manager.get()
+
+
+def get_ann_index():
+    """
+    근사 검색 인덱스(IVF-PQ 또는 차원 축소)를 가져옵니다 (스레드 안전 싱글톤, memory-map 로드).
+    """
+    return _manager.get_ann_index()
+
+
+def _chroma_candidates(db, query_embeddings, n_results: int) -> List[List[Dict[str, Any]]]:
+    """
+    Chroma 컬렉션에서 쿼리별 후보 청크를 임베딩과 함께 조회합니다 (한 번의 배치 쿼리).
+    계층형 검색이 켜져 있으면 논문 인덱스로 고른 논문의 청크로 범위를 제한합니다.
+    """
+    where = None
+    if config.HIERARCHICAL_RETRIEVAL:
+        sources = select_sources(db, query_embeddings)
+        if sources:
+            where = source_filter(db, sources)
+    res = db._collection.query(
+        query_embeddings=list(query_embeddings),
+        n_results=n_results,
+        where=where,
+        include=["documents", "metadatas", "embeddings"]
+    )
+    return [
+        _to_candidates(
+            q_emb,
+            res["ids"][i],
+            res["documents"][i],
+            [expand_metadata(db, meta) for meta in res["metadatas"][i]],
+            res["embeddings"][i]
+        )
+        for i, q_emb in enumerate(query_embeddings)
+    ]
+
+
+def _ann_candidates(db, query_embeddings, n_results: int) -> List[List[Dict[str, Any]]]:
+    """
+    근사 검색 인덱스(IVF-PQ 또는 차원 축소)로 쿼리별 후보 ID를 찾은 뒤
+    Chroma에서 본문/메타데이터/원본 임베딩을 ID로 한 번에 조회하고,
+    원본 벡터의 cosine 유사도로 재채점하여 상위 n_results개를 반환합니다.
+    계층형 검색이 켜져 있으면 논문 인덱스로 고른 논문의 청크만 남깁니다 (기본 DB만 검색, 샤드 제외).
+    """
+    index = get_ann_index()
+    search_k = max(n_results, config.REDUCED_RERANK_K) if config.RETRIEVAL_ENGINE == "reduced" else n_results
+    # 근사 인덱스에는 where 필터가 없으므로 계층형 검색의 논문 범위는 후보를 넉넉히 찾은 뒤 적용
+    sources = select_sources(db, query_embeddings) if config.HIERARCHICAL_RETRIEVAL else None
+    if sources:
+        search_k *= config.ANN_FILTER_OVERSAMPLE
+    ids_per_query, _ = index.search(query_embeddings, k=search_k)
+    all_ids = list(dict.fromkeys(doc_id for ids in ids_per_query for doc_id in ids))
+    if not all_ids:
+        return [[] for _ in ids_per_query]
+
+    fetched = db._collection.get(ids=all_ids, include=["documents", "metadatas", "embeddings"])
+    position = {doc_id: i for i, doc_id in enumerate(fetched["ids"])}
+
+    results = []
+    for q_emb, ids in zip(query_embeddings, ids_per_query):
+        order = [position[doc_id] for doc_id in ids if doc_id in position]
+        candidates = _to_candidates(
+            q_emb,
+            [fetched["ids"][i] for i in order],
+            [fetched["documents"][i] for i in order],
+            [expand_metadata(db, fetched["metadatas"][i]) for i in order],
+            [fetched["embeddings"][i] for i in order],
+        )
+        if sources:
+            allowed = set(sources)
+            in_scope = [c for c in candidates if c["metadata"].get("source") in allowed]
+            metrics.incr("vectordb.ann.source_filtered" if in_scope else "vectordb.ann.source_filter_empty")
+            candidates = in_scope or candidates  # 선택한 논문의 청크가 하나도 없으면 필터 없이 사용
+        # 원본(full) 벡터 점수로 재정렬
+        candidates.sort(key=lambda c: c["score"], reverse=True)
+        results.append(candidates[:n_results])
+    return results
+
+
+def _to_candidates(query_embedding, ids, documents, metadatas, embeddings) -> List[Dict[str, Any]]:
+    """Chroma 조회 결과를 후처리용 후보 딕셔너리 리스트로 변환합니다 (cosine 점수 포함)."""
+    if len(ids) == 0:
+        return []
+    scores = cosine_scores(query_embedding, embeddings)
+    return [
+        {
+            "id": doc_id,
+            "content": doc or "",
+            "metadata": meta or {},
+            "embedding": emb,
+            "score": float(score),
+        }
+        for doc_id, doc, meta, emb, score in zip(ids, documents, metadatas, embeddings, scores)
+    ]
+
+
+def _to_result(candidate: Dict[str, Any]) -> Dict[str, Any]:
+    """후보 청크를 검색 결과 딕셔너리로 변환합니다."""
+    metadata = candidate["metadata"]
+    return {
+        "content": candidate["content"],  # 길이 제한은 Observation 패킹 단계에서 토큰 예산으로 처리
+        "source": metadata.get("source", "Unknown"),
+        "page": metadata.get("page", "Unknown"),
+        "composition": metadata.get("composition", "N/A"),
+        "process": metadata.get("process", "N/A"),
+        "property": metadata.get("property", "N/A"),
+        "score": round(candidate["score"], 4),
+        "shard": candidate.get("shard", next(iter(config.VECTOR_DB_SHARDS)))
+    }
+
+
+# 샤드 병렬 조회용 스레드 풀 (프로세스 공유)
+_shard_pool: Optional[ThreadPoolExecutor] = None
+_shard_pool_lock = threading.Lock()
+
+
+def _get_shard_pool() -> ThreadPoolExecutor:
+    global _shard_pool
+    with _shard_pool_lock:
+        if _shard_pool is None:
+            _shard_pool = ThreadPoolExecutor(
+                max_workers=max(2, len(config.VECTOR_DB_SHARDS)),
+                thread_name_prefix="vectordb-shard"
+            )
+        return _shard_pool
+
+
+def _query_shard(name: str, db, query_embeddings, n_results: int) -> List[List[Dict[str, Any]]]:
+    """샤드 하나를 조회하고 지연 시간을 기록합니다. 후보 ID에는 샤드 이름을 붙여 충돌을 방지합니다."""
+    t0 = time.perf_counter()
+    per_query = _chroma_candidates(db, query_embeddings, n_results)
+    latency_ms = (time.perf_counter() - t0) * 1000
+    metrics.observe(f"vectordb.shard.{name}.latency_ms", latency_ms)
+    logging.info("VectorDB 샤드 '%s' 조회: %.1f ms", name, latency_ms)
+    for candidates in per_query:
+        for cand in candidates:
+            cand["id"] = f"{name}:{cand['id']}"
+            cand["shard"] = name
+    return per_query
+
+
+def _sharded_candidates(shards: Dict[str, Any], query_embeddings, n_results: int) -> List[List[Dict[str, Any]]]:
+    """
+    모든 샤드를 스레드 풀로 병렬 조회한 뒤 쿼리별 전역 top-n으로 병합합니다.
+    점수는 각 샤드의 거리 함수와 무관하게 쿼리 임베딩과의 cosine 유사도로
+    다시 계산되어 있으므로(_to_candidates) 샤드 간에 그대로 비교할 수 있습니다.
+    """
+    pool = _get_shard_pool()
+    futures = {
+        name: pool.submit(_query_shard, name, db, query_embeddings, n_results)
+        for name, db in shards.items()
+    }
+    merged: List[List[Dict[str, Any]]] = [[] for _ in query_embeddings]
+    for name, future in futures.items():
+        try:
+            per_query = future.result()
+        except Exception:
+            logging.exception("VectorDB 샤드 조회 실패: %s", name)
+            continue
+        for i, candidates in enumerate(per_query):
+            merged[i].extend(candidates)
+    return [
+        sorted(candidates, key=lambda c: c["score"], reverse=True)[:n_results]
+        for candidates in merged
+    ]
+
+
+def _retrieve(db, query_embeddings, top_k: int) -> List[List[Dict[str, Any]]]:
+    """
+    쿼리 임베딩들에 대해 후보 조회 → 후처리(MMR + 병합)를 수행합니다.
+    샤드가 여러 개이면 병렬 fan-out 후 전역 top-k로 병합합니다.
+
+    Returns:
+        쿼리별 정리된 후보 리스트
+    """
+    # 후처리(MMR + 병합)를 위해 top_k보다 넉넉하게 후보를 가져옴
+    fetch_k = max(top_k, config.RETRIEVAL_FETCH_K) if config.CONSOLIDATE_RESULTS else top_k
+
+    # 대규모 코퍼스: IVF-PQ / 차원 축소 근사 검색 엔진 (config.RETRIEVAL_ENGINE, 기본 DB 대상)
+    if config.RETRIEVAL_ENGINE in ("ivfpq", "reduced"):
+        per_query = _ann_candidates(db, query_embeddings, fetch_k)
+    else:
+        shards = _manager.get_shards()
+        if len(shards) > 1:
+            per_query = _sharded_candidates(shards, query_embeddings, fetch_k)
+        else:
+            per_query = _chroma_candidates(db, query_embeddings, fetch_k)
+
+    if config.CONSOLIDATE_RESULTS:
+        return [
+            consolidate(q_emb, candidates, top_k)
+            for q_emb, candidates in zip(query_embeddings, per_query)
+        ]
+    return [candidates[:top_k] for candidates in per_query]
+
+
+_SEARCH_ERROR = "VectorDB 검색 중 오류가 발생했습니다. DB 상태를 확인하세요."
 
 
 def search_vectordb(
     query: str,
-    top_k: int = config.RETRIEVAL_TOP_K
+    top_k: int = config.RETRIEVAL_TOP_K,
+    query_embedding: Optional[List[float]] = None
 ) -> List[Dict[str, Any]]:
     """
     VectorDB에서 쿼리와 유사한 문서를 검색합니다.
@@ -41,6 +448,7 @@ def search_vectordb(
     Args:
         query: 검색 쿼리
         top_k: 반환할 문서 수
+        query_embedding: 이미 계산한 쿼리 임베딩 (None이면 새로 임베딩)
         
     Returns:
         문서 리스트 (C-P-P 메타데이터 포함)
@@ -51,62 +459,443 @@ def search_vectordb(
                 "page": int,
                 "composition": str,
                 "process": str,
-                "property": str
+                "property": str,
+                "score": float  # 쿼리와의 cosine 유사도
             }
         ]
     """
     try:
         db = get_vectordb()
-        
-        # 유사도 검색
-        results = db.similarity_search(query, k=top_k)
-        
-        if not results:
-            return []
-        
+        if query_embedding is None:
+            query_embedding = db.embeddings.embed_query(query)
+        candidates = _retrieve(db, [query_embedding], top_k)[0]
+
         # 결과 포맷팅
-        formatted_results = []
-        for doc in results:
-            formatted_results.append({
-                "content": doc.page_content[:500] + "..." if len(doc.page_content) > 500 else doc.page_content,
-                "source": doc.metadata.get("source", "Unknown"),
-                "page": doc.metadata.get("page", "Unknown"),
-                "composition": doc.metadata.get("composition", "N/A"),
-                "process": doc.metadata.get("process", "N/A"),
-                "property": doc.metadata.get("property", "N/A")
-            })
-        
-        return formatted_results
+        return [_to_result(c) for c in candidates]
         
     except Exception:
         logging.exception("VectorDB search error")
-        return [{
-            "error": "VectorDB 검색 중 오류가 발생했습니다. DB 상태를 확인하세요.",
-            "query": query
-        }]
+        return [{"error": _SEARCH_ERROR, "query": query}]
+
+
+def search_vectordb_many(
+    queries: List[str],
+    top_k: int = config.RETRIEVAL_TOP_K,
+    query_embeddings: Optional[List[List[float]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    여러 쿼리를 한 번에 검색합니다.
+    임베딩은 한 번의 배치 요청, Chroma 조회도 한 번의 배치 쿼리로 처리하고
+    쿼리 간 중복 청크는 가장 높은 점수 하나만 남깁니다.
+
+    Args:
+        queries: 검색 쿼리 리스트
+        top_k: 쿼리당 반환할 문서 수
+        query_embeddings: 이미 계산한 쿼리 임베딩 (None이면 배치 임베딩, 빈 쿼리가 없어야 함)
+
+    Returns:
+        search_vectordb()와 같은 형식의 문서 리스트 (점수 내림차순).
+        각 항목에 해당 청크를 찾은 쿼리("query")가 추가됩니다.
+    """
+    if query_embeddings is None:
+        queries = [q.strip() for q in queries if q and q.strip()]
+    if not queries:
+        return []
+
+    try:
+        db = get_vectordb()
+        if query_embeddings is None:
+            query_embeddings = db.embeddings.embed_documents(queries)
+        per_query = _retrieve(db, query_embeddings, top_k)
+        return _dedupe(queries, per_query)
+
+    except Exception:
+        logging.exception("VectorDB multi-query search error")
+        return [{"error": _SEARCH_ERROR, "query": "; ".join(queries)}]
+
+
+def _dedupe(queries: List[str], per_query: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """쿼리 간 중복 청크를 제거하고(최고 점수만 유지) 점수순 결과 리스트로 변환합니다."""
+    best: Dict[str, Dict[str, Any]] = {}
+    for query, candidates in zip(queries, per_query):
+        for cand in candidates:
+            prev = best.get(cand["id"])
+            if prev is None or cand["score"] > prev["score"]:
+                best[cand["id"]] = {**cand, "query": query}
+
+    merged = sorted(best.values(), key=lambda c: c["score"], reverse=True)
+    return [{**_to_result(c), "query": c["query"]} for c in merged]
+
+
+def search_cpp(
+    queries: List[str],
+    query_embeddings: List[List[float]],
+    top_k: int = config.RETRIEVAL_TOP_K
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    C-P-P 전용 인덱스(모든 샤드)를 검색합니다. 본문 없이 C-P-P 필드만 반환합니다.
+
+    Args:
+        queries: 검색 쿼리 리스트
+        query_embeddings: 쿼리 임베딩 (전체 청크 검색으로 대체 시 재사용)
+        top_k: 쿼리당 반환할 항목 수
+
+    Returns:
+        search_vectordb_many()와 같은 형식의 결과 리스트 (content는 빈 문자열).
+        C-P-P 인덱스가 없거나, 어떤 쿼리든 config.CPP_MIN_SCORE 이상인 결과가
+        config.CPP_MIN_RESULTS개 미만이면 None (전체 청크 검색으로 대체)
+    """
+    collections = {
+        name: (db, collection)
+        for name, db, collection in ((name, db, get_cpp_collection(db)) for name, db in _manager.get_shards().items())
+        if collection is not None
+    }
+    if not collections:
+        return None
+
+    per_query: List[List[Dict[str, Any]]] = [[] for _ in queries]
+    for name, (db, collection) in collections.items():
+        res = collection.query(
+            query_embeddings=list(query_embeddings),
+            n_results=top_k,
+            include=["metadatas", "distances"]
+        )
+        for i in range(len(queries)):
+            for doc_id, meta, distance in zip(res["ids"][i], res["metadatas"][i], res["distances"][i]):
+                score = 1.0 - distance  # cosine 거리 → 유사도
+                if score >= config.CPP_MIN_SCORE:
+                    per_query[i].append({
+                        "id": f"{name}:{doc_id}",
+                        "content": "",
+                        "metadata": expand_metadata(db, meta),  # 정규화된 DB는 (doc, cpp) 참조만 저장
+                        "score": score,
+                        "shard": name,
+                    })
+
+    per_query = [_collapse_cpp(candidates) for candidates in per_query]
+    if any(len(candidates) < min(config.CPP_MIN_RESULTS, top_k) for candidates in per_query):
+        return None
+    merged = _dedupe(queries, [candidates[:top_k] for candidates in per_query])
+    return _collapse_cpp(merged)
+
+
+_CPP_ROW_KEYS = ("source", "page", "composition", "process", "property")
+
+
+def _collapse_cpp(candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """(source, page, composition, process, property)가 같은 C-P-P 행을 하나로 합칩니다 (최고 점수만 유지, 점수순)."""
+    seen = set()
+    collapsed = []
+    for cand in sorted(candidates, key=lambda c: c["score"], reverse=True):
+        fields = cand.get("metadata", cand)  # 후보(metadata 포함) 또는 _dedupe() 결과(필드 평탄화)
+        key = tuple(str(fields.get(k, "")) for k in _CPP_ROW_KEYS)
+        if key not in seen:
+            seen.add(key)
+            collapsed.append(cand)
+    return collapsed
+
+
+_FULL_TEXT_PREFIX = "full:"
+
+
+def _parse_tool_input(tool_input: str) -> Tuple[List[str], bool]:
+    """Tool 입력을 (쿼리 리스트, 전체 본문 요청 여부)로 분리합니다."""
+    full_text = tool_input.strip().lower().startswith(_FULL_TEXT_PREFIX)
+    if full_text:
+        tool_input = tool_input.strip()[len(_FULL_TEXT_PREFIX):]
+    return [q.strip() for q in tool_input.split(";") if q.strip()], full_text
+
+
+def _search_embedded(
+    tool_input: str,
+    queries: List[str],
+    query_embeddings: List[List[float]],
+    full_text: bool
+) -> str:
+    """
+    임베딩이 끝난 쿼리로 검색하고 Observation 문자열을 만듭니다 (Chroma 조회 + 포맷팅, 동기).
+
+    config.VECTORDB_SEARCH_MODE가 "cpp_first"이면 C-P-P 전용 인덱스를 먼저 검색하고,
+    결과가 부족하거나 "full:" 입력이면 같은 임베딩으로 전체 청크를 검색합니다.
+    """
+    if config.VECTORDB_SEARCH_MODE == "cpp_first" and not full_text:
+        try:
+            results = search_cpp(queries, query_embeddings)
+        except Exception:
+            logging.exception("C-P-P index search error")
+            results = None
+        metrics.incr("vectordb.cpp.hit" if results else "vectordb.cpp.fallback")
+        if results:
+            if len(queries) == 1:
+                results = [{k: v for k, v in r.items() if k != "query"} for r in results]
+            return _format_results(results, tool_input)
+
+    if len(queries) > 1:
+        return _format_results(search_vectordb_many(queries, query_embeddings=query_embeddings), tool_input)
+    return _format_results(search_vectordb(queries[0], query_embedding=query_embeddings[0]), tool_input)
+
+
+# ==================== 선행 검색 (speculative prefetch) ====================
+# 에이전트는 거의 항상 질문을 바꿔 쓴 쿼리로 vectordb_search를 먼저 호출합니다.
+# run_agent()가 요청 도착 시 원래 질문으로 검색을 미리 시작하고(첫 LLM 호출과 동시),
+# 에이전트의 첫 vectordb_search 입력이 원래 질문과 충분히 가까우면 그 결과를 바로 사용합니다.
+_prefetch_pool: Optional[ThreadPoolExecutor] = None
+_prefetch_pool_lock = threading.Lock()
+_PREFETCH_EMBED_WAIT_SEC = 2.0  # 도구 호출 시 선행 검색의 임베딩이 아직 없으면 기다릴 최대 시간
+
+
+def _get_prefetch_pool() -> ThreadPoolExecutor:
+    global _prefetch_pool
+    with _prefetch_pool_lock:
+        if _prefetch_pool is None:
+            _prefetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="vectordb-prefetch")
+        return _prefetch_pool
+
+
+def _prefetch_job(prefetch: Dict[str, Any]) -> str:
+    """원래 질문을 임베딩·검색하여 Observation 문자열을 만듭니다 (백그라운드)."""
+    query = prefetch["query"]
+    try:
+        prefetch["embedding"] = get_vectordb().embeddings.embed_query(query)
+    finally:
+        prefetch["embedded"].set()
+    t0 = time.perf_counter()
+    observation = _search_embedded(query, [query], [prefetch["embedding"]], False)
+    prefetch["search_sec"] = time.perf_counter() - t0
+    return observation
+
+
+def start_vectordb_prefetch(query: str) -> Optional[Dict[str, Any]]:
+    """
+    질문으로 vectordb 검색을 백그라운드에서 시작하고, 현재 요청 컨텍스트에 등록합니다.
+
+    Returns:
+        선행 검색 상태 딕셔너리 (요청 컨텍스트 밖이거나 비활성화되어 있으면 None)
+    """
+    ctx = request_context.current()
+    query = query.strip()
+    if ctx is None or not config.VECTORDB_PREFETCH or not query:
+        return None
+    prefetch: Dict[str, Any] = {
+        "query": query,
+        "embedding": None,
+        "embedded": threading.Event(),
+        "search_sec": None,
+    }
+    prefetch["future"] = _get_prefetch_pool().submit(_prefetch_job, prefetch)
+    ctx.state["vectordb_prefetch"] = prefetch
+    return prefetch
+
+
+def finish_vectordb_prefetch() -> None:
+    """요청 종료 시 사용되지 않은 선행 검색을 기록합니다."""
+    ctx = request_context.current()
+    if ctx is not None and ctx.state.pop("vectordb_prefetch", None) is not None:
+        metrics.incr("vectordb.prefetch.unused")
+
+
+def _pop_prefetch() -> Optional[Dict[str, Any]]:
+    """현재 요청의 선행 검색을 꺼냅니다 (요청당 첫 번째 vectordb_search 호출에서만 확인)."""
+    ctx = request_context.current()
+    return ctx.state.pop("vectordb_prefetch", None) if ctx is not None else None
+
+
+def _match_prefetch(
+    prefetch: Dict[str, Any],
+    queries: List[str],
+    query_embeddings: List[List[float]],
+    full_text: bool
+) -> bool:
+    """선행 검색 쿼리와 도구 입력이 충분히 가까운지(임베딩 cosine 유사도) 확인합니다."""
+    if not full_text and len(queries) == 1 and prefetch["embedded"].wait(_PREFETCH_EMBED_WAIT_SEC):
+        if prefetch["embedding"] is not None:
+            a = np.asarray(prefetch["embedding"], dtype=np.float32)
+            b = np.asarray(query_embeddings[0], dtype=np.float32)
+            similarity = float(a @ b / max(np.linalg.norm(a) * np.linalg.norm(b), 1e-12))
+            metrics.observe("vectordb.prefetch.similarity", similarity)
+            if similarity >= config.VECTORDB_PREFETCH_MIN_SIMILARITY:
+                return True
+    metrics.incr("vectordb.prefetch.miss")
+    return False
+
+
+def _prefetched_observation(prefetch: Dict[str, Any], wait_sec: float, observation: Optional[str]) -> Optional[str]:
+    """선행 검색 결과를 기록하고 반환합니다 (선행 검색이 실패했으면 None)."""
+    if observation is None:
+        metrics.incr("vectordb.prefetch.miss")
+        return None
+    metrics.incr("vectordb.prefetch.hit")
+    # 절약 시간 = 선행 검색의 검색 시간 중 도구 호출 전에 이미 끝난 부분
+    metrics.observe("vectordb.prefetch.saved_sec", max(0.0, (prefetch["search_sec"] or 0.0) - wait_sec))
+    return observation
+
+
+def _use_prefetch(queries: List[str], query_embeddings: List[List[float]], full_text: bool) -> Optional[str]:
+    """선행 검색이 일치하면 그 Observation을 반환합니다 (동기 경로)."""
+    prefetch = _pop_prefetch()
+    if prefetch is None or not _match_prefetch(prefetch, queries, query_embeddings, full_text):
+        return None
+    t0 = time.perf_counter()
+    try:
+        observation = prefetch["future"].result()
+    except Exception:
+        logging.exception("VectorDB prefetch error")
+        observation = None
+    return _prefetched_observation(prefetch, time.perf_counter() - t0, observation)
+
+
+async def _ause_prefetch(queries: List[str], query_embeddings: List[List[float]], full_text: bool) -> Optional[str]:
+    """선행 검색이 일치하면 그 Observation을 반환합니다 (비동기 경로)."""
+    prefetch = _pop_prefetch()
+    if prefetch is None:
+        return None
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(
+        None, partial(_match_prefetch, prefetch, queries, query_embeddings, full_text)
+    ):
+        return None
+    t0 = time.perf_counter()
+    try:
+        observation = await asyncio.wrap_future(prefetch["future"])
+    except Exception:
+        logging.exception("VectorDB prefetch error")
+        observation = None
+    return _prefetched_observation(prefetch, time.perf_counter() - t0, observation)
+
+
+def _run_tool(tool_input: str) -> str:
+    """
+    Tool 입력을 파싱합니다. 세미콜론(;)으로 구분된 입력은 다중 쿼리 검색으로 처리합니다.
+    쿼리 임베딩은 한 번의 배치 요청으로 계산합니다.
+    """
+    queries, full_text = _parse_tool_input(tool_input)
+    if not queries:
+        return _format_results([], tool_input)
+    try:
+        query_embeddings = get_vectordb().embeddings.embed_documents(queries)
+    except Exception:
+        logging.exception("VectorDB query embedding error")
+        return _format_results([{"error": _SEARCH_ERROR, "query": tool_input}])
+    prefetched = _use_prefetch(queries, query_embeddings, full_text)
+    if prefetched is not None:
+        return prefetched
+    return _search_embedded(tool_input, queries, query_embeddings, full_text)
+
+
+# ==================== 비동기 경로 ====================
+# 임베딩은 Ollama 비동기 HTTP 클라이언트(httpx 기반)로 요청하고,
+# 동기 API인 Chroma 조회·포맷팅은 executor 스레드에서 실행하여 이벤트 루프를 막지 않습니다.
+async def _aget_vectordb():
+    """VectorDB 핸들을 가져옵니다. 로드 중이면 executor에서 기다립니다."""
+    if _manager.is_ready():
+        return _manager.get()
+    return await asyncio.get_running_loop().run_in_executor(None, get_vectordb)
+
+
+async def asearch_vectordb(
+    query: str,
+    top_k: int = config.RETRIEVAL_TOP_K
+) -> List[Dict[str, Any]]:
+    """
+    search_vectordb()의 비동기 버전입니다 (같은 반환 형식).
+    """
+    try:
+        db = await _aget_vectordb()
+        query_embedding = await db.embeddings.aembed_query(query)
+    except Exception:
+        logging.exception("VectorDB async search error")
+        return [{"error": _SEARCH_ERROR, "query": query}]
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(search_vectordb, query, top_k, query_embedding))
+
+
+async def asearch_vectordb_many(
+    queries: List[str],
+    top_k: int = config.RETRIEVAL_TOP_K
+) -> List[Dict[str, Any]]:
+    """
+    search_vectordb_many()의 비동기 버전입니다 (같은 반환 형식).
+    """
+    queries = [q.strip() for q in queries if q and q.strip()]
+    if not queries:
+        return []
+    try:
+        db = await _aget_vectordb()
+        query_embeddings = await db.embeddings.aembed_documents(queries)
+    except Exception:
+        logging.exception("VectorDB async multi-query search error")
+        return [{"error": _SEARCH_ERROR, "query": "; ".join(queries)}]
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, partial(search_vectordb_many, queries, top_k, query_embeddings))
+
+
+async def _arun_tool(tool_input: str) -> str:
+    """_run_tool()의 비동기 버전 (Tool.ainvoke 경로)."""
+    queries, full_text = _parse_tool_input(tool_input)
+    if not queries:
+        return _format_results([], tool_input)
+    try:
+        db = await _aget_vectordb()
+        query_embeddings = await db.embeddings.aembed_documents(queries)
+    except Exception:
+        logging.exception("VectorDB async query embedding error")
+        return _format_results([{"error": _SEARCH_ERROR, "query": tool_input}])
+    prefetched = await _ause_prefetch(queries, query_embeddings, full_text)
+    if prefetched is not None:
+        return prefetched
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        None, partial(_search_embedded, tool_input, queries, query_embeddings, full_text)
+    )
 
 
 # ==================== LangChain Tool 래퍼 ====================
+# C-P-P 우선 검색 모드에서만 요약 레코드와 "full:" 재검색을 안내 (기본 모드는 항상 본문 청크 반환)
+if config.VECTORDB_SEARCH_MODE == "cpp_first":
+    _OUTPUT_DESCRIPTION = """Output: relevant C-P-P records (compact) or document chunks with C-P-P metadata.
+    If compact C-P-P records are not enough, prefix the input with "full:" to get full-text passages
+    (e.g., "full: Cu-Mg alloy resistivity")"""
+else:
+    _OUTPUT_DESCRIPTION = "Output: relevant document chunks (full text) with C-P-P metadata."
+
 vectordb_search_tool = Tool(
     name="vectordb_search",
-    description="""
+    description=f"""
     Searches C-P-P (Composition-Process-Property) data from research papers stored in VectorDB.
 
     Input: search query (e.g., "Cu-Mg alloy resistivity", "electromigration properties")
-    Output: relevant document chunks with C-P-P metadata
+    Multiple sub-questions can be searched at once, separated by semicolons
+    (e.g., "Cu-Mg alloy resistivity; Cu-Mg annealing temperature; Cu-Mg electromigration lifetime")
+    {_OUTPUT_DESCRIPTION}
 
     Use for: experimental data, manufacturing processes, material properties from papers
     """,
-    func=lambda query: _format_results(search_vectordb(query))
+    func=_run_tool,
+    coroutine=_arun_tool
 )
 
 
-def _format_results(results: List[Dict[str, Any]]) -> str:
+def _render_result(index: int, doc: Dict[str, Any]) -> str:
+    """검색 결과 하나를 Observation 블록 문자열로 렌더링합니다."""
+    lines = [f"[{index}] {doc['source']} (p.{doc['page']})"]
+    if doc.get("query"):
+        lines.append(f"  🔍 Query: {doc['query']}")
+    lines.append(f"  📌 Composition: {doc.get('composition') or 'N/A'}")
+    lines.append(f"  🔧 Process: {doc.get('process') or 'N/A'}")
+    lines.append(f"  📊 Property: {doc.get('property') or 'N/A'}")
+    if doc.get("content"):
+        lines.append(f"  📄 Content: {doc['content']}")
+    return "\n".join(lines) + "\n"
+
+
+def _format_results(results: List[Dict[str, Any]], query: str = "") -> str:
     """
-    검색 결과를 읽기 쉬운 형식으로 포맷팅합니다.
+    검색 결과를 토큰 예산(config.VECTORDB_OBSERVATION_TOKEN_BUDGET) 안에서
+    읽기 쉬운 형식으로 포맷팅합니다.
     
     Args:
         results: 문서 리스트
+        query: 검색 쿼리 (본문에서 검색어가 포함된 문장을 고르는 데 사용)
         
     Returns:
         포맷팅된 결과 문자열
@@ -118,18 +907,13 @@ def _format_results(results: List[Dict[str, Any]]) -> str:
     if "error" in results[0]:
         return f"오류: {results[0]['error']}\n검색어: {results[0].get('query', 'N/A')}"
     
-    # 결과 포맷팅
-    output = [f"=== {len(results)}개의 관련 문서 검색 ===\n"]
-    
-    for i, doc in enumerate(results, 1):
-        process = doc.get('process') or "N/A"
-        prop = doc.get('property') or "N/A"
-        output.append(f"[{i}] {doc['source']} (p.{doc['page']})")
-        output.append(f"  📌 Composition: {doc.get('composition') or 'N/A'}")
-        output.append(f"  🔧 Process: {process[:200]}..." if len(process) > 200 else f"  🔧 Process: {process}")
-        output.append(f"  📊 Property: {prop[:200]}..." if len(prop) > 200 else f"  📊 Property: {prop}")
-        output.append(f"  📄 Content: {doc['content']}")
-        output.append("")  # 빈 줄
+    # 결과 포맷팅 (점수 높은 순으로 토큰 예산까지)
+    blocks, used = pack_results(results, query, _render_result)
+    # C-P-P 전용 인덱스 결과는 본문이 없음
+    label = "관련 문서" if any(r.get("content") for r in results) else "C-P-P 레코드"
+    output = [f"=== {len(results)}개의 {label} 검색 (상위 {len(blocks)}개 표시) ===\n"]
+    output.extend(blocks)
+    output.append(f"(토큰 사용: {used}/{config.VECTORDB_OBSERVATION_TOKEN_BUDGET})")
     
     return "\n".join(output)
 
@@ -3,6 +3,7 @@ Web Search Tool
 ================
 Brave Search API를 우선 사용하고, API 키 미설정·오류·Rate Limit 발생 시
 DuckDuckGo로 자동 전환(fallback)합니다.
+Brave 서킷 브레이커(circuit_breaker.py)가 열려 있으면 Brave를 호출하지 않고 바로 DuckDuckGo를 사용합니다.
 """
 
 import logging
@@ -14,6 +15,8 @@ from typing import List, Dict, Any
 from langchain_core.tools import Tool
 import requests
 import config
+from request_context import tool_timeout
+from circuit_breaker import CircuitOpenError, get_breaker
 
 
 # ==================== Brave Search ====================
@@ -22,7 +25,7 @@ def _brave_search(query: str, max_results: int = 5) -> List[Dict[str, Any]]:
     Brave Search API로 웹 검색을 시도합니다.
 
     Returns:
-        검색 결과 리스트. API 키 없음·오류 시 빈 리스트를 반환하여 fallback을 유도합니다.
+        검색 결과 리스트. API 키 없음·오류·브레이커 open 시 빈 리스트를 반환하여 fallback을 유도합니다.
     """
     api_key = config.BRAVE_API_KEY
     if not api_key:
@@ -42,9 +45,12 @@ def _brave_search(query: str, max_results: int = 5) -> List[Dict[str, Any]]:
             "search_lang": "en"
         }
 
-        response = requests.get(url, headers=headers, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        def fetch() -> Dict[str, Any]:
+            response = requests.get(url, headers=headers, params=params, timeout=tool_timeout(config.WEB_SEARCH_TIMEOUT))
+            response.raise_for_status()
+            return response.json()
+
+        data = get_breaker("brave").call(fetch)
 
         results = []
         if "web" in data and "results" in data["web"]:
@@ -57,6 +63,9 @@ def _brave_search(query: str, max_results: int = 5) -> List[Dict[str, Any]]:
                 })
         return results
 
+    except CircuitOpenError:
+        logging.debug("Brave 브레이커 open → DuckDuckGo로 전환")
+        return []
     except (requests.exceptions.RequestException, ValueError):
         logging.debug("Brave Search 오류 → DuckDuckGo로 전환", exc_info=True)
         return []
@@ -82,8 +91,11 @@ def _duckduckgo_search(query: str, max_results: int = 5) -> List[Dict[str, Any]]
         }]
 
     try:
-        with DDGS() as ddgs:
-            raw = list(ddgs.text(query, max_results=max_results))
+        def fetch() -> List[Dict[str, Any]]:
+            with DDGS(timeout=tool_timeout(config.WEB_SEARCH_TIMEOUT)) as ddgs:
+                return list(ddgs.text(query, max_results=max_results))
+
+        raw = get_breaker("duckduckgo").call(fetch)
         return [
             {
                 "title": r.get("title", ""),
@@ -93,6 +105,8 @@ def _duckduckgo_search(query: str, max_results: int = 5) -> List[Dict[str, Any]]
             }
             for r in raw
         ]
+    except CircuitOpenError as e:
+        return [{"error": str(e), "query": query}]
     except Exception:
         logging.exception("DuckDuckGo search error")
         return [{
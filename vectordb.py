@@ -8,7 +8,6 @@ PDF 문서를 로드하고, C-P-P(Composition-Process-Property)를 추출하여
 
 import logging
 import os
-import shutil
 import warnings
 
 # 로그 억제 설정 (imports 전에 실행)
@@ -17,7 +16,7 @@ os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'  # TensorFlow 로그 억제
 os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'  # oneDNN 메시지 억제
 
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import tiktoken
 from tqdm import tqdm
 
@@ -185,7 +184,17 @@ def split_documents(
         separators=["\n\n", "\n", " ", ""]
     )
     
-    chunks = splitter.split_documents(documents)
+    # 페이지 내 청크 시작 위치(start_index) 기록 — 검색 후 인접 청크 병합에 사용
+    # (splitter의 add_start_index는 토큰 단위 overlap을 문자 단위로 계산해 위치가 어긋남)
+    chunks = []
+    for document in documents:
+        search_from = 0
+        for chunk in splitter.split_documents([document]):
+            start = document.page_content.find(chunk.page_content, search_from)
+            if start >= 0:
+                chunk.metadata["start_index"] = start
+                search_from = start + 1
+            chunks.append(chunk)
     
     # 중복 제거 (동일 내용 + 동일 출처 + 동일 페이지)
     unique_chunks = []
@@ -277,41 +286,108 @@ def add_cpp_to_chunks(chunks: List[Document]) -> List[Document]:
 
 
 # ==================== VectorDB 생성/로드 ====================
+def hnsw_configuration(hnsw: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Chroma 컬렉션 생성용 HNSW 설정을 만듭니다.
+
+    Args:
+        hnsw: {"space", "M", "construction_ef", "search_ef"} 중 덮어쓸 값 (나머지는 config 기본값)
+
+    Returns:
+        Chroma collection_configuration 딕셔너리
+    """
+    params = {
+        "space": config.CHROMA_HNSW_SPACE,
+        "M": config.CHROMA_HNSW_M,
+        "construction_ef": config.CHROMA_HNSW_CONSTRUCTION_EF,
+        "search_ef": config.CHROMA_HNSW_SEARCH_EF,
+        **(hnsw or {}),
+    }
+    return {
+        "hnsw": {
+            "space": params["space"],
+            "max_neighbors": params["M"],
+            "ef_construction": params["construction_ef"],
+            "ef_search": params["search_ef"],
+        }
+    }
+
+
+def set_search_ef(db: Chroma, search_ef: int) -> None:
+    """기존 컬렉션의 검색 시 ef 값을 바꿉니다 (구축 파라미터는 생성 후 변경 불가)."""
+    current = (db._collection.configuration or {}).get("hnsw") or {}
+    if current.get("ef_search") != search_ef:
+        db._collection.modify(configuration={"hnsw": {"ef_search": search_ef}})
+
+
 def create_or_load_vectordb(
     chunks: Optional[List[Document]] = None,
     persist_directory: str = str(config.VECTOR_DB_PATH),
-    force_recreate: bool = False
+    force_recreate: bool = False,
+    embedding_model: Optional[str] = None,
+    hnsw: Optional[Dict[str, Any]] = None
 ) -> Optional[Chroma]:
     """
     VectorDB를 생성하거나 기존 DB를 로드합니다.
+
+    persist_directory에 활성 버전 포인터(index_versions.py)가 있으면 활성 버전을 로드합니다.
+    force_recreate는 서빙 중인 디렉토리를 지우지 않고 새 버전 디렉토리에 생성한 뒤
+    검증을 거쳐 포인터를 교체합니다 (blue/green).
     
     Args:
         chunks: 저장할 청크 리스트 (None이면 기존 DB 로드)
         persist_directory: DB 저장 경로
-        force_recreate: True이면 기존 DB 삭제 후 재생성
+        force_recreate: True이면 새 버전으로 재생성 후 교체
+        embedding_model: 임베딩 모델 (None이면 활성 버전의 모델, 없으면 config.EMBEDDING_MODEL_NAME)
+        hnsw: HNSW 파라미터 덮어쓰기 {"space", "M", "construction_ef", "search_ef"}
+              (생성 시 모두 적용, 기존 DB 로드 시에는 명시한 search_ef만 적용 — 없으면 저장된 값을 그대로 사용)
         
     Returns:
         Chroma VectorDB 인스턴스
     """
-    # Embedding 모델 초기화
+    from index_versions import blue_green_build, current_embedding_model, current_path
+
+    # force_recreate: 새 버전 디렉토리에 생성 → 검증 → 포인터 교체 (기존 DB는 서빙 유지)
+    if force_recreate and os.path.exists(current_path(persist_directory)):
+        if chunks is None or len(chunks) == 0:
+            print("❌ 저장할 청크가 없습니다.")
+            return None
+        model = embedding_model or config.EMBEDDING_MODEL_NAME
+        return blue_green_build(
+            Path(persist_directory),
+            lambda version_dir: create_or_load_vectordb(chunks, version_dir, embedding_model=model, hnsw=hnsw),
+            embedding_model=model,
+            expected_count=len(chunks)
+        )
+
+    # Embedding 모델 초기화 (활성 버전을 구축한 모델로 쿼리해야 함)
+    model = embedding_model or current_embedding_model(persist_directory)
+    if model != config.EMBEDDING_MODEL_NAME:
+        logging.warning(
+            "활성 VectorDB 버전의 임베딩 모델(%s)이 설정(%s)과 다릅니다. "
+            "`python index_versions.py migrate`로 새 버전을 구축하기 전까지 기존 모델로 서빙합니다.",
+            model, config.EMBEDDING_MODEL_NAME
+        )
     embeddings = OllamaEmbeddings(
-        model=config.EMBEDDING_MODEL_NAME,
+        model=model,
         base_url=config.OLLAMA_BASE_URL,
     )
-    
-    # force_recreate: 기존 DB 디렉토리 삭제 (중복 누적 방지)
-    if force_recreate and os.path.exists(persist_directory):
-        shutil.rmtree(persist_directory, ignore_errors=True)
-        print(f"🗑️  기존 VectorDB 삭제: {persist_directory}")
+    persist_directory = str(current_path(persist_directory))
 
-    # 기존 DB가 있고 재생성이 아닌 경우
-    if os.path.exists(persist_directory) and not force_recreate:
+    # 기존 DB가 있는 경우
+    if os.path.exists(persist_directory):
         print(f"📂 기존 VectorDB 로드: {persist_directory}")
         try:
             db = Chroma(
                 persist_directory=persist_directory,
                 embedding_function=embeddings
             )
+            # 컬렉션 설정 변경은 쓰기 작업이므로 호출 측이 search_ef를 명시한 경우에만 (서빙 노드의 로드는 읽기 전용)
+            if hnsw and "search_ef" in hnsw:
+                try:
+                    set_search_ef(db, hnsw["search_ef"])
+                except Exception:
+                    logging.warning("HNSW search_ef 적용 실패", exc_info=True)
             try:
                 count = db._collection.count()
             except Exception:
@@ -328,12 +404,20 @@ def create_or_load_vectordb(
         return None
     
     print(f"💾 VectorDB 생성 중 ({len(chunks)}개 청크)...")
+    table = None
+    if config.NORMALIZED_METADATA:
+        from doc_table import normalize_metadatas
+        metadatas, table = normalize_metadatas([chunk.metadata for chunk in chunks])
+        chunks = [Document(page_content=c.page_content, metadata=m) for c, m in zip(chunks, metadatas)]
     try:
         db = Chroma.from_documents(
             documents=chunks,
             embedding=embeddings,
-            persist_directory=persist_directory
+            persist_directory=persist_directory,
+            collection_configuration=hnsw_configuration(hnsw)
         )
+        if table is not None:
+            table.save(persist_directory)
         # chromadb>=0.5.0 부터 persist_directory 지정 시 자동 저장됨 (persist() 제거됨)
         print(f"✅ VectorDB 생성 완료: {persist_directory}\n")
         return db
@@ -347,7 +431,8 @@ def create_or_load_vectordb(
 def build_vectordb_pipeline(
     pdf_path: str,
     extract_cpp: bool = True,
-    force_recreate: bool = False
+    force_recreate: bool = False,
+    persist_directory: str = str(config.VECTOR_DB_PATH)
 ) -> Optional[Chroma]:
     """
     PDF → 청크 → C-P-P 추출 → VectorDB 생성의 전체 파이프라인
@@ -355,7 +440,8 @@ def build_vectordb_pipeline(
     Args:
         pdf_path: PDF 파일 또는 폴더 경로
         extract_cpp: C-P-P를 추출할지 여부
-        force_recreate: 기존 DB를 삭제하고 재생성할지
+        force_recreate: 기존 DB가 있어도 새 버전으로 재구축 후 교체할지 (blue/green)
+        persist_directory: DB 저장 경로 (샤드별 구축 시 config.VECTOR_DB_SHARDS의 경로)
         
     Returns:
         VectorDB 인스턴스
@@ -380,11 +466,30 @@ def build_vectordb_pipeline(
     if extract_cpp:
         chunks = add_cpp_to_chunks(chunks)
     
-    # 4. VectorDB 생성
-    db = create_or_load_vectordb(
-        chunks=chunks,
-        force_recreate=force_recreate
-    )
+    def _build(directory: str) -> Optional[Chroma]:
+        # 4. VectorDB 생성
+        db = create_or_load_vectordb(chunks=chunks, persist_directory=directory)
+        if db is None:
+            return None
+
+        # 5. 논문 단위 인덱스 (2단계 계층형 검색용)
+        from doc_index import build_doc_index
+        build_doc_index(db)
+
+        # 6. C-P-P 전용 인덱스 (C-P-P 우선 검색 모드용)
+        if extract_cpp:
+            from cpp_index import build_cpp_index
+            build_cpp_index(db)
+        return db
+
+    from index_versions import blue_green_build, current_path
+    if not os.path.exists(current_path(persist_directory)):
+        db = _build(persist_directory)
+    elif force_recreate:
+        # 서빙 중인 DB는 그대로 두고 새 버전 디렉토리에 보조 인덱스까지 구축 → 검증 → 포인터 교체
+        db = blue_green_build(Path(persist_directory), _build, expected_count=len(chunks))
+    else:
+        db = create_or_load_vectordb(persist_directory=persist_directory)
     
     print("="*60)
     print("VectorDB 구축 완료")
@@ -416,7 +521,9 @@ if __name__ == "__main__":
         print(f"\n🔍 테스트 검색: '{test_query}'")
         results = db.similarity_search(test_query, k=3)
         
+        from doc_table import expand_metadata
         for i, doc in enumerate(results, 1):
+            doc.metadata = expand_metadata(db, doc.metadata)  # 정규화된 DB는 문서 ID·C-P-P 행 번호만 저장
             print(f"\n--- 결과 {i} ---")
             print(f"출처: {doc.metadata.get('source')} (p.{doc.metadata.get('page')})")
             print(f"Composition: {doc.metadata.get('composition', 'N/A')}")